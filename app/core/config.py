@@ -32,10 +32,80 @@ class Settings(BaseSettings):
     embedding_model_name: str = Field(default="sentence-transformers/all-MiniLM-L6-v2")
     embedding_device: str | None = Field(default=None)
     embedding_cache_ttl_seconds: int = Field(default=3600)
+    embedding_cache_max_bytes: int = Field(default=64 * 1024 * 1024, description="In-process embedding cache budget")
+    embedding_cache_path: Path | None = Field(
+        default=None, description="Optional SQLite file shared by workers for the embedding cache"
+    )
     embedding_vector_dimension: int = Field(default=384)
+    embedding_onnx_model_dir: Path | None = Field(
+        default=None, description="Directory holding model.onnx + tokenizer.json for the onnx backend"
+    )
+    embedding_onnx_quantize: bool = Field(default=True, description="Use dynamic int8 quantization on CPU")
+    embedding_onnx_threads: int | None = Field(default=None)
+    embedding_server_socket: Path | None = Field(
+        default=None, description="Unix socket of the shared embedding server (remote backend)"
+    )
+    embedding_server_timeout_seconds: float = Field(default=30.0)
+    embedding_warmup_enabled: bool = Field(default=True, description="Load the embedding model at startup")
+    embedding_batching_enabled: bool = Field(default=True, description="Coalesce concurrent embed calls")
+    embedding_batch_max_size: int = Field(default=64)
+    embedding_batch_max_wait_ms: float = Field(default=2.0)
+    embedding_backfill_batch_size: int = Field(default=256, description="Rows re-embedded per transaction")
+    embedding_backfill_max_rows_per_second: float = Field(default=200.0, description="0 disables throttling")
+    embedding_backfill_interval_seconds: float = Field(default=300.0)
+    embedding_backfill_checkpoint: Path = Field(default=Path("logs/embedding_backfill.json"))
 
     vector_top_k: int = Field(default=8)
     vector_min_score: float = Field(default=0.25)
+    pgvector_index_method: str = Field(default="hnsw", description="ANN index on Postgres: hnsw, ivfflat or none")
+    pgvector_hnsw_m: int = Field(default=16)
+    pgvector_hnsw_ef_construction: int = Field(default=64)
+    pgvector_hnsw_ef_search: int = Field(default=40, description="Applied per query with SET LOCAL")
+    pgvector_ivfflat_lists: int = Field(default=100, description="Roughly rows / 1000 up to 1M rows")
+    pgvector_ivfflat_probes: int = Field(default=10, description="Applied per query with SET LOCAL")
+    pgvector_iterative_scan: bool = Field(
+        default=True, description="Keep scanning past filtered-out rows (pgvector >= 0.8 iterative_scan)"
+    )
+    pgvector_filter_overfetch: int = Field(default=4, description="hnsw.ef_search is at least limit x overfetch")
+    search_default_mode: str = Field(
+        default="vector", description="vector (cosine scores), lexical or hybrid (RRF scores); per request via mode"
+    )
+    search_hybrid_candidates: int = Field(default=50, description="Candidates taken from each ranking before fusion")
+    search_rrf_k: int = Field(default=60, description="Reciprocal rank fusion constant")
+    search_rerank_candidates: int = Field(default=50, description="Candidate pool for recency/MMR reranking")
+    rag_index_chunk_size: int = Field(default=500, description="Documents per INSERT ... ON CONFLICT statement")
+    memory_dedup_mode: str = Field(default="off", description="off, merge or reject near-duplicate notes on insert")
+    memory_dedup_threshold: float = Field(default=0.8, description="Estimated Jaccard similarity of word sets")
+    memory_archive_async: bool = Field(default=True, description="Write .zmem archives on a background thread")
+    memory_archive_queue_size: int = Field(default=10000)
+    memory_archive_batch_size: int = Field(default=64)
+    memory_archive_spool_fsync: bool = Field(default=False, description="fsync the archive spool and pack blocks")
+    memory_archive_segment_bytes: int = Field(default=64 << 20, description="Roll to a new pack segment past this size")
+    memory_archive_block_bytes: int = Field(default=256 << 10, description="Uncompressed records per pack block")
+    memory_restore_batch_size: int = Field(default=512, description="Notes embedded and loaded per transaction")
+    memory_restore_checkpoint: Path = Field(default=Path("logs/memory_restore.json"))
+    query_cache_enabled: bool = Field(default=True, description="Cache /memory/note/find and /rag/query results")
+    query_cache_max_entries: int = Field(default=1024)
+    query_cache_ttl_seconds: float = Field(default=300.0)
+    vector_storage_encoding: str = Field(
+        default="float32", description="Non-Postgres embedding storage: float32, float16 or int8"
+    )
+    vector_index_backend: str = Field(
+        default="auto", description="Non-Postgres index: exact, hnsw, or auto (hnsw when a persisted graph exists)"
+    )
+    hnsw_m: int = Field(default=16)
+    hnsw_ef_construction: int = Field(default=200)
+    hnsw_ef_search: int = Field(default=64)
+    hnsw_max_tombstone_ratio: float = Field(
+        default=0.25, description="Rebuild the graph in the background past this share of tombstoned nodes"
+    )
+    vector_index_persist_interval_seconds: float = Field(default=30.0)
+    vector_index_sync_interval_seconds: float = Field(
+        default=1.0, description="How often the in-memory index checks the table for foreign writes"
+    )
+    vector_index_sync_window_seconds: float = Field(
+        default=300.0, description="Incremental syncs re-read rows this far behind the watermark (late commits)"
+    )
 
     allowed_roots: tuple[str, ...] = Field(default=("projects", "reports", "students", "memory"))
 
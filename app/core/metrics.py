@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+from bisect import bisect_left
+from functools import lru_cache
+import threading
+from typing import Any, Callable, Dict, Sequence
+
+
+class Counter:
+    """Monotonic thread-safe counter."""
+
+    def __init__(self, name: str, description: str = "") -> None:
+        self.name = name
+        self.description = description
+        self._value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: int = 1) -> None:
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self) -> int:
+        return self._value
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"type": "counter", "description": self.description, "value": self._value}
+
+
+class Histogram:
+    """Fixed-bucket histogram (cumulative bucket counts, Prometheus style)."""
+
+    def __init__(self, name: str, buckets: Sequence[float], description: str = "") -> None:
+        self.name = name
+        self.description = description
+        self._bounds = sorted(buckets)
+        self._counts = [0] * (len(self._bounds) + 1)
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect_left(self._bounds, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+            self._count += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = list(self._counts)
+            total, count = self._sum, self._count
+        cumulative: Dict[str, int] = {}
+        running = 0
+        for bound, bucket in zip(self._bounds, counts):
+            running += bucket
+            cumulative[f"{bound:g}"] = running
+        cumulative["+Inf"] = count
+        return {
+            "type": "histogram",
+            "description": self.description,
+            "count": count,
+            "sum": total,
+            "buckets": cumulative,
+        }
+
+
+class MetricsRegistry:
+    """Process-local registry exposed by the ``/metrics`` endpoint."""
+
+    def __init__(self) -> None:
+        self._metrics: Dict[str, Counter | Histogram] = {}
+        self._collectors: Dict[str, Callable[[], Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, description: str = "") -> Counter:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = Counter(name, description)
+        if not isinstance(metric, Counter):
+            raise TypeError(f"Metric {name!r} is not a counter")
+        return metric
+
+    def histogram(self, name: str, buckets: Sequence[float], description: str = "") -> Histogram:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = Histogram(name, buckets, description)
+        if not isinstance(metric, Histogram):
+            raise TypeError(f"Metric {name!r} is not a histogram")
+        return metric
+
+    def register_collector(self, name: str, collector: Callable[[], Dict[str, Any]]) -> None:
+        """Attach a callback whose dict result is reported under ``name`` at snapshot time."""
+
+        with self._lock:
+            self._collectors[name] = collector
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            metrics = dict(self._metrics)
+            collectors = dict(self._collectors)
+        result: Dict[str, Any] = {name: metric.snapshot() for name, metric in sorted(metrics.items())}
+        for name, collector in sorted(collectors.items()):
+            result[name] = collector()
+        return result
+
+
+@lru_cache(maxsize=1)
+def get_metrics_registry() -> MetricsRegistry:
+    return MetricsRegistry()
@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import asyncio
+from concurrent.futures import Future
+import threading
+from typing import Callable, Dict, Generic, Hashable, TypeVar
+
+from app.core.metrics import Counter
+
+T = TypeVar("T")
+
+
+class SingleFlight(Generic[T]):
+    """Runs one computation per key at a time; concurrent callers share its outcome.
+
+    ``do`` serves threads (sync routes run in the threadpool) and ``ado`` serves
+    coroutines; both kinds of callers can join the same flight. Followers get
+    the leader's result or exception, so results must not be mutated in place.
+    """
+
+    def __init__(self, coalesced: Counter | None = None) -> None:
+        self._flights: Dict[Hashable, Future[T]] = {}
+        self._lock = threading.Lock()
+        self._coalesced = coalesced
+
+    def do(self, key: Hashable, function: Callable[[], T]) -> T:
+        future, leader = self._join(key)
+        if leader:
+            self._run(key, future, function)
+        return future.result()
+
+    async def ado(self, key: Hashable, function: Callable[[], T]) -> T:
+        future, leader = self._join(key)
+        if leader:
+            loop = asyncio.get_running_loop()
+            loop.run_in_executor(None, self._run, key, future, function)
+        return await asyncio.wrap_future(future)
+
+    def _join(self, key: Hashable) -> tuple[Future[T], bool]:
+        with self._lock:
+            future = self._flights.get(key)
+            if future is not None:
+                if self._coalesced is not None:
+                    self._coalesced.inc()
+                return future, False
+            future = self._flights[key] = Future()
+            return future, True
+
+    def _run(self, key: Hashable, future: Future[T], function: Callable[[], T]) -> None:
+        try:
+            result = function()
+        except BaseException as error:
+            with self._lock:
+                self._flights.pop(key, None)
+            future.set_exception(error)
+            return
+        with self._lock:
+            self._flights.pop(key, None)
+        future.set_result(result)
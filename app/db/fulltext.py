@@ -0,0 +1,158 @@
+"""Full-text indexes on ``memory_notes.text`` and ``rag_documents.text``.
+
+Postgres uses a GIN index on ``to_tsvector('simple', text)``; SQLite uses an
+FTS5 external-content table (``<table>_fts``) kept in sync by triggers. Other
+dialects, or SQLite builds without FTS5, fall back to ``LIKE`` matching.
+
+The SQLite FTS table is keyed by ``rowid``, which ``VACUUM`` may renumber on
+these tables: call ``rebuild_fulltext_indexes`` after vacuuming.
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+from typing import Any, Dict, List
+
+from sqlalchemy import case, column, func, literal_column, or_, table, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.sql import Select
+
+logger = logging.getLogger(__name__)
+
+FULLTEXT_TABLES: Dict[str, str] = {
+    "memory_notes": "text",
+    "rag_documents": "text",
+}
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+_TS_CONFIG = "'simple'::regconfig"
+_fts5_ready: Dict[str, bool] = {}
+
+
+def lexical_terms(query: str) -> List[List[str]]:
+    """Whitespace-separated terms, each split into word tokens (``ERR-404`` -> ``[ERR, 404]``)."""
+
+    terms = [_TOKEN.findall(term.lower()) for term in query.split()]
+    return [tokens for tokens in terms if tokens]
+
+
+def fts5_query(query: str) -> str:
+    """FTS5 MATCH expression: every term as a quoted phrase, terms OR-ed together."""
+
+    return " OR ".join(f'"{" ".join(tokens)}"' for tokens in lexical_terms(query))
+
+
+def tsquery(query: str) -> str:
+    """``to_tsquery`` expression: tokens of a term must be adjacent, terms OR-ed together."""
+
+    return " | ".join(f"({' <-> '.join(tokens)})" for tokens in lexical_terms(query))
+
+
+def ensure_fulltext_indexes(engine: Engine) -> None:
+    dialect = engine.dialect.name
+    with engine.begin() as connection:
+        if dialect == "postgresql":
+            for table_name, text_column in FULLTEXT_TABLES.items():
+                connection.execute(
+                    text(
+                        f"CREATE INDEX IF NOT EXISTS ix_{table_name}_{text_column}_fts ON {table_name} "
+                        f"USING gin (to_tsvector({_TS_CONFIG}, {text_column}))"
+                    )
+                )
+        elif dialect == "sqlite":
+            _fts5_ready[str(engine.url)] = _ensure_fts5(connection)
+
+
+def rebuild_fulltext_indexes(engine: Engine) -> None:
+    if engine.dialect.name != "sqlite" or not fts5_available(engine):
+        return
+    with engine.begin() as connection:
+        for table_name in FULLTEXT_TABLES:
+            connection.execute(text(f"INSERT INTO {table_name}_fts({table_name}_fts) VALUES ('rebuild')"))
+
+
+def fts5_available(engine: Engine) -> bool:
+    key = str(engine.url)
+    if key not in _fts5_ready:
+        with engine.connect() as connection:
+            found = connection.execute(
+                text("SELECT count(*) FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                {"name": f"{next(iter(FULLTEXT_TABLES))}_fts"},
+            ).scalar_one()
+        _fts5_ready[key] = bool(found)
+    return _fts5_ready[key]
+
+
+def match_fulltext(stmt: Select[Any], model: Any, query: str, engine: Engine) -> Select[Any] | None:
+    """Restrict ``stmt`` to rows of ``model`` matching ``query``, best matches first.
+
+    Returns None when the query has no searchable token.
+    """
+
+    terms = lexical_terms(query)
+    if not terms:
+        return None
+    table_name = model.__tablename__
+    text_column = getattr(model, FULLTEXT_TABLES[table_name])
+    dialect = engine.dialect.name
+    if dialect == "postgresql":
+        config = literal_column(_TS_CONFIG)
+        document = func.to_tsvector(config, text_column)
+        condition = func.to_tsquery(config, tsquery(query))
+        return stmt.where(document.op("@@")(condition)).order_by(func.ts_rank_cd(document, condition).desc())
+    if dialect == "sqlite" and fts5_available(engine):
+        fts = table(f"{table_name}_fts", column("rowid"), column("rank"))
+        return (
+            stmt.join(fts, fts.c.rowid == literal_column(f"{table_name}.rowid"))
+            .where(literal_column(fts.name).op("MATCH")(fts5_query(query)))
+            .order_by(fts.c.rank)
+        )
+    matches = [text_column.ilike(f"%{token}%") for tokens in terms for token in tokens]
+    hits = sum((case((match, 1), else_=0) for match in matches), literal_column("0"))
+    return stmt.where(or_(*matches)).order_by(hits.desc())
+
+
+def _ensure_fts5(connection: Connection) -> bool:
+    try:
+        connection.execute(text("CREATE VIRTUAL TABLE IF NOT EXISTS temp.fts5_probe USING fts5(x)"))
+        connection.execute(text("DROP TABLE temp.fts5_probe"))
+    except Exception:
+        logger.warning("SQLite FTS5 unavailable, lexical search falls back to LIKE")
+        return False
+    for table_name, text_column in FULLTEXT_TABLES.items():
+        fts_name = f"{table_name}_fts"
+        exists = connection.execute(
+            text("SELECT count(*) FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": fts_name}
+        ).scalar_one()
+        if exists:
+            continue
+        connection.execute(
+            text(
+                f"CREATE VIRTUAL TABLE {fts_name} USING fts5({text_column}, content='{table_name}', "
+                "content_rowid='rowid', tokenize='unicode61 remove_diacritics 2')"
+            )
+        )
+        connection.execute(
+            text(
+                f"CREATE TRIGGER IF NOT EXISTS {fts_name}_ai AFTER INSERT ON {table_name} BEGIN "
+                f"INSERT INTO {fts_name}(rowid, {text_column}) VALUES (new.rowid, new.{text_column}); END"
+            )
+        )
+        connection.execute(
+            text(
+                f"CREATE TRIGGER IF NOT EXISTS {fts_name}_ad AFTER DELETE ON {table_name} BEGIN "
+                f"INSERT INTO {fts_name}({fts_name}, rowid, {text_column}) "
+                f"VALUES ('delete', old.rowid, old.{text_column}); END"
+            )
+        )
+        connection.execute(
+            text(
+                f"CREATE TRIGGER IF NOT EXISTS {fts_name}_au AFTER UPDATE OF {text_column} ON {table_name} BEGIN "
+                f"INSERT INTO {fts_name}({fts_name}, rowid, {text_column}) "
+                f"VALUES ('delete', old.rowid, old.{text_column}); "
+                f"INSERT INTO {fts_name}(rowid, {text_column}) VALUES (new.rowid, new.{text_column}); END"
+            )
+        )
+        connection.execute(text(f"INSERT INTO {fts_name}({fts_name}) VALUES ('rebuild')"))
+    return True
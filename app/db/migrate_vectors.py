@@ -0,0 +1,88 @@
+"""Rewrite non-Postgres embedding columns into the binary ``VectorType`` format.
+
+Usage::
+
+    python -m app.db.migrate_vectors [--reencode] [--batch-size 500]
+
+By default only legacy JSON text rows are converted; ``--reencode`` also
+rewrites binary rows into the current ``VECTOR_STORAGE_ENCODING``. Rows keep
+their ``updated_at`` so in-memory indexes do not reload. SQLite only.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+from typing import Dict, Sequence
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from app.core.config import get_settings
+from app.db.types import VECTOR_ENCODINGS, decode_vector, encode_vector
+
+logger = logging.getLogger(__name__)
+
+VECTOR_COLUMNS: Dict[str, str] = {
+    "memory_notes": "embedding",
+    "rag_documents": "embedding",
+}
+
+
+def migrate_vectors(engine: Engine, encoding: str, *, reencode: bool = False, batch_size: int = 500) -> Dict[str, int]:
+    """Convert rows table by table in batches; returns the number of rows rewritten per table."""
+
+    if engine.dialect.name != "sqlite":
+        raise ValueError("Vector storage migration only applies to SQLite")
+    tag = VECTOR_ENCODINGS[encoding]
+    converted: Dict[str, int] = {}
+    for table, column in VECTOR_COLUMNS.items():
+        pending = f"typeof({column}) = 'text'"
+        if reencode:
+            pending += f" OR (typeof({column}) = 'blob' AND substr({column}, 1, 1) != char({tag}))"
+        select_batch = text(f"SELECT rowid, {column} FROM {table} WHERE rowid > :after AND ({pending}) ORDER BY rowid LIMIT :n")
+        update = text(f"UPDATE {table} SET {column} = :blob WHERE rowid = :rowid")
+        count = 0
+        after = 0
+        while True:
+            with engine.begin() as connection:
+                rows = connection.execute(select_batch, {"after": after, "n": batch_size}).all()
+                if not rows:
+                    break
+                updates = []
+                for rowid, value in rows:
+                    vector = json.loads(value) if isinstance(value, str) else decode_vector(value)
+                    updates.append({"rowid": rowid, "blob": encode_vector(vector, encoding)})
+                connection.execute(update, updates)
+            after = rows[-1][0]
+            count += len(rows)
+        converted[table] = count
+        logger.info("Migrated vector rows", extra={"table": table, "rows": count})
+    return converted
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description="Convert stored embeddings to the binary VectorType format")
+    parser.add_argument("--encoding", choices=sorted(VECTOR_ENCODINGS), default=settings.vector_storage_encoding)
+    parser.add_argument("--reencode", action="store_true", help="Also rewrite binary rows in another encoding")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--vacuum", action="store_true", help="Reclaim the freed space afterwards")
+    args = parser.parse_args(argv)
+
+    from app.db.fulltext import rebuild_fulltext_indexes
+    from app.db.session import get_engine
+
+    logging.basicConfig(level=logging.INFO, format="[%(asctime)s] %(levelname)s %(name)s: %(message)s")
+    engine = get_engine()
+    for table, count in migrate_vectors(engine, args.encoding, reencode=args.reencode, batch_size=args.batch_size).items():
+        print(f"{table}: {count} rows rewritten")
+    if args.vacuum:
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+            connection.execute(text("VACUUM"))
+        rebuild_fulltext_indexes(engine)
+
+
+if __name__ == "__main__":
+    main()
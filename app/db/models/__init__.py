@@ -1,2 +1,2 @@
-from app.db.models.memory import MemoryNote  # noqa: F401
+from app.db.models.memory import MemoryNote, MemoryNoteBucket  # noqa: F401
 from app.db.models.rag import RAGDocument  # noqa: F401
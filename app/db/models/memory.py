@@ -3,7 +3,7 @@ from __future__ import annotations
 from datetime import datetime
 from typing import Any
 
-from sqlalchemy import DateTime, Index, String, Text
+from sqlalchemy import BigInteger, DateTime, Index, LargeBinary, String, Text, types
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped, mapped_column
 
@@ -19,6 +19,9 @@ class MemoryNote(Base):
     __tablename__ = "memory_notes"
     __table_args__ = (
         Index("ix_memory_notes_created_at", "created_at"),
+        Index("ix_memory_notes_updated_at_note_id", "updated_at", "note_id"),
+        Index("ix_memory_notes_user_updated_at", "user", "updated_at", "note_id"),
+        Index("ix_memory_notes_agent_updated_at", "agent", "updated_at", "note_id"),
         Index("ix_memory_notes_tags", "tags", postgresql_using="gin"),
     )
 
@@ -26,14 +29,28 @@ class MemoryNote(Base):
     user: Mapped[str] = mapped_column(String(64))
     agent: Mapped[str] = mapped_column(String(64))
     text: Mapped[str] = mapped_column(Text())
-    tags: Mapped[list[str]] = mapped_column(JSONB(), default=list)
-    payload: Mapped[dict[str, Any]] = mapped_column(JSONB(), default=dict)
+    tags: Mapped[list[str]] = mapped_column(JSONB().with_variant(types.JSON(), "sqlite"), default=list)
+    payload: Mapped[dict[str, Any]] = mapped_column(JSONB().with_variant(types.JSON(), "sqlite"), default=dict)
     embedding: Mapped[list[float] | None] = mapped_column(
-        VectorType(settings.embedding_vector_dimension), nullable=True
+        VectorType(settings.embedding_vector_dimension, as_list=False, encoding=settings.vector_storage_encoding),
+        nullable=True,
+        deferred=True,
     )
+    embedding_model: Mapped[str | None] = mapped_column(String(128), nullable=True)
+    minhash: Mapped[bytes | None] = mapped_column(LargeBinary(), nullable=True, deferred=True)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True))
     updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True))
 
 
-__all__ = ["MemoryNote"]
+class MemoryNoteBucket(Base):
+    """LSH band bucket of a note's MinHash signature (see ``app.memory.dedup``)."""
+
+    __tablename__ = "memory_note_buckets"
+    __table_args__ = (Index("ix_memory_note_buckets_note_id", "note_id"),)
+
+    bucket: Mapped[int] = mapped_column(BigInteger(), primary_key=True, autoincrement=False)
+    note_id: Mapped[str] = mapped_column(String(64), primary_key=True)
+
+
+__all__ = ["MemoryNote", "MemoryNoteBucket"]
 
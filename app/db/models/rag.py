@@ -26,8 +26,12 @@ class RAGDocument(Base):
     text: Mapped[str] = mapped_column(Text())
     payload: Mapped[dict[str, Any]] = mapped_column(types.JSON(), default=dict)
     embedding: Mapped[list[float] | None] = mapped_column(
-        VectorType(settings.embedding_vector_dimension), nullable=True
+        VectorType(settings.embedding_vector_dimension, as_list=False, encoding=settings.vector_storage_encoding),
+        nullable=True,
+        deferred=True,
     )
+    embedding_model: Mapped[str | None] = mapped_column(String(128), nullable=True)
+    content_hash: Mapped[str | None] = mapped_column(String(64), nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True))
     updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True))
 
@@ -1,10 +1,38 @@
 from __future__ import annotations
 
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+
 from app.db import models  # noqa: F401  # ensures models are imported
 from app.db.base import Base
+from app.db.fulltext import ensure_fulltext_indexes
 from app.db.session import get_engine
+from app.db.vector_indexes import ensure_vector_indexes
 
 
 def init_db() -> None:
     engine = get_engine()
     Base.metadata.create_all(bind=engine)
+    add_missing_columns(engine)
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+    ensure_vector_indexes(engine)
+    ensure_fulltext_indexes(engine)
+
+
+def add_missing_columns(engine: Engine) -> list[str]:
+    """Add nullable columns introduced after a table was created; returns ``table.column`` names."""
+
+    inspector = inspect(engine)
+    added: list[str] = []
+    with engine.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing or not column.nullable:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                connection.execute(text(f'ALTER TABLE {table.name} ADD COLUMN "{column.name}" {column_type}'))
+                added.append(f"{table.name}.{column.name}")
+    return added
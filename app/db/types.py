@@ -1,8 +1,10 @@
 from __future__ import annotations
 
 import json
-from typing import Iterable, Sequence
+import struct
+from typing import Sequence
 
+import numpy as np
 from sqlalchemy import types
 from sqlalchemy.types import TypeDecorator
 
@@ -11,47 +13,90 @@ try:  # pragma: no cover - optional dependency branch
 except Exception:  # pragma: no cover - testing without pgvector
     PgVector = None
 
+# First byte of a binary vector; int8 vectors carry a float32 scale after it.
+VECTOR_ENCODINGS = {"float32": 1, "float16": 2, "int8": 3}
+_SCALE = struct.Struct("<f")
+
+
+def encode_vector(vector: Sequence[float] | np.ndarray, encoding: str = "float32") -> bytes:
+    """Little-endian binary form of ``vector`` in the given encoding."""
+
+    array = np.asarray(vector, dtype=np.float32)
+    tag = bytes([VECTOR_ENCODINGS[encoding]])
+    if encoding == "float32":
+        return tag + array.astype("<f4", copy=False).tobytes()
+    if encoding == "float16":
+        return tag + array.astype("<f2").tobytes()
+    peak = float(np.max(np.abs(array))) if array.size else 0.0
+    scale = peak / 127.0 if peak > 0 else 1.0
+    quantized = np.clip(np.rint(array / scale), -127, 127).astype(np.int8)
+    return tag + _SCALE.pack(scale) + quantized.tobytes()
+
+
+def decode_vector(blob: bytes | memoryview) -> np.ndarray:
+    """Decode a binary vector; float32 payloads are returned as a read-only view."""
+
+    tag = blob[0]
+    if tag == VECTOR_ENCODINGS["float32"]:
+        return np.frombuffer(blob, dtype="<f4", offset=1)
+    if tag == VECTOR_ENCODINGS["float16"]:
+        return np.frombuffer(blob, dtype="<f2", offset=1).astype(np.float32)
+    if tag == VECTOR_ENCODINGS["int8"]:
+        (scale,) = _SCALE.unpack_from(blob, 1)
+        return np.frombuffer(blob, dtype=np.int8, offset=1 + _SCALE.size).astype(np.float32) * np.float32(scale)
+    raise ValueError(f"Unknown vector encoding tag {tag}")
+
 
 class VectorType(TypeDecorator):
-    """Hybrid vector column supporting pgvector and JSON fallback."""
+    """Hybrid vector column: pgvector on Postgres, compact binary elsewhere.
+
+    Non-Postgres rows are stored as tagged little-endian bytes (``encoding`` is
+    float32, float16 or int8 with a scale). Legacy JSON text rows are still
+    read; ``python -m app.db.migrate_vectors`` rewrites them. With
+    ``as_list=False`` reads return float32 NumPy arrays, as pgvector does.
+    """
 
     cache_ok = True
-    impl = types.JSON()
+    impl = types.LargeBinary()
+
+    class comparator_factory(TypeDecorator.Comparator):  # noqa: N801 - SQLAlchemy hook name
+        def cosine_distance(self, other):
+            return self.op("<=>", return_type=types.Float())(other)
 
-    def __init__(self, dimensions: int, *, as_list: bool = True, **kwargs) -> None:
+    def __init__(self, dimensions: int, *, as_list: bool = True, encoding: str = "float32", **kwargs) -> None:
         super().__init__(**kwargs)
+        if encoding not in VECTOR_ENCODINGS:
+            raise ValueError(f"Unknown vector encoding {encoding!r}")
         self.dimensions = dimensions
         self.as_list = as_list
+        self.encoding = encoding
         self._pg_vector = PgVector(dimensions) if PgVector else None
 
     def load_dialect_impl(self, dialect):  # type: ignore[override]
         if self._pg_vector and dialect.name == "postgresql":
             return dialect.type_descriptor(self._pg_vector)
-        return dialect.type_descriptor(types.JSON())
+        return dialect.type_descriptor(types.LargeBinary())
 
     def process_bind_param(self, value, dialect):  # type: ignore[override]
         if value is None:
             return None
-        as_list = list(value) if not isinstance(value, list) else value
-        self._validate_dimensions(as_list)
+        self._validate_dimensions(value)
         if self._pg_vector and dialect.name == "postgresql":
-            return as_list
-        return as_list
+            return value
+        return encode_vector(value, self.encoding)
 
     def process_result_value(self, value, dialect):  # type: ignore[override]
         if value is None:
             return None
-        if isinstance(value, str):
-            as_list = json.loads(value)
-        elif isinstance(value, Sequence):
-            as_list = list(value)
+        if isinstance(value, (bytes, memoryview)):
+            vector = decode_vector(value)
+        elif isinstance(value, str):
+            vector = np.asarray(json.loads(value), dtype=np.float32)
         else:
-            as_list = value
-        if len(as_list) != self.dimensions:
-            return list(as_list)
-        return list(as_list)
+            vector = np.asarray(value, dtype=np.float32)
+        return vector.tolist() if self.as_list else vector
 
-    def _validate_dimensions(self, vector: Sequence[float]) -> None:
+    def _validate_dimensions(self, vector: Sequence[float] | np.ndarray) -> None:
         if self.dimensions and len(vector) != self.dimensions:
             raise ValueError(f"Vector dimension mismatch: expected {self.dimensions}, got {len(vector)}")
 
@@ -0,0 +1,309 @@
+"""pgvector ANN indexes on the embedding columns (Postgres only).
+
+``ensure_vector_indexes`` creates one HNSW or IVFFlat index with
+``vector_cosine_ops`` per table and recreates it when the configured method or
+parameters change. ``apply_search_settings`` sets ``hnsw.ef_search`` /
+``ivfflat.probes`` for the current transaction before a vector query (sized
+for the requested limit, with iterative scans so WHERE filters applied after
+the index do not starve the result), and
+``nearest_neighbours_many`` answers several probes in one LATERAL statement.
+
+Report with ``python -m app.db.vector_indexes report [--rebuild]``: index size,
+build time (when rebuilt) and recall@k against an exact scan.
+"""
+
+from __future__ import annotations
+
+import argparse
+from dataclasses import dataclass
+import logging
+import re
+import time
+from typing import Any, Dict, List, Sequence
+
+from sqlalchemy import Integer, Select, cast, column, select, text, true, values
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+from app.core.config import Settings, get_settings
+
+logger = logging.getLogger(__name__)
+
+VECTOR_TABLES: Dict[str, str] = {
+    "memory_notes": "embedding",
+    "rag_documents": "embedding",
+}
+
+INDEX_METHODS = ("hnsw", "ivfflat")
+
+# pgvector releases that support hnsw/ivfflat.iterative_scan.
+ITERATIVE_SCAN_VERSION = (0, 8, 0)
+# hnsw.ef_search upper bound enforced by pgvector.
+MAX_EF_SEARCH = 1000
+
+_iterative_scan_support: Dict[str, bool] = {}
+
+
+@dataclass
+class VectorIndexReport:
+    table: str
+    index: str | None
+    method: str | None
+    size_bytes: int = 0
+    rows: int = 0
+    build_seconds: float | None = None
+    recall: float | None = None
+    ann_ms: float | None = None
+    exact_ms: float | None = None
+
+
+def index_name(table: str, method: str) -> str:
+    return f"ix_{table}_embedding_{method}"
+
+
+def index_options(settings: Settings) -> Dict[str, int]:
+    if settings.pgvector_index_method == "hnsw":
+        return {"m": settings.pgvector_hnsw_m, "ef_construction": settings.pgvector_hnsw_ef_construction}
+    return {"lists": settings.pgvector_ivfflat_lists}
+
+
+def create_index_sql(table: str, embedding_col: str, settings: Settings) -> str:
+    method = settings.pgvector_index_method
+    options = ", ".join(f"{key} = {int(value)}" for key, value in index_options(settings).items())
+    return (
+        f"CREATE INDEX IF NOT EXISTS {index_name(table, method)} ON {table} "
+        f"USING {method} ({embedding_col} vector_cosine_ops) WITH ({options})"
+    )
+
+
+def ensure_vector_indexes(engine: Engine, settings: Settings | None = None, *, rebuild: bool = False) -> Dict[str, float]:
+    """Create missing ANN indexes; returns build seconds per index created."""
+
+    settings = settings or get_settings()
+    method = settings.pgvector_index_method
+    if engine.dialect.name != "postgresql" or method == "none":
+        return {}
+    if method not in INDEX_METHODS:
+        raise ValueError(f"Unknown pgvector_index_method {method!r}")
+
+    expected = {key: str(int(value)) for key, value in index_options(settings).items()}
+    built: Dict[str, float] = {}
+    with engine.begin() as connection:
+        connection.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
+        for table, embedding_col in VECTOR_TABLES.items():
+            name = index_name(table, method)
+            up_to_date = False
+            for existing, options in _existing_indexes(connection, table).items():
+                if existing == name and options == expected and not rebuild:
+                    up_to_date = True
+                    continue
+                logger.info("Dropping vector index", extra={"index": existing})
+                connection.execute(text(f"DROP INDEX IF EXISTS {existing}"))
+            if up_to_date:
+                continue
+            if method == "ivfflat":
+                connection.execute(text(f"ANALYZE {table}"))
+            started = time.perf_counter()
+            connection.execute(text(create_index_sql(table, embedding_col, settings)))
+            built[name] = time.perf_counter() - started
+            logger.info("Built vector index", extra={"index": name, "seconds": round(built[name], 3)})
+    return built
+
+
+def apply_search_settings(session: Session, settings: Settings | None = None, *, limit: int | None = None) -> None:
+    """Tune the ANN scan for the current transaction (no-op outside Postgres).
+
+    WHERE filters run after the index, so on pgvector >= 0.8 the scan iterates
+    until ``limit`` rows pass them; older releases fall back to a larger
+    ``hnsw.ef_search`` or, for IVFFlat, probing every list (an exact scan).
+    """
+
+    bind = session.get_bind()
+    if not bind or bind.dialect.name != "postgresql":
+        return
+    settings = settings or get_settings()
+    method = settings.pgvector_index_method
+    if method not in INDEX_METHODS:
+        return
+    iterative = settings.pgvector_iterative_scan and supports_iterative_scan(session)
+    if method == "hnsw":
+        ef_search = int(settings.pgvector_hnsw_ef_search)
+        if limit:
+            ef_search = min(max(ef_search, limit * settings.pgvector_filter_overfetch), MAX_EF_SEARCH)
+        session.execute(text(f"SET LOCAL hnsw.ef_search = {ef_search}"))
+        if iterative:
+            session.execute(text("SET LOCAL hnsw.iterative_scan = strict_order"))
+        return
+    probes = int(settings.pgvector_ivfflat_probes)
+    if iterative:
+        session.execute(text(f"SET LOCAL ivfflat.probes = {probes}"))
+        session.execute(text("SET LOCAL ivfflat.iterative_scan = relaxed_order"))
+    else:
+        session.execute(text(f"SET LOCAL ivfflat.probes = {max(probes, int(settings.pgvector_ivfflat_lists))}"))
+
+
+def supports_iterative_scan(session: Session) -> bool:
+    """Whether the installed pgvector has ``iterative_scan`` (cached per database URL)."""
+
+    key = str(session.get_bind().url)
+    if key not in _iterative_scan_support:
+        version = session.execute(text("SELECT extversion FROM pg_extension WHERE extname = 'vector'")).scalar()
+        parts = tuple(int(part) for part in re.findall(r"\d+", version or "")[:3])
+        _iterative_scan_support[key] = parts >= ITERATIVE_SCAN_VERSION
+    return _iterative_scan_support[key]
+
+
+def nearest_neighbours_many(
+    base_stmt: Select[Any],
+    key_column: Any,
+    embedding_column: Any,
+    embeddings: Sequence[Sequence[float]],
+    limit: int,
+) -> Select[Any]:
+    """Top-``limit`` rows of ``base_stmt`` per probe as (position, key, score) rows."""
+
+    probes = values(column("position", Integer), column("embedding", embedding_column.type), name="probes").data(
+        list(enumerate(embeddings))
+    )
+    distance = embedding_column.cosine_distance(cast(probes.c.embedding, embedding_column.type))
+    nearest = (
+        base_stmt.with_only_columns(key_column.label("key"), (1 - distance).label("score"))
+        .order_by(distance.asc())
+        .limit(limit)
+        .lateral("nearest")
+    )
+    return (
+        select(probes.c.position, nearest.c.key, nearest.c.score)
+        .select_from(probes)
+        .join(nearest, true())
+        .order_by(probes.c.position, nearest.c.score.desc())
+    )
+
+
+def _existing_indexes(connection: Connection, table: str) -> Dict[str, Dict[str, str]]:
+    rows = connection.execute(
+        text(
+            """
+            SELECT c.relname, coalesce(c.reloptions, '{}')
+            FROM pg_index i
+            JOIN pg_class c ON c.oid = i.indexrelid
+            JOIN pg_class t ON t.oid = i.indrelid
+            JOIN pg_am am ON am.oid = c.relam
+            WHERE t.relname = :table AND am.amname IN ('hnsw', 'ivfflat')
+            """
+        ),
+        {"table": table},
+    ).all()
+    return {name: dict(option.split("=", 1) for option in options) for name, options in rows}
+
+
+def measure_recall(
+    engine: Engine,
+    settings: Settings,
+    table: str,
+    embedding_col: str,
+    *,
+    samples: int,
+    k: int,
+) -> tuple[float | None, float | None, float | None]:
+    """Recall@k of the ANN index against a sequential scan, using stored rows as queries."""
+
+    with engine.connect() as connection:
+        queries = [
+            row[0]
+            for row in connection.execute(
+                text(
+                    f"SELECT {embedding_col}::text FROM {table} "
+                    f"WHERE {embedding_col} IS NOT NULL ORDER BY random() LIMIT :n"
+                ),
+                {"n": samples},
+            )
+        ]
+    if not queries:
+        return None, None, None
+
+    top_k = text(f"SELECT ctid FROM {table} ORDER BY {embedding_col} <=> CAST(:q AS vector) LIMIT :k")
+    hits = expected = 0
+    ann_seconds = exact_seconds = 0.0
+    for query in queries:
+        with Session(engine) as session, session.begin():
+            apply_search_settings(session, settings, limit=k)
+            started = time.perf_counter()
+            approximate = {row[0] for row in session.execute(top_k, {"q": query, "k": k})}
+            ann_seconds += time.perf_counter() - started
+        with Session(engine) as session, session.begin():
+            session.execute(text("SET LOCAL enable_indexscan = off"))
+            started = time.perf_counter()
+            exact = {row[0] for row in session.execute(top_k, {"q": query, "k": k})}
+            exact_seconds += time.perf_counter() - started
+        hits += len(approximate & exact)
+        expected += len(exact)
+    count = len(queries)
+    return hits / max(expected, 1), ann_seconds / count * 1000.0, exact_seconds / count * 1000.0
+
+
+def report(engine: Engine, settings: Settings, *, rebuild: bool, samples: int, k: int) -> List[VectorIndexReport]:
+    built = ensure_vector_indexes(engine, settings, rebuild=rebuild)
+    reports: List[VectorIndexReport] = []
+    for table, embedding_col in VECTOR_TABLES.items():
+        with engine.connect() as connection:
+            current = _existing_indexes(connection, table)
+            rows = connection.execute(text(f"SELECT count(*) FROM {table}")).scalar_one()
+            name = next(iter(current), None)
+            size = (
+                connection.execute(text("SELECT pg_relation_size(CAST(:name AS regclass))"), {"name": name}).scalar_one()
+                if name
+                else 0
+            )
+        entry = VectorIndexReport(
+            table=table,
+            index=name,
+            method=name.rsplit("_", 1)[-1] if name else None,
+            size_bytes=int(size),
+            rows=int(rows),
+            build_seconds=built.get(name) if name else None,
+        )
+        if name:
+            entry.recall, entry.ann_ms, entry.exact_ms = measure_recall(
+                engine, settings, table, embedding_col, samples=samples, k=k
+            )
+        reports.append(entry)
+    return reports
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Manage pgvector ANN indexes")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("ensure", help="Create or update the indexes from settings")
+    report_parser = commands.add_parser("report", help="Index size, build time and recall@k")
+    report_parser.add_argument("--rebuild", action="store_true", help="Drop and rebuild to time the build")
+    report_parser.add_argument("--samples", type=int, default=50)
+    report_parser.add_argument("-k", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    from app.db.session import get_engine
+
+    logging.basicConfig(level=logging.INFO, format="[%(asctime)s] %(levelname)s %(name)s: %(message)s")
+    settings = get_settings()
+    engine = get_engine()
+    if engine.dialect.name != "postgresql":
+        parser.error("ANN indexes are only managed on PostgreSQL")
+    if args.command == "ensure":
+        for name, seconds in ensure_vector_indexes(engine, settings).items():
+            print(f"{name}: built in {seconds:.2f}s")
+        return
+
+    print(f"{'table':<15}{'index':<34}{'rows':>9}{'size MB':>9}{'build s':>9}{'recall':>8}{'ann ms':>8}{'exact ms':>10}")
+    for entry in report(engine, settings, rebuild=args.rebuild, samples=args.samples, k=args.k):
+        build = f"{entry.build_seconds:.2f}" if entry.build_seconds is not None else "-"
+        recall = f"{entry.recall:.3f}" if entry.recall is not None else "-"
+        ann_ms = f"{entry.ann_ms:.2f}" if entry.ann_ms is not None else "-"
+        exact_ms = f"{entry.exact_ms:.2f}" if entry.exact_ms is not None else "-"
+        print(
+            f"{entry.table:<15}{entry.index or '-':<34}{entry.rows:>9}{entry.size_bytes / 1e6:>9.1f}"
+            f"{build:>9}{recall:>8}{ann_ms:>8}{exact_ms:>10}"
+        )
+
+
+if __name__ == "__main__":
+    main()
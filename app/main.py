@@ -3,9 +3,13 @@ from __future__ import annotations
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse
 
 from app.core.config import get_settings
+from app.core.metrics import get_metrics_registry
+from app.db.session import ping_database
 from app.db.setup import init_db
+from app.dependencies import get_memory_service
 from app.routes.bus import router as bus_router
 from app.routes.correction import router as correction_router
 from app.routes.files import router as files_router
@@ -16,12 +20,20 @@ from app.routes.n8n import router as n8n_router
 from app.routes.rag import router as rag_router
 from app.routes.zep import router as zep_router
 from app.routes.mcp_bridge import router as mcp_bridge_router
+from app.vector.embedding import get_embedding_service, start_warmup
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     init_db()
-    yield
+    if get_settings().embedding_warmup_enabled:
+        app.state.embedding_warmup = start_warmup()
+    memory_service = app.dependency_overrides.get(get_memory_service, get_memory_service)()
+    memory_service.recover_archives()
+    try:
+        yield
+    finally:
+        memory_service.close()
 
 
 def create_app() -> FastAPI:
@@ -33,6 +45,23 @@ def create_app() -> FastAPI:
     def health_check() -> dict[str, str]:
         return {"status": "ok", "message": "SENTRA API active"}
 
+    @app.get("/ready", include_in_schema=False)
+    def readiness_check() -> JSONResponse:
+        checks = {
+            "database": ping_database(),
+            # Without warmup the model loads on first use, so it is never "starting".
+            "embedding": get_embedding_service().is_ready or not get_settings().embedding_warmup_enabled,
+        }
+        ready = all(checks.values())
+        return JSONResponse(
+            status_code=200 if ready else 503,
+            content={"status": "ready" if ready else "starting", "checks": checks},
+        )
+
+    @app.get("/metrics", include_in_schema=False)
+    def metrics() -> dict:
+        return get_metrics_registry().snapshot()
+
     app.include_router(files_router)
     app.include_router(memory_router)
     app.include_router(n8n_router)
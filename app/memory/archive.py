@@ -0,0 +1,235 @@
+"""Background writer for the archives of memory notes.
+
+``ArchiveWriter.submit`` appends the archive payload to a spool file (one JSON
+line, flushed to the OS and optionally fsynced) and queues it; a dedicated
+thread drains the bounded queue and appends each batch as one block of the
+packed segments (``app.memory.packs``). When every spooled archive has been
+written the spool is truncated, so it only ever holds the in-flight tail; if a
+batch failed the spool is released instead, left for ``recover``, and the next
+submit starts a new one. Each writer owns its spool under an exclusive
+``flock``; ``recover`` replays spools whose owner is gone (a crashed process)
+and deletes them. When the queue is full the caller writes the archive itself.
+"""
+
+from __future__ import annotations
+
+from contextlib import suppress
+import json
+import logging
+import os
+from pathlib import Path
+import queue
+import threading
+from typing import Any, Dict, List
+import uuid
+
+from app.core.config import Settings
+from app.core.metrics import get_metrics_registry
+from app.memory.domain import MemoryNoteDTO
+from app.memory.packs import PackedArchive
+
+try:  # pragma: no cover - POSIX only
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None  # type: ignore[assignment]
+
+logger = logging.getLogger(__name__)
+
+SPOOL_DIRNAME = ".spool"
+
+
+def archive_payload(note: MemoryNoteDTO) -> Dict[str, Any]:
+    return {
+        "note_id": note.note_id,
+        "user": note.user,
+        "agent": note.agent,
+        "text": note.text,
+        "tags": note.tags,
+        "metadata": note.metadata,
+        "created_at": note.created_at.isoformat(),
+        "updated_at": note.updated_at.isoformat(),
+    }
+
+
+class ArchiveWriter:
+    def __init__(
+        self,
+        archive_dir: Path,
+        *,
+        asynchronous: bool = True,
+        max_queue: int = 10000,
+        batch_size: int = 64,
+        fsync: bool = False,
+        segment_bytes: int = 64 << 20,
+        block_bytes: int = 256 << 10,
+    ) -> None:
+        self._spool_dir = archive_dir / SPOOL_DIRNAME
+        self._asynchronous = asynchronous
+        self._batch_size = max(1, batch_size)
+        self._fsync = fsync
+        self._queue: "queue.Queue[Dict[str, Any] | None]" = queue.Queue(maxsize=max(1, max_queue))
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._pending = 0
+        self._written = 0
+        self._overflow = 0
+        self._failed = 0
+        self._spool_failed = False
+        self._spool: Any = None
+        self._spool_path: Path | None = None
+        self._thread: threading.Thread | None = None
+        self.packs = PackedArchive(archive_dir, segment_bytes=segment_bytes, block_bytes=block_bytes, fsync=fsync)
+
+    def submit(self, note: MemoryNoteDTO) -> None:
+        payload = archive_payload(note)
+        if not self._asynchronous:
+            self.packs.append([payload])
+            return
+        line = (json.dumps(payload, ensure_ascii=False) + "\n").encode("utf-8")
+        with self._lock:
+            spool = self._open_spool()
+            spool.write(line)
+            spool.flush()
+            if self._fsync:
+                os.fsync(spool.fileno())
+            self._pending += 1
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait(payload)
+        except queue.Full:
+            with self._lock:
+                self._overflow += 1
+            self._write_batch([payload])
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Wait until every submitted archive is on disk; False on timeout."""
+
+        with self._idle:
+            return self._idle.wait_for(lambda: self._pending == 0, timeout=timeout)
+
+    def close(self, timeout: float | None = 30.0) -> None:
+        """Drain the queue and seal the current segment."""
+
+        flushed = self.flush(timeout)
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join(timeout=5)
+        with self._lock:
+            if self._spool is not None:
+                spool, self._spool = self._spool, None
+                spool.close()
+                if flushed and self._spool_path is not None:
+                    with suppress(FileNotFoundError):
+                        self._spool_path.unlink()
+        if flushed:
+            self.packs.close()
+
+    def recover(self) -> int:
+        """Write archives left in spools of dead writers; returns how many were missing."""
+
+        if not self._spool_dir.exists():
+            return 0
+        recovered = 0
+        for path in sorted(self._spool_dir.glob("*.jsonl")):
+            if path == self._spool_path:
+                continue
+            with open(path, "rb") as handle:
+                if fcntl is not None:
+                    try:
+                        fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    except OSError:
+                        continue
+                payloads = []
+                for line in handle:
+                    try:
+                        payloads.append(json.loads(line))
+                    except ValueError:
+                        continue  # torn last line: the note was never acknowledged
+                recovered += self.packs.append(payloads)
+                path.unlink()
+        if recovered:
+            logger.info("Recovered spooled memory archives", extra={"archives": recovered})
+        return recovered
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "queue_depth": self._queue.qsize(),
+                "pending": self._pending,
+                "written": self._written,
+                "overflow": self._overflow,
+                "failed": self._failed,
+            }
+
+    def _open_spool(self) -> Any:
+        if self._spool is None:
+            self._spool_dir.mkdir(parents=True, exist_ok=True)
+            self._spool_path = self._spool_dir / f"{os.getpid()}-{uuid.uuid4().hex[:8]}.jsonl"
+            self._spool = open(self._spool_path, "ab")
+            if fcntl is not None:
+                fcntl.flock(self._spool.fileno(), fcntl.LOCK_EX)
+        return self._spool
+
+    def _ensure_thread(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="memory-archive-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = [first]
+            stopping = False
+            while len(batch) < self._batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._write_batch(batch)
+            if stopping:
+                return
+
+    def _write_batch(self, batch: List[Dict[str, Any]]) -> None:
+        failed = 0
+        try:
+            self.packs.append(batch)
+        except Exception:
+            failed = len(batch)
+            logger.exception("Failed to write %d memory archives", failed)
+        with self._idle:
+            self._written += len(batch) - failed
+            self._failed += failed
+            self._spool_failed = self._spool_failed or failed > 0
+            self._pending -= len(batch)
+            if self._pending == 0:
+                if self._spool is not None and self._spool_failed:
+                    spool, self._spool = self._spool, None
+                    spool.close()
+                elif self._spool is not None:
+                    self._spool.truncate(0)
+                self._spool_failed = False
+                self._idle.notify_all()
+
+
+def create_archive_writer(settings: Settings, archive_dir: Path) -> ArchiveWriter:
+    writer = ArchiveWriter(
+        archive_dir,
+        asynchronous=settings.memory_archive_async,
+        max_queue=settings.memory_archive_queue_size,
+        batch_size=settings.memory_archive_batch_size,
+        fsync=settings.memory_archive_spool_fsync,
+        segment_bytes=settings.memory_archive_segment_bytes,
+        block_bytes=settings.memory_archive_block_bytes,
+    )
+    get_metrics_registry().register_collector("memory_archive_writer", writer.stats)
+    return writer
@@ -0,0 +1,282 @@
+"""Near-duplicate detection for memory notes with MinHash signatures and LSH.
+
+Each note stores a 128-value MinHash signature of its lowercased word set
+(``memory_notes.minhash``) and one bucket per LSH band (16 bands of 8 rows)
+in ``memory_note_buckets``. Notes sharing a bucket are candidates; the
+estimated Jaccard similarity of their signatures is compared against
+``MEMORY_DEDUP_THRESHOLD``. Only notes of the same user and agent are
+compared. With ``MEMORY_DEDUP_MODE=off`` inserts skip both.
+
+Deduplicate an existing table with::
+
+    python -m app.memory.dedup [--dry-run] [--threshold 0.8]
+
+Signatures are backfilled first; notes are then replayed in creation order and
+each near-duplicate is merged into the earliest similar note of the same user
+and agent (tags unioned, latest ``updated_at`` kept) and deleted.
+"""
+
+from __future__ import annotations
+
+import argparse
+from collections import defaultdict
+from dataclasses import dataclass
+from hashlib import blake2b
+import logging
+import re
+from typing import Dict, Iterable, List, Sequence
+
+import numpy as np
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.db.models.memory import MemoryNote as MemoryNoteModel, MemoryNoteBucket
+
+logger = logging.getLogger(__name__)
+
+NUM_PERM = 128
+LSH_BANDS = 16
+ROWS_PER_BAND = NUM_PERM // LSH_BANDS
+
+_TOKEN = re.compile(r"\w+")
+_MERSENNE = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+
+def _permutation(seed: int) -> int:
+    return int.from_bytes(blake2b(f"minhash-{seed}".encode(), digest_size=4).digest(), "little")
+
+
+# Token hashes and coefficients stay below 2**32 so ``a * x + b`` never wraps in uint64.
+_A = np.array([_permutation(2 * index) | 1 for index in range(NUM_PERM)], dtype=np.uint64)
+_B = np.array([_permutation(2 * index + 1) for index in range(NUM_PERM)], dtype=np.uint64)
+
+
+def minhash_signature(text: str) -> np.ndarray | None:
+    """MinHash of the lowercased word set, or ``None`` for text without words."""
+
+    tokens = {token.lower() for token in _TOKEN.findall(text)}
+    if not tokens:
+        return None
+    hashed = np.fromiter(
+        (int.from_bytes(blake2b(token.encode("utf-8"), digest_size=4).digest(), "little") for token in tokens),
+        dtype=np.uint64,
+        count=len(tokens),
+    )
+    permuted = ((hashed[:, None] * _A + _B) % _MERSENNE) & _MAX_HASH
+    return permuted.min(axis=0).astype(np.uint32)
+
+
+def signature_bytes(signature: np.ndarray) -> bytes:
+    return signature.astype("<u4", copy=False).tobytes()
+
+
+def signature_from_bytes(blob: bytes | memoryview) -> np.ndarray:
+    return np.frombuffer(blob, dtype="<u4")
+
+
+def lsh_buckets(signature: np.ndarray) -> List[int]:
+    """One signed 64-bit bucket key per band."""
+
+    rows = signature.astype("<u4", copy=False).reshape(LSH_BANDS, ROWS_PER_BAND)
+    return [
+        int.from_bytes(blake2b(bytes([band]) + rows[band].tobytes(), digest_size=8).digest(), "little", signed=True)
+        for band in range(LSH_BANDS)
+    ]
+
+
+def jaccard_estimate(signature: np.ndarray, others: np.ndarray) -> np.ndarray:
+    """Estimated Jaccard similarity of ``signature`` with each row of ``others``."""
+
+    return np.mean(np.asarray(others) == signature, axis=-1)
+
+
+def bucket_rows(note_id: str, signature: np.ndarray | None) -> List[Dict[str, object]]:
+    if signature is None:
+        return []
+    return [{"bucket": bucket, "note_id": note_id} for bucket in lsh_buckets(signature)]
+
+
+def merge_tags(tag_lists: Iterable[Sequence[str] | None]) -> List[str]:
+    return list(dict.fromkeys(tag for tags in tag_lists for tag in tags or []))
+
+
+def find_near_duplicates(
+    session: Session,
+    signatures: Sequence[np.ndarray | None],
+    threshold: float,
+    *,
+    user: str,
+    agent: str,
+) -> List[str | None]:
+    """Most similar stored note of ``user``/``agent`` per signature (``None`` below ``threshold``)."""
+
+    buckets = {index: lsh_buckets(signature) for index, signature in enumerate(signatures) if signature is not None}
+    wanted = {bucket for keys in buckets.values() for bucket in keys}
+    if not wanted:
+        return [None] * len(signatures)
+    candidates: Dict[int, set[str]] = defaultdict(set)
+    for bucket, note_id in session.execute(
+        select(MemoryNoteBucket.bucket, MemoryNoteBucket.note_id)
+        .join(MemoryNoteModel, MemoryNoteModel.note_id == MemoryNoteBucket.note_id)
+        .where(MemoryNoteBucket.bucket.in_(wanted), MemoryNoteModel.user == user, MemoryNoteModel.agent == agent)
+    ):
+        candidates[bucket].add(note_id)
+    note_ids = {note_id for ids in candidates.values() for note_id in ids}
+    stored = {
+        note_id: signature_from_bytes(blob)
+        for note_id, blob in session.execute(
+            select(MemoryNoteModel.note_id, MemoryNoteModel.minhash).where(MemoryNoteModel.note_id.in_(note_ids))
+        )
+        if blob is not None
+    }
+    matches: List[str | None] = [None] * len(signatures)
+    for index, keys in buckets.items():
+        ids = sorted({note_id for bucket in keys for note_id in candidates.get(bucket, ()) if note_id in stored})
+        if not ids:
+            continue
+        scores = jaccard_estimate(signatures[index], np.stack([stored[note_id] for note_id in ids]))
+        best = int(np.argmax(scores))
+        if scores[best] >= threshold:
+            matches[index] = ids[best]
+    return matches
+
+
+@dataclass
+class DedupReport:
+    signed: int = 0
+    merged: int = 0
+    canonical: int = 0
+
+
+def backfill_signatures(engine: Engine, *, batch_size: int = 500) -> int:
+    """Compute missing signatures and buckets; returns the number of notes signed."""
+
+    signed = 0
+    after = ""
+    while True:
+        with Session(engine) as session, session.begin():
+            rows = session.execute(
+                select(MemoryNoteModel.note_id, MemoryNoteModel.text)
+                .where(MemoryNoteModel.minhash.is_(None), MemoryNoteModel.note_id > after)
+                .order_by(MemoryNoteModel.note_id)
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                break
+            signatures = [(note_id, minhash_signature(text)) for note_id, text in rows]
+            signatures = [(note_id, signature) for note_id, signature in signatures if signature is not None]
+            if signatures:
+                session.execute(
+                    update(MemoryNoteModel),
+                    [{"note_id": note_id, "minhash": signature_bytes(signature)} for note_id, signature in signatures],
+                )
+                session.execute(
+                    delete(MemoryNoteBucket).where(MemoryNoteBucket.note_id.in_([note_id for note_id, _ in signatures]))
+                )
+                session.execute(
+                    insert(MemoryNoteBucket),
+                    [row for note_id, signature in signatures for row in bucket_rows(note_id, signature)],
+                )
+                signed += len(signatures)
+        after = rows[-1][0]
+    return signed
+
+
+def deduplicate(
+    engine: Engine, *, threshold: float | None = None, dry_run: bool = False, batch_size: int = 500
+) -> DedupReport:
+    """Merge near-duplicate notes into the earliest similar note of the same owner; ``dry_run`` skips the backfill."""
+
+    threshold = get_settings().memory_dedup_threshold if threshold is None else threshold
+    report = DedupReport(signed=0 if dry_run else backfill_signatures(engine, batch_size=batch_size))
+    with Session(engine) as session:
+        shared = select(MemoryNoteBucket.bucket).group_by(MemoryNoteBucket.bucket).having(func.count() > 1)
+        neighbours: Dict[str, set[str]] = defaultdict(set)
+        members: Dict[int, List[str]] = defaultdict(list)
+        for bucket, note_id in session.execute(
+            select(MemoryNoteBucket.bucket, MemoryNoteBucket.note_id).where(MemoryNoteBucket.bucket.in_(shared))
+        ):
+            members[bucket].append(note_id)
+        for note_ids in members.values():
+            for note_id in note_ids:
+                neighbours[note_id].update(note_ids)
+        if not neighbours:
+            return report
+        notes = session.execute(
+            select(
+                MemoryNoteModel.note_id,
+                MemoryNoteModel.user,
+                MemoryNoteModel.agent,
+                MemoryNoteModel.minhash,
+                MemoryNoteModel.tags,
+                MemoryNoteModel.updated_at,
+            )
+            .where(MemoryNoteModel.note_id.in_(list(neighbours)))
+            .order_by(MemoryNoteModel.created_at, MemoryNoteModel.note_id)
+        ).all()
+
+        signatures = {note.note_id: signature_from_bytes(note.minhash) for note in notes if note.minhash is not None}
+        owners = {note.note_id: (note.user, note.agent) for note in notes}
+        canonical_of: Dict[str, str] = {}
+        kept: set[str] = set()
+        for note in notes:
+            if note.note_id not in signatures:
+                continue
+            owner = owners[note.note_id]
+            earlier = sorted(other for other in neighbours[note.note_id] & kept if owners[other] == owner)
+            if earlier:
+                scores = jaccard_estimate(signatures[note.note_id], np.stack([signatures[other] for other in earlier]))
+                best = int(np.argmax(scores))
+                if scores[best] >= threshold:
+                    canonical_of[note.note_id] = earlier[best]
+                    continue
+            kept.add(note.note_id)
+
+        groups: Dict[str, List[str]] = defaultdict(list)
+        for duplicate, canonical in canonical_of.items():
+            groups[canonical].append(duplicate)
+        report.merged = len(canonical_of)
+        report.canonical = len(groups)
+        if dry_run or not groups:
+            return report
+
+        by_id = {note.note_id: note for note in notes}
+        for canonical, duplicates in groups.items():
+            group = [by_id[canonical], *(by_id[duplicate] for duplicate in duplicates)]
+            session.execute(
+                update(MemoryNoteModel)
+                .where(MemoryNoteModel.note_id == canonical)
+                .values(
+                    tags=merge_tags(note.tags for note in group),
+                    updated_at=max(note.updated_at for note in group),
+                )
+            )
+        duplicates = list(canonical_of)
+        for start in range(0, len(duplicates), batch_size):
+            chunk = duplicates[start : start + batch_size]
+            session.execute(delete(MemoryNoteBucket).where(MemoryNoteBucket.note_id.in_(chunk)))
+            session.execute(delete(MemoryNoteModel).where(MemoryNoteModel.note_id.in_(chunk)))
+        session.commit()
+    logger.info("Merged near-duplicate notes", extra={"merged": report.merged, "canonical": report.canonical})
+    return report
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Merge near-duplicate memory notes")
+    parser.add_argument("--threshold", type=float, default=None, help="Estimated Jaccard similarity (default: settings)")
+    parser.add_argument("--dry-run", action="store_true", help="Only report how many notes would be merged")
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args(argv)
+
+    from app.db.session import get_engine
+
+    logging.basicConfig(level=logging.INFO, format="[%(asctime)s] %(levelname)s %(name)s: %(message)s")
+    report = deduplicate(get_engine(), threshold=args.threshold, dry_run=args.dry_run, batch_size=args.batch_size)
+    print(f"signed: {report.signed}, merged: {report.merged} into {report.canonical} notes")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime
 from typing import Any
 
@@ -18,6 +18,34 @@ class MemoryNoteDTO:
     score: float | None = None
 
 
+@dataclass(slots=True)
+class MemoryNoteInput:
+    text: str
+    tags: list[str] = field(default_factory=list)
+    metadata: dict[str, Any] = field(default_factory=dict)
+    note_id: str | None = None
+
+
+@dataclass(frozen=True, slots=True)
+class MemoryRerank:
+    """Optional reranking of a candidate pool: recency blend, then MMR diversification."""
+
+    recency_weight: float = 0.0
+    half_life_hours: float = 168.0
+    mmr_lambda: float | None = None
+    candidates: int | None = None
+
+    @property
+    def active(self) -> bool:
+        return self.recency_weight > 0 or self.mmr_lambda is not None
+
+
+@dataclass(slots=True)
+class MemoryNotePage:
+    notes: list[MemoryNoteDTO]
+    next_cursor: str | None = None
+
+
 @dataclass(slots=True)
 class MemoryQueryResult:
     note: MemoryNoteDTO
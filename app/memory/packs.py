@@ -0,0 +1,551 @@
+"""Append-only packed segments for memory note archives.
+
+A segment is a ``<seq>.pack`` file of blocks, each ``ZMB1`` + compressed length
++ CRC32 followed by a zlib stream of length-prefixed JSON records. Its offset
+index maps ``blake2b(note_id)`` to (block offset, block length, record offset)
+in fixed 32-byte entries: ``<seq>.log`` is appended while a writer owns the
+segment (under ``flock``), ``<seq>.idx`` is the sorted copy written when the
+segment is sealed and is binary-searched through ``mmap``. Packs of writers
+that died are sealed by the next ``refresh`` from a scan of their valid
+blocks, so a torn tail only loses records whose spool entry still exists.
+
+``python -m app.memory.packs convert`` moves legacy ``<note_id>.zmem`` files
+into segments, ``compact`` rewrites sealed segments into full blocks without
+duplicates, ``stats`` prints the segment counts.
+"""
+
+from __future__ import annotations
+
+import argparse
+from dataclasses import dataclass
+import gzip
+import hashlib
+import json
+import logging
+import mmap
+import os
+from pathlib import Path
+import struct
+import threading
+from typing import Any, Dict, Iterator, List, Sequence, Tuple
+import zlib
+
+from app.core.config import get_settings
+
+try:  # pragma: no cover - POSIX only
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None  # type: ignore[assignment]
+
+logger = logging.getLogger(__name__)
+
+PACK_SUFFIX = ".pack"
+INDEX_SUFFIX = ".idx"
+LOG_SUFFIX = ".log"
+BLOCK_MAGIC = b"ZMB1"
+BLOCK_HEADER = struct.Struct(">4sII")
+RECORD_LENGTH = struct.Struct(">I")
+INDEX_ENTRY = struct.Struct(">16sQII")
+
+Location = Tuple[int, int, int]
+
+
+def note_key(note_id: str) -> bytes:
+    return hashlib.blake2b(note_id.encode("utf-8"), digest_size=16).digest()
+
+
+def _try_lock(handle: Any) -> bool:
+    if fcntl is None:
+        return True
+    try:
+        fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        return False
+    return True
+
+
+def _map(path: Path) -> mmap.mmap | None:
+    with open(path, "rb") as handle:
+        if os.fstat(handle.fileno()).st_size == 0:
+            return None
+        return mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def iter_blocks(view: Any, start: int = 0, stop: int | None = None) -> Iterator[Tuple[int, int, bytes]]:
+    """(offset, length, records) of each valid block; stops at the first torn one."""
+
+    offset = start
+    limit = len(view) if stop is None else min(stop, len(view))
+    while offset + BLOCK_HEADER.size <= limit:
+        magic, length, checksum = BLOCK_HEADER.unpack_from(view, offset)
+        end = offset + BLOCK_HEADER.size + length
+        if magic != BLOCK_MAGIC or end > limit:
+            return
+        compressed = view[offset + BLOCK_HEADER.size : end]
+        if zlib.crc32(compressed) != checksum:
+            return
+        yield offset, end - offset, zlib.decompress(compressed)
+        offset = end
+
+
+def iter_records(records: bytes) -> Iterator[Tuple[int, bytes]]:
+    offset = 0
+    while offset + RECORD_LENGTH.size <= len(records):
+        (length,) = RECORD_LENGTH.unpack_from(records, offset)
+        yield offset, records[offset + RECORD_LENGTH.size : offset + RECORD_LENGTH.size + length]
+        offset += RECORD_LENGTH.size + length
+
+
+def block_spans(path: Path, max_bytes: int) -> List[Tuple[int, int]]:
+    """Split a pack into ``[start, stop)`` runs of whole blocks of about ``max_bytes``.
+
+    Only headers are read; ``read_span`` checks the blocks themselves.
+    """
+
+    spans: List[Tuple[int, int]] = []
+    size = path.stat().st_size
+    with open(path, "rb") as handle:
+        start = offset = 0
+        while offset + BLOCK_HEADER.size <= size:
+            handle.seek(offset)
+            magic, length, _ = BLOCK_HEADER.unpack(handle.read(BLOCK_HEADER.size))
+            end = offset + BLOCK_HEADER.size + length
+            if magic != BLOCK_MAGIC or end > size:
+                break
+            offset = end
+            if offset - start >= max_bytes:
+                spans.append((start, offset))
+                start = offset
+        if offset > start:
+            spans.append((start, offset))
+    return spans
+
+
+def read_span(path: Path, start: int, stop: int) -> List[bytes]:
+    """Records of the valid blocks in ``[start, stop)`` of a pack."""
+
+    view = _map(path)
+    if view is None:
+        return []
+    with view:
+        return [record for _, _, records in iter_blocks(view, start, stop) for _, record in iter_records(records)]
+
+
+def _scan_index(path: Path) -> Dict[bytes, Location]:
+    entries: Dict[bytes, Location] = {}
+    view = _map(path)
+    if view is None:
+        return entries
+    with view:
+        for block_offset, block_length, records in iter_blocks(view):
+            for record_offset, record in iter_records(records):
+                key = note_key(json.loads(record)["note_id"])
+                entries.setdefault(key, (block_offset, block_length, record_offset))
+    return entries
+
+
+def _write_sorted_index(path: Path, entries: Dict[bytes, Location]) -> None:
+    temporary = path.with_suffix(INDEX_SUFFIX + ".tmp")
+    with open(temporary, "wb") as handle:
+        for key in sorted(entries):
+            handle.write(INDEX_ENTRY.pack(key, *entries[key]))
+        handle.flush()
+        os.fsync(handle.fileno())
+    os.replace(temporary, path)
+
+
+class _Segment:
+    def __init__(self, pack_path: Path) -> None:
+        self.seq = int(pack_path.stem)
+        self.pack_path = pack_path
+        self.index_path = pack_path.with_suffix(INDEX_SUFFIX)
+        self.log_path = pack_path.with_suffix(LOG_SUFFIX)
+        self.entries: Dict[bytes, Location] = {}
+        self._log_offset = 0
+        self._index: mmap.mmap | None = None
+        self._pack: mmap.mmap | None = None
+        self.sealed = self.index_path.exists()
+        if self.sealed:
+            self._index = _map(self.index_path)
+
+    def __len__(self) -> int:
+        if self._index is not None:
+            return len(self._index) // INDEX_ENTRY.size
+        return len(self.entries)
+
+    def keys(self) -> Iterator[bytes]:
+        if self._index is None:
+            yield from self.entries
+            return
+        for position in range(0, len(self._index), INDEX_ENTRY.size):
+            yield self._index[position : position + 16]
+
+    def read_log(self) -> None:
+        """Pick up the entries another live writer appended since the last call."""
+
+        if not self.log_path.exists():
+            return
+        with open(self.log_path, "rb") as handle:
+            handle.seek(self._log_offset)
+            data = handle.read()
+        usable = len(data) - len(data) % INDEX_ENTRY.size
+        for key, *location in INDEX_ENTRY.iter_unpack(data[:usable]):
+            self.entries.setdefault(key, tuple(location))  # type: ignore[arg-type]
+        self._log_offset += usable
+
+    def lookup(self, key: bytes) -> Location | None:
+        if self._index is None:
+            return self.entries.get(key)
+        low, high = 0, len(self._index) // INDEX_ENTRY.size
+        while low < high:
+            middle = (low + high) // 2
+            position = middle * INDEX_ENTRY.size
+            candidate = self._index[position : position + 16]
+            if candidate == key:
+                return INDEX_ENTRY.unpack_from(self._index, position)[1:]
+            if candidate < key:
+                low = middle + 1
+            else:
+                high = middle
+        return None
+
+    def read(self, location: Location) -> bytes:
+        block_offset, block_length, record_offset = location
+        if self._pack is None or block_offset + block_length > len(self._pack):
+            if self._pack is not None:
+                self._pack.close()
+            self._pack = _map(self.pack_path)
+        assert self._pack is not None
+        block = self._pack[block_offset : block_offset + block_length]
+        records = zlib.decompress(block[BLOCK_HEADER.size :])
+        (length,) = RECORD_LENGTH.unpack_from(records, record_offset)
+        start = record_offset + RECORD_LENGTH.size
+        return records[start : start + length]
+
+    def scan(self) -> Iterator[bytes]:
+        view = _map(self.pack_path)
+        if view is None:
+            return
+        with view:
+            for _, _, records in iter_blocks(view):
+                for _, record in iter_records(records):
+                    yield record
+
+    def close(self) -> None:
+        for view in (self._index, self._pack):
+            if view is not None:
+                view.close()
+        self._index = self._pack = None
+
+
+class _ActiveSegment:
+    def __init__(self, root: Path) -> None:
+        existing = [int(path.stem) for path in root.glob(f"*{PACK_SUFFIX}") if path.stem.isdigit()]
+        seq = max(existing, default=0) + 1
+        # Lock before the pack becomes visible so refresh never mistakes it for an orphan.
+        staging = root / f".{os.getpid()}-{threading.get_ident()}{PACK_SUFFIX}.new"
+        self.pack = open(staging, "ab")
+        if fcntl is not None:
+            fcntl.flock(self.pack.fileno(), fcntl.LOCK_EX)
+        while True:
+            path = root / f"{seq:06d}{PACK_SUFFIX}"
+            try:
+                os.link(staging, path)
+            except FileExistsError:
+                seq += 1
+                continue
+            break
+        staging.unlink()
+        self.segment = _Segment(path)
+        self.log = open(self.segment.log_path, "ab")
+        self.size = 0
+
+
+class PackedArchive:
+    def __init__(
+        self,
+        root: Path,
+        *,
+        segment_bytes: int = 64 << 20,
+        block_bytes: int = 256 << 10,
+        fsync: bool = False,
+    ) -> None:
+        self._root = root
+        self._segment_bytes = segment_bytes
+        self._block_bytes = block_bytes
+        self._fsync = fsync
+        self._lock = threading.RLock()
+        self._segments: Dict[int, _Segment] = {}
+        self._active: _ActiveSegment | None = None
+        self._root.mkdir(parents=True, exist_ok=True)
+        self.refresh()
+
+    def __contains__(self, note_id: str) -> bool:
+        with self._lock:
+            return self._locate(note_key(note_id)) is not None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len({key for segment in self._segments.values() for key in segment.keys()})
+
+    def get(self, note_id: str) -> Dict[str, Any] | None:
+        key = note_key(note_id)
+        with self._lock:
+            found = self._locate(key)
+            if found is None:
+                self.refresh()
+                found = self._locate(key)
+            if found is None:
+                return None
+            payload = json.loads(found[0].read(found[1]))
+        return payload if payload.get("note_id") == note_id else None
+
+    def append(self, payloads: Sequence[Dict[str, Any]]) -> int:
+        """Store payloads whose note_id is not archived yet; returns how many were new."""
+
+        with self._lock:
+            fresh: Dict[bytes, bytes] = {}
+            for payload in payloads:
+                key = note_key(payload["note_id"])
+                if key not in fresh and self._locate(key) is None:
+                    fresh[key] = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self._append_records(list(fresh.items()))
+            return len(fresh)
+
+    def iter_payloads(self) -> Iterator[Dict[str, Any]]:
+        """Every archived payload once, oldest segment first."""
+
+        with self._lock:
+            self.refresh()
+            segments = [self._segments[seq] for seq in sorted(self._segments)]
+        seen: set[bytes] = set()
+        for segment in segments:
+            for record in segment.scan():
+                payload = json.loads(record)
+                key = note_key(payload["note_id"])
+                if key not in seen:
+                    seen.add(key)
+                    yield payload
+
+    def refresh(self) -> None:
+        """Load segments written by other processes and seal those left by dead writers."""
+
+        with self._lock:
+            paths = {int(path.stem): path for path in self._root.glob(f"*{PACK_SUFFIX}") if path.stem.isdigit()}
+            for seq in set(self._segments) - set(paths):
+                self._segments.pop(seq).close()
+            for seq, path in sorted(paths.items()):
+                segment = self._segments.get(seq)
+                if segment is not None and (segment.sealed or self._owns(segment)):
+                    continue
+                if path.with_suffix(INDEX_SUFFIX).exists() or self._seal_orphan(path):
+                    if segment is not None:
+                        segment.close()
+                    self._segments[seq] = _Segment(path)
+                else:
+                    segment = segment or _Segment(path)
+                    segment.read_log()
+                    self._segments[seq] = segment
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "segments": len(self._segments),
+                "sealed": sum(segment.sealed for segment in self._segments.values()),
+                "bytes": sum(
+                    segment.pack_path.stat().st_size
+                    for segment in self._segments.values()
+                    if segment.pack_path.exists()
+                ),
+            }
+
+    def close(self) -> None:
+        """Seal the segment this instance writes to; the archive stays readable."""
+
+        with self._lock:
+            self._seal_active()
+
+    def _owns(self, segment: _Segment) -> bool:
+        return self._active is not None and self._active.segment is segment
+
+    def _locate(self, key: bytes) -> Tuple[_Segment, Location] | None:
+        for seq in sorted(self._segments, reverse=True):
+            location = self._segments[seq].lookup(key)
+            if location is not None:
+                return self._segments[seq], location
+        return None
+
+    def _seal_orphan(self, path: Path) -> bool:
+        with open(path, "rb") as handle:
+            if not _try_lock(handle):
+                return False
+            if not path.with_suffix(INDEX_SUFFIX).exists():
+                _write_sorted_index(path.with_suffix(INDEX_SUFFIX), _scan_index(path))
+            path.with_suffix(LOG_SUFFIX).unlink(missing_ok=True)
+        return True
+
+    def _append_records(self, records: Sequence[Tuple[bytes, bytes]]) -> None:
+        block: List[Tuple[bytes, bytes]] = []
+        block_size = 0
+        for key, record in records:
+            block.append((key, record))
+            block_size += RECORD_LENGTH.size + len(record)
+            if block_size >= self._block_bytes:
+                self._write_block(block)
+                block, block_size = [], 0
+        if block:
+            self._write_block(block)
+
+    def _write_block(self, block: Sequence[Tuple[bytes, bytes]]) -> None:
+        if self._active is not None and self._active.size >= self._segment_bytes:
+            self._seal_active()
+        if self._active is None:
+            self._active = _ActiveSegment(self._root)
+            self._segments[self._active.segment.seq] = self._active.segment
+        active = self._active
+        records = bytearray()
+        offsets: List[int] = []
+        for _, record in block:
+            offsets.append(len(records))
+            records += RECORD_LENGTH.pack(len(record)) + record
+        compressed = zlib.compress(bytes(records), 6)
+        header = BLOCK_HEADER.pack(BLOCK_MAGIC, len(compressed), zlib.crc32(compressed))
+        block_offset, block_length = active.size, len(header) + len(compressed)
+        active.pack.write(header + compressed)
+        active.pack.flush()
+        if self._fsync:
+            os.fsync(active.pack.fileno())
+        active.size += block_length
+        entries = b"".join(
+            INDEX_ENTRY.pack(key, block_offset, block_length, offset) for (key, _), offset in zip(block, offsets)
+        )
+        active.log.write(entries)
+        active.log.flush()
+        for (key, _), offset in zip(block, offsets):
+            active.segment.entries[key] = (block_offset, block_length, offset)
+
+    def _seal_active(self) -> None:
+        active, self._active = self._active, None
+        if active is None:
+            return
+        segment = active.segment
+        _write_sorted_index(segment.index_path, segment.entries)
+        active.log.close()
+        segment.log_path.unlink(missing_ok=True)
+        active.pack.close()
+        segment.close()
+        self._segments[segment.seq] = _Segment(segment.pack_path)
+
+
+@dataclass(slots=True)
+class CompactionReport:
+    segments_before: int = 0
+    segments_after: int = 0
+    records: int = 0
+    duplicates: int = 0
+    bytes_before: int = 0
+    bytes_after: int = 0
+
+
+def compact(root: Path, *, segment_bytes: int = 64 << 20, block_bytes: int = 256 << 10) -> CompactionReport:
+    """Rewrite the sealed segments into full blocks, keeping the first copy of each note.
+
+    Segments still owned by a live writer are left alone. The new segments are
+    sealed (and fsynced) before the old ones are deleted, so an interruption
+    only leaves duplicates behind for the next run.
+    """
+
+    archive = PackedArchive(root, segment_bytes=segment_bytes, block_bytes=block_bytes, fsync=True)
+    report = CompactionReport()
+    try:
+        with archive._lock:
+            sealed = sorted((segment for segment in archive._segments.values() if segment.sealed), key=lambda s: s.seq)
+            if not sealed:
+                return report
+            existing = set(archive._segments)
+            seen: set[bytes] = set()
+            pending: List[Tuple[bytes, bytes]] = []
+            for segment in sealed:
+                report.segments_before += 1
+                report.bytes_before += segment.pack_path.stat().st_size
+                for record in segment.scan():
+                    key = note_key(json.loads(record)["note_id"])
+                    if key in seen:
+                        report.duplicates += 1
+                        continue
+                    seen.add(key)
+                    pending.append((key, record))
+                    if len(pending) >= 1000:
+                        archive._append_records(pending)
+                        pending = []
+            archive._append_records(pending)
+            archive._seal_active()
+            for segment in sealed:
+                archive._segments.pop(segment.seq).close()
+                segment.index_path.unlink()
+                segment.pack_path.unlink()
+            for seq in set(archive._segments) - existing:
+                report.segments_after += 1
+                report.bytes_after += archive._segments[seq].pack_path.stat().st_size
+            report.records = len(seen)
+    finally:
+        archive.close()
+    return report
+
+
+def convert_zmem(root: Path, archive: PackedArchive, *, delete: bool = False, batch_size: int = 1000) -> int:
+    """Append legacy ``<note_id>.zmem`` files to the segments; returns how many were new."""
+
+    converted = 0
+    paths = sorted(root.glob("*.zmem"))
+    for start in range(0, len(paths), batch_size):
+        chunk = paths[start : start + batch_size]
+        payloads = []
+        for path in chunk:
+            with gzip.open(path, "rt", encoding="utf-8") as handle:
+                payloads.append(json.load(handle))
+        converted += archive.append(payloads)
+        if delete:
+            for path in chunk:
+                path.unlink()
+    return converted
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description="Manage packed memory archive segments")
+    parser.add_argument("command", choices=("stats", "compact", "convert"))
+    parser.add_argument("--root", type=Path, default=settings.memory_library_path / "archives")
+    parser.add_argument("--delete", action="store_true", help="convert: remove .zmem files once packed")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="[%(asctime)s] %(levelname)s %(name)s: %(message)s")
+    if args.command == "compact":
+        report = compact(
+            args.root,
+            segment_bytes=settings.memory_archive_segment_bytes,
+            block_bytes=settings.memory_archive_block_bytes,
+        )
+        print(
+            f"segments {report.segments_before} -> {report.segments_after}, "
+            f"{report.records} records, {report.duplicates} duplicates dropped, "
+            f"{report.bytes_before} -> {report.bytes_after} bytes"
+        )
+        return
+    archive = PackedArchive(
+        args.root,
+        segment_bytes=settings.memory_archive_segment_bytes,
+        block_bytes=settings.memory_archive_block_bytes,
+    )
+    try:
+        if args.command == "convert":
+            print(f"{convert_zmem(args.root, archive, delete=args.delete)} archives converted")
+        else:
+            stats = archive.stats()
+            print(f"{stats['segments']} segments ({stats['sealed']} sealed), {len(archive)} notes, {stats['bytes']} bytes")
+    finally:
+        archive.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,103 @@
 from __future__ import annotations
 
+import base64
 from datetime import datetime, timezone
 import json
-from typing import Sequence
+from typing import Any, Sequence
 from uuid import NAMESPACE_URL, uuid5
 
-from sqlalchemy import Select, select
+import numpy as np
+
+from sqlalchemy import Select, and_, exists, func, insert, literal, select, tuple_
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Row
 from sqlalchemy.orm import Session
+from sqlalchemy.sql.elements import ColumnElement
+
+from app.core.config import Settings, get_settings
+from app.memory.dedup import (
+    bucket_rows,
+    find_near_duplicates,
+    jaccard_estimate,
+    merge_tags,
+    minhash_signature,
+    signature_bytes,
+)
+from app.memory.domain import MemoryNoteDTO, MemoryNoteInput, MemoryNotePage, MemoryRerank
+from app.vector.batching import EmbeddingBatcher, get_embedding_scheduler
+from app.vector.embedding import EmbeddingService
+from app.vector.index import TableVectorIndex, create_vector_index, index_persist_path
+from app.vector.ranking import maximal_marginal_relevance, recency_decay, reciprocal_rank_fusion
+from app.db.models.memory import MemoryNote as MemoryNoteModel, MemoryNoteBucket
+from app.db.fulltext import match_fulltext
+from app.db.vector_indexes import apply_search_settings, nearest_neighbours_many
+
+
+def _note_labels(tags: Sequence[str] | None) -> list[str]:
+    return [tag.lower() for tag in tags or []]
+
+
+# Everything a DTO needs; the embedding column is never hydrated for reads.
+_NOTE_COLUMNS = (
+    MemoryNoteModel.note_id,
+    MemoryNoteModel.user,
+    MemoryNoteModel.agent,
+    MemoryNoteModel.text,
+    MemoryNoteModel.tags,
+    MemoryNoteModel.payload,
+    MemoryNoteModel.created_at,
+    MemoryNoteModel.updated_at,
+)
+
+
+def encode_cursor(updated_at: datetime, note_id: str) -> str:
+    raw = json.dumps([updated_at.isoformat(), note_id], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
 
-from app.memory.domain import MemoryNoteDTO
-from app.vector.embedding import EmbeddingService, get_embedding_service
-from app.db.models.memory import MemoryNote as MemoryNoteModel
+
+def decode_cursor(cursor: str) -> tuple[datetime, str]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        updated_at, note_id = json.loads(raw)
+        return datetime.fromisoformat(updated_at), str(note_id)
+    except (ValueError, TypeError) as error:
+        raise ValueError("Invalid pagination cursor") from error
+
+
+def _as_utc(value: datetime) -> datetime:
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+def create_memory_vector_index(settings: Settings, *, fresh: bool = False) -> TableVectorIndex:
+    persist_path = index_persist_path(settings, MemoryNoteModel.__tablename__)
+    return TableVectorIndex(
+        index=create_vector_index(settings, persist_path),
+        key_columns=(MemoryNoteModel.note_id,),
+        embedding_column=MemoryNoteModel.embedding,
+        updated_column=MemoryNoteModel.updated_at,
+        label_column=MemoryNoteModel.tags,
+        model_column=MemoryNoteModel.embedding_model,
+        labels=_note_labels,
+        sync_interval=settings.vector_index_sync_interval_seconds,
+        sync_window=settings.vector_index_sync_window_seconds,
+        persist_path=persist_path,
+        persist_interval=settings.vector_index_persist_interval_seconds,
+        restore=not fresh,
+        # Serving indexes build their graph off the request path; rebuilds (fresh) block.
+        background_build=not fresh,
+        max_tombstone_ratio=settings.hnsw_max_tombstone_ratio,
+    )
 
 
 class MemoryRepository:
-    def __init__(self, embedding_service: EmbeddingService | None = None) -> None:
-        self._embedding_service = embedding_service or get_embedding_service()
+    def __init__(
+        self,
+        embedding_service: EmbeddingService | EmbeddingBatcher | None = None,
+        vector_index: TableVectorIndex | None = None,
+    ) -> None:
+        self._embedding_service = embedding_service or get_embedding_scheduler()
+        self._vector_index = vector_index or create_memory_vector_index(get_settings())
 
     def add_note(
         self,
@@ -29,18 +111,24 @@ class MemoryRepository:
         note_id: str | None = None,
     ) -> tuple[MemoryNoteDTO, bool]:
         normalized_tags = self._normalize_tags(tags)
-        payload = json.dumps(
-            {"text": text, "tags": normalized_tags, "metadata": metadata or {}},
-            sort_keys=True,
-            ensure_ascii=False,
-        )
-        computed_id = note_id or str(uuid5(NAMESPACE_URL, payload))
+        computed_id = note_id or self._compute_note_id(text, normalized_tags, metadata)
         existing = session.get(MemoryNoteModel, computed_id)
         if existing:
             return self._to_dto(existing), False
 
-        now = datetime.now(timezone.utc)
+        settings = get_settings()
+        signature = None
+        if settings.memory_dedup_mode != "off":
+            signature = minhash_signature(text)
+            (canonical_id,) = find_near_duplicates(
+                session, [signature], settings.memory_dedup_threshold, user=user, agent=agent
+            )
+            if canonical_id is not None:
+                return self._resolve_duplicate(session, canonical_id, [normalized_tags]), False
+
         embedding = self._embedding_service.embed([text])[0]
+        model_id = self._embedding_service.model_id
+        now = datetime.now(timezone.utc)
         note = MemoryNoteModel(
             note_id=computed_id,
             user=user,
@@ -49,13 +137,181 @@ class MemoryRepository:
             tags=normalized_tags,
             payload=dict(metadata or {}),
             embedding=embedding,
+            embedding_model=model_id,
+            minhash=signature_bytes(signature) if signature is not None else None,
             created_at=now,
             updated_at=now,
         )
         session.add(note)
         session.flush()
+        self._insert_buckets(session, bucket_rows(computed_id, signature))
+        self._vector_index.upsert_on_commit(session, computed_id, embedding, normalized_tags, model_id)
         return self._to_dto(note), True
 
+    def add_notes(
+        self,
+        session: Session,
+        notes: Sequence[MemoryNoteInput],
+        *,
+        user: str,
+        agent: str,
+    ) -> list[tuple[MemoryNoteDTO, bool]]:
+        """Insert many notes with one lookup, one embed call and one bulk insert.
+
+        Returns ``(note, created)`` in input order; repeated ids within the batch
+        are only created once. With near-duplicate detection enabled, notes
+        similar to a stored or earlier batch note resolve to that note instead.
+        """
+
+        prepared: list[tuple[str, list[str], MemoryNoteInput]] = []
+        for note in notes:
+            normalized_tags = self._normalize_tags(note.tags)
+            computed_id = note.note_id or self._compute_note_id(note.text, normalized_tags, note.metadata)
+            prepared.append((computed_id, normalized_tags, note))
+        if not prepared:
+            return []
+
+        ids = list(dict.fromkeys(note_id for note_id, _, _ in prepared))
+        stored = self._load_dtos(session, ids)
+        pending: dict[str, tuple[list[str], MemoryNoteInput]] = {}
+        for note_id, normalized_tags, note in prepared:
+            if note_id not in stored:
+                pending.setdefault(note_id, (normalized_tags, note))
+        dedup = get_settings().memory_dedup_mode != "off"
+        signatures = {
+            note_id: minhash_signature(note.text) if dedup else None for note_id, (_, note) in pending.items()
+        }
+        aliases = self._near_duplicate_aliases(session, pending, signatures, stored, user=user, agent=agent)
+
+        created: dict[str, MemoryNoteDTO] = {}
+        if pending:
+            embeddings = self._embedding_service.embed([note.text for _, note in pending.values()])
+            model_id = self._embedding_service.model_id
+            now = datetime.now(timezone.utc)
+            rows = [
+                {
+                    "note_id": note_id,
+                    "user": user,
+                    "agent": agent,
+                    "text": note.text,
+                    "tags": normalized_tags,
+                    "payload": dict(note.metadata or {}),
+                    "embedding": embedding,
+                    "embedding_model": model_id,
+                    "minhash": signature_bytes(signatures[note_id]) if signatures[note_id] is not None else None,
+                    "created_at": now,
+                    "updated_at": now,
+                }
+                for (note_id, (normalized_tags, note)), embedding in zip(pending.items(), embeddings)
+            ]
+            inserted = self._insert_ignoring_conflicts(session, rows)
+            self._insert_buckets(
+                session, [bucket for note_id in inserted for bucket in bucket_rows(note_id, signatures[note_id])]
+            )
+            for row in rows:
+                if row["note_id"] not in inserted:
+                    continue
+                self._vector_index.upsert_on_commit(
+                    session, row["note_id"], row["embedding"], row["tags"], model_id
+                )
+                created[row["note_id"]] = MemoryNoteDTO(
+                    note_id=row["note_id"],
+                    user=user,
+                    agent=agent,
+                    text=row["text"],
+                    tags=list(row["tags"]),
+                    metadata=dict(row["payload"]),
+                    created_at=now,
+                    updated_at=now,
+                )
+            lost = [note_id for note_id in pending if note_id not in inserted]
+            if lost:
+                stored.update(self._load_dtos(session, lost))
+
+        results: list[tuple[MemoryNoteDTO, bool]] = []
+        for note_id, _, _ in prepared:
+            note_id = aliases.get(note_id, note_id)
+            if note_id in created:
+                results.append((created.pop(note_id), True))
+                stored[note_id] = results[-1][0]
+            else:
+                results.append((stored[note_id], False))
+        return results
+
+    def _near_duplicate_aliases(
+        self,
+        session: Session,
+        pending: dict[str, tuple[list[str], MemoryNoteInput]],
+        signatures: dict[str, np.ndarray | None],
+        stored: dict[str, MemoryNoteDTO],
+        *,
+        user: str,
+        agent: str,
+    ) -> dict[str, str]:
+        """Drop near-duplicates from ``pending`` and map their ids to the canonical note.
+
+        Stored canonical notes are merged (or just loaded, in reject mode) into
+        ``stored``; in-batch duplicates fold their tags into the first similar
+        pending note.
+        """
+
+        settings = get_settings()
+        if settings.memory_dedup_mode == "off" or not pending:
+            return {}
+        threshold = settings.memory_dedup_threshold
+        note_ids = list(pending)
+        matches = find_near_duplicates(
+            session, [signatures[note_id] for note_id in note_ids], threshold, user=user, agent=agent
+        )
+        aliases: dict[str, str] = {}
+        merged_tags: dict[str, list[list[str]]] = {}
+        accepted: list[str] = []
+        for note_id, match in zip(note_ids, matches):
+            if match is not None:
+                aliases[note_id] = match
+                merged_tags.setdefault(match, []).append(pending[note_id][0])
+                continue
+            signature = signatures[note_id]
+            if signature is None:
+                continue
+            if accepted:
+                scores = jaccard_estimate(signature, np.stack([signatures[other] for other in accepted]))
+                best = int(np.argmax(scores))
+                if scores[best] >= threshold:
+                    canonical = accepted[best]
+                    aliases[note_id] = canonical
+                    if settings.memory_dedup_mode == "merge":
+                        canonical_tags, canonical_note = pending[canonical]
+                        pending[canonical] = (merge_tags([canonical_tags, pending[note_id][0]]), canonical_note)
+                    continue
+            accepted.append(note_id)
+        for note_id in aliases:
+            pending.pop(note_id)
+        for canonical, tag_lists in merged_tags.items():
+            stored[canonical] = self._resolve_duplicate(session, canonical, tag_lists)
+        return aliases
+
+    def _resolve_duplicate(
+        self, session: Session, canonical_id: str, tag_lists: Sequence[Sequence[str]]
+    ) -> MemoryNoteDTO:
+        """Canonical note of a near-duplicate; in merge mode its tags absorb ``tag_lists`` and it is touched."""
+
+        note = session.get(MemoryNoteModel, canonical_id)
+        assert note is not None
+        if get_settings().memory_dedup_mode == "merge":
+            note.tags = merge_tags([note.tags, *tag_lists])
+            note.updated_at = datetime.now(timezone.utc)
+            session.add(note)
+            session.flush()
+            self._vector_index.upsert_on_commit(
+                session, canonical_id, note.embedding, note.tags, note.embedding_model
+            )
+        return self._to_dto(note)
+
+    def _insert_buckets(self, session: Session, rows: list[dict[str, Any]]) -> None:
+        if rows:
+            session.execute(insert(MemoryNoteBucket), rows)
+
     def update_timestamp(self, session: Session, note_id: str) -> None:
         note = session.get(MemoryNoteModel, note_id)
         if not note:
@@ -70,61 +326,260 @@ class MemoryRepository:
         query: str,
         tags: Sequence[str] | None,
         limit: int,
+        mode: str | None = None,
+        rerank: MemoryRerank | None = None,
     ) -> list[MemoryNoteDTO]:
+        query_text = query.strip()
+        if not query_text:
+            return self.list_notes(session, tags=tags, limit=limit).notes
+        return self.find_notes_batch(
+            session, queries=[query_text], tags=tags, limit=limit, mode=mode, rerank=rerank
+        )[0]
+
+    def find_notes_batch(
+        self,
+        session: Session,
+        *,
+        queries: Sequence[str],
+        tags: Sequence[str] | None,
+        limit: int,
+        mode: str | None = None,
+        rerank: MemoryRerank | None = None,
+    ) -> list[list[MemoryNoteDTO]]:
+        """Search several queries with one embedding call and one vector scan.
+
+        With ``rerank`` a larger candidate pool is fetched, blended with a
+        recency decay and/or diversified with MMR, then cut to ``limit``.
+        """
+
         normalized_tags = self._normalize_tags(tags or [])
-        base_stmt = select(MemoryNoteModel)
         bind = session.get_bind()
-        is_postgres = bool(bind and bind.dialect.name == "postgresql")
-        if normalized_tags and is_postgres:
-            base_stmt = base_stmt.where(MemoryNoteModel.tags.contains(normalized_tags))
+        dialect = bind.dialect.name if bind else ""
+        is_postgres = dialect == "postgresql"
+        base_stmt = select(*_NOTE_COLUMNS)
+        tag_condition = self._tag_condition(normalized_tags, dialect)
+        if tag_condition is not None:
+            base_stmt = base_stmt.where(tag_condition)
 
-        query_text = query.strip()
-        if not query_text:
-            stmt = base_stmt.order_by(MemoryNoteModel.updated_at.desc()).limit(limit)
-            rows = session.execute(stmt).scalars().all()
-            if normalized_tags and not is_postgres:
-                rows = [row for row in rows if self._tags_match(row.tags, normalized_tags)]
-            return [self._to_dto(row) for row in rows]
+        settings = get_settings()
+        mode = mode or settings.search_default_mode
+        if mode not in {"vector", "lexical", "hybrid"}:
+            raise ValueError(f"Unknown search mode {mode!r}")
+        texts = [query.strip() for query in queries]
+        if rerank is not None and not rerank.active:
+            rerank = None
+        pool = limit if rerank is None else max(limit, rerank.candidates or settings.search_rerank_candidates)
+        depth = pool if mode != "hybrid" else max(pool, settings.search_hybrid_candidates)
+        vector_hits: list[list[tuple[str, float]]] = [[] for _ in texts]
+        if mode != "lexical":
+            vector_hits = self._vector_hits(session, base_stmt, texts, depth, normalized_tags, is_postgres)
+
+        ranked: list[Sequence[tuple[str, float]]] = []
+        for text, hits in zip(texts, vector_hits):
+            if mode == "vector":
+                ranked.append(hits)
+                continue
+            rankings = [self._lexical_ranking(session, base_stmt, text, depth, normalized_tags, tag_condition)]
+            if mode == "hybrid":
+                rankings.insert(0, [note_id for note_id, _ in hits])
+            ranked.append(reciprocal_rank_fusion(rankings, k=settings.search_rrf_k)[:pool])
 
-        return self._vector_search(session, base_stmt, query_text, limit, normalized_tags, is_postgres)
+        note_ids = list({note_id for hits in ranked for note_id, _ in hits})
+        if rerank is None:
+            by_id = self._load_rows(session, note_ids)
+        else:
+            by_id = self._load_rows(session, note_ids, *self._rerank_columns(rerank, is_postgres))
+            ranked = [self._rerank(hits, by_id, rerank, limit, is_postgres) for hits in ranked]
+        return [[self._to_dto(by_id[note_id], score=score) for note_id, score in hits if note_id in by_id] for hits in ranked]
 
-    def _vector_search(
+    def list_notes(
         self,
         session: Session,
-        base_stmt: Select[tuple[MemoryNoteModel]],
-        query: str,
+        *,
+        tags: Sequence[str] | None,
+        limit: int,
+        cursor: str | None = None,
+        user: str | None = None,
+        agent: str | None = None,
+    ) -> MemoryNotePage:
+        """Most recently updated notes first, paged by an opaque ``(updated_at, note_id)`` cursor."""
+
+        normalized_tags = self._normalize_tags(tags or [])
+        bind = session.get_bind()
+        stmt = select(*_NOTE_COLUMNS).order_by(MemoryNoteModel.updated_at.desc(), MemoryNoteModel.note_id.desc())
+        tag_condition = self._tag_condition(normalized_tags, bind.dialect.name if bind else "")
+        if tag_condition is not None:
+            stmt = stmt.where(tag_condition)
+        if user:
+            stmt = stmt.where(MemoryNoteModel.user == user)
+        if agent:
+            stmt = stmt.where(MemoryNoteModel.agent == agent)
+        if cursor:
+            updated_at, note_id = decode_cursor(cursor)
+            stmt = stmt.where(
+                tuple_(MemoryNoteModel.updated_at, MemoryNoteModel.note_id) < tuple_(literal(updated_at), literal(note_id))
+            )
+
+        if normalized_tags and tag_condition is None:
+            rows = []
+            for row in session.execute(stmt):
+                if self._tags_match(row.tags, normalized_tags):
+                    rows.append(row)
+                    if len(rows) > limit:
+                        break
+        else:
+            rows = list(session.execute(stmt.limit(limit + 1)))
+        page = rows[:limit]
+        next_cursor = encode_cursor(page[-1].updated_at, page[-1].note_id) if len(rows) > limit else None
+        return MemoryNotePage(notes=[self._to_dto(row) for row in page], next_cursor=next_cursor)
+
+    def _vector_hits(
+        self,
+        session: Session,
+        base_stmt: Select[Any],
+        queries: Sequence[str],
         limit: int,
         normalized_tags: list[str],
         is_postgres: bool,
-    ) -> list[MemoryNoteDTO]:
-        embedding = self._embedding_service.embed([query])[0]
-        if is_postgres:
-            distance = MemoryNoteModel.embedding.cosine_distance(embedding)  # type: ignore[attr-defined]
+    ) -> list[list[tuple[str, float]]]:
+        embeddings = self._embedding_service.embed(queries)
+        model_id = self._embedding_service.model_id
+        if not is_postgres:
+            return self._vector_index.search_many(
+                session, embeddings, limit, required_labels=normalized_tags, model_id=model_id
+            )
+
+        apply_search_settings(session, limit=limit)
+        base_stmt = base_stmt.where(MemoryNoteModel.embedding_model == model_id)
+        if len(embeddings) == 1:
+            distance = MemoryNoteModel.embedding.cosine_distance(embeddings[0])  # type: ignore[attr-defined]
             stmt = (
-                base_stmt.add_columns((1 - distance).label("score"))
+                base_stmt.with_only_columns(MemoryNoteModel.note_id, (1 - distance).label("score"))
                 .order_by(distance.asc())
                 .limit(limit)
             )
-            results = session.execute(stmt).all()
-            notes: list[MemoryNoteDTO] = []
-            for note, score in results:
-                dto = self._to_dto(note)
-                dto.score = float(score) if score is not None else None
-                notes.append(dto)
-            return notes
-
-        rows = session.execute(base_stmt).scalars().all()
-        if normalized_tags:
-            rows = [row for row in rows if self._tags_match(row.tags, normalized_tags)]
-        scored: list[tuple[MemoryNoteModel, float]] = []
-        for note in rows:
-            if not note.embedding:
-                continue
-            score = self._cosine_similarity(embedding, note.embedding)
-            scored.append((note, score))
-        scored.sort(key=lambda item: item[1], reverse=True)
-        limited = scored[:limit]
-        return [self._to_dto(note, score=score) for note, score in limited]
+            hits = [(note_id, float(score)) for note_id, score in session.execute(stmt) if score is not None]
+            # ivfflat iterative scans only guarantee a relaxed order.
+            return [sorted(hits, key=lambda hit: hit[1], reverse=True)]
+
+        stmt = nearest_neighbours_many(base_stmt, MemoryNoteModel.note_id, MemoryNoteModel.embedding, embeddings, limit)
+        results: list[list[tuple[str, float]]] = [[] for _ in embeddings]
+        for position, note_id, score in session.execute(stmt):
+            if score is not None:
+                results[position].append((note_id, float(score)))
+        return results
+
+    def _lexical_ranking(
+        self,
+        session: Session,
+        base_stmt: Select[tuple[MemoryNoteModel]],
+        query: str,
+        limit: int,
+        normalized_tags: list[str],
+        tag_condition: ColumnElement[bool] | None,
+    ) -> list[str]:
+        stmt = match_fulltext(
+            base_stmt.with_only_columns(MemoryNoteModel.note_id, MemoryNoteModel.tags),
+            MemoryNoteModel,
+            query,
+            session.get_bind(),
+        )
+        if stmt is None:
+            return []
+        if normalized_tags and tag_condition is None:
+            rows = [note_id for note_id, tags in session.execute(stmt) if self._tags_match(tags, normalized_tags)]
+            return rows[:limit]
+        return [note_id for note_id, _ in session.execute(stmt.limit(limit))]
+
+    def _compute_note_id(self, text: str, normalized_tags: list[str], metadata: dict | None) -> str:
+        payload = json.dumps(
+            {"text": text, "tags": normalized_tags, "metadata": metadata or {}},
+            sort_keys=True,
+            ensure_ascii=False,
+        )
+        return str(uuid5(NAMESPACE_URL, payload))
+
+    def _load_rows(self, session: Session, note_ids: Sequence[str], *extra: ColumnElement[Any]) -> dict[str, Row[Any]]:
+        rows = session.execute(select(*_NOTE_COLUMNS, *extra).where(MemoryNoteModel.note_id.in_(note_ids)))
+        return {row.note_id: row for row in rows}
+
+    @staticmethod
+    def _rerank_columns(rerank: MemoryRerank, is_postgres: bool) -> list[ColumnElement[Any]]:
+        columns: list[ColumnElement[Any]] = []
+        if rerank.recency_weight > 0 and is_postgres:
+            age = func.extract("epoch", func.now() - MemoryNoteModel.updated_at)
+            columns.append(func.power(0.5, age / (rerank.half_life_hours * 3600.0)).label("decay"))
+        if rerank.mmr_lambda is not None:
+            columns.extend([MemoryNoteModel.embedding.label("embedding"), MemoryNoteModel.embedding_model])
+        return columns
+
+    def _rerank(
+        self,
+        hits: Sequence[tuple[str, float]],
+        by_id: dict[str, Row[Any]],
+        rerank: MemoryRerank,
+        limit: int,
+        is_postgres: bool,
+    ) -> list[tuple[str, float]]:
+        hits = [(note_id, score) for note_id, score in hits if note_id in by_id]
+        if not hits:
+            return []
+        rows = [by_id[note_id] for note_id, _ in hits]
+        scores = np.array([score for _, score in hits], dtype=np.float64)
+        peak = scores.max()
+        if peak > 0:
+            scores /= peak
+        if rerank.recency_weight > 0:
+            if is_postgres:
+                decay = np.array([row.decay for row in rows], dtype=np.float64)
+            else:
+                now = datetime.now(timezone.utc)
+                ages = [(now - _as_utc(row.updated_at)).total_seconds() for row in rows]
+                decay = recency_decay(np.array(ages), rerank.half_life_hours * 3600.0)
+            scores = (1 - rerank.recency_weight) * scores + rerank.recency_weight * decay
+        if rerank.mmr_lambda is None:
+            order = np.argsort(-scores, kind="stable")[:limit].tolist()
+        else:
+            model_id = self._embedding_service.model_id
+            missing = np.zeros(get_settings().embedding_vector_dimension, dtype=np.float32)
+            embeddings = np.stack(
+                [row.embedding if row.embedding is not None and row.embedding_model == model_id else missing for row in rows]
+            )
+            order = maximal_marginal_relevance(scores, embeddings, limit, lambda_=rerank.mmr_lambda)
+        return [(hits[position][0], float(scores[position])) for position in order]
+
+    def _load_dtos(self, session: Session, note_ids: Sequence[str]) -> dict[str, MemoryNoteDTO]:
+        return {note_id: self._to_dto(row) for note_id, row in self._load_rows(session, note_ids).items()}
+
+    def _insert_ignoring_conflicts(self, session: Session, rows: list[dict]) -> set[str]:
+        bind = session.get_bind()
+        dialect = bind.dialect.name if bind else ""
+        if dialect in {"postgresql", "sqlite"}:
+            insert = postgresql_insert if dialect == "postgresql" else sqlite_insert
+            stmt = (
+                insert(MemoryNoteModel)
+                .on_conflict_do_nothing(index_elements=[MemoryNoteModel.note_id])
+                .returning(MemoryNoteModel.note_id)
+            )
+            return set(session.scalars(stmt, rows))
+        session.add_all(MemoryNoteModel(**row) for row in rows)
+        session.flush()
+        return {row["note_id"] for row in rows}
+
+    def _tag_condition(self, normalized_tags: list[str], dialect: str) -> ColumnElement[bool] | None:
+        """SQL predicate requiring every tag, or None when the dialect needs the Python filter."""
+
+        if not normalized_tags:
+            return None
+        if dialect == "postgresql":
+            return MemoryNoteModel.tags.contains(normalized_tags)
+        if dialect == "sqlite":
+            conditions = []
+            for tag in normalized_tags:
+                entries = func.json_each(MemoryNoteModel.tags).table_valued("value")
+                conditions.append(exists().select_from(entries).where(func.lower(entries.c.value) == tag))
+            return and_(*conditions)
+        return None
 
     def _normalize_tags(self, tags: Sequence[str]) -> list[str]:
         return sorted({tag.strip().lower() for tag in tags if tag and tag.strip()})
@@ -133,26 +588,15 @@ class MemoryRepository:
         note_set = {tag.lower() for tag in note_tags or []}
         return all(tag in note_set for tag in target_tags)
 
-    def _to_dto(self, note: MemoryNoteModel, score: float | None = None) -> MemoryNoteDTO:
+    def _to_dto(self, note: MemoryNoteModel | Row[Any], score: float | None = None) -> MemoryNoteDTO:
         return MemoryNoteDTO(
             note_id=note.note_id,
             user=note.user,
             agent=note.agent,
             text=note.text,
             tags=list(note.tags or []),
-            metadata=dict(getattr(note, "payload", {}) or {}),
+            metadata=dict(note.payload or {}),
             created_at=note.created_at,
             updated_at=note.updated_at,
             score=score,
         )
-
-    @staticmethod
-    def _cosine_similarity(vector_a: Sequence[float], vector_b: Sequence[float]) -> float:
-        if not vector_a or not vector_b:
-            return 0.0
-        dot = sum(a * b for a, b in zip(vector_a, vector_b))
-        norm_a = sum(a * a for a in vector_a) ** 0.5
-        norm_b = sum(b * b for b in vector_b) ** 0.5
-        if norm_a == 0 or norm_b == 0:
-            return 0.0
-        return dot / (norm_a * norm_b)
@@ -0,0 +1,352 @@
+"""Rebuild ``memory_notes`` from the note archives.
+
+``python -m app.memory.restore`` reads the packed segments (split into spans
+of whole blocks) and any legacy ``.zmem`` files with a process pool that
+decompresses, parses and, unless ``MEMORY_DEDUP_MODE=off``, signs (MinHash)
+the notes; the parent skips notes already stored, embeds the rest in large
+batches through the shared embedding service (so its cache is reused) and
+bulk-loads them: ``COPY`` into a temporary table then ``INSERT ... ON CONFLICT
+DO NOTHING`` on Postgres, batched ``INSERT OR IGNORE`` elsewhere. Every
+finished span is recorded in ``MEMORY_RESTORE_CHECKPOINT`` so an interrupted
+restore resumes where it stopped; ``--reset`` starts over. Original ids and
+timestamps are kept.
+"""
+
+from __future__ import annotations
+
+import argparse
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+import gzip
+import json
+import logging
+import os
+from pathlib import Path
+import time
+from typing import Any, Callable, Deque, Dict, Iterator, List, Sequence
+
+from sqlalchemy import select, text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.core.config import Settings, get_settings
+from app.core.metrics import get_metrics_registry
+from app.db.models.memory import MemoryNote as MemoryNoteModel, MemoryNoteBucket
+from app.memory.dedup import lsh_buckets, minhash_signature, signature_bytes
+from app.memory.packs import PACK_SUFFIX, block_spans, read_span
+from app.vector.batching import EmbeddingBatcher
+from app.vector.embedding import EmbeddingService, get_embedding_service
+
+logger = logging.getLogger(__name__)
+
+_NOTE_COLUMNS = (
+    "note_id",
+    "user",
+    "agent",
+    "text",
+    "tags",
+    "payload",
+    "embedding",
+    "embedding_model",
+    "minhash",
+    "created_at",
+    "updated_at",
+)
+
+
+@dataclass(frozen=True)
+class RestoreTask:
+    key: str
+    path: str = ""
+    start: int = 0
+    stop: int = 0
+    files: tuple[str, ...] = ()
+    sign: bool = True
+
+
+@dataclass(slots=True)
+class RestoreReport:
+    tasks: int = 0
+    read: int = 0
+    restored: int = 0
+    skipped: int = 0
+    seconds: float = 0.0
+
+    @property
+    def notes_per_second(self) -> float:
+        return self.restored / self.seconds if self.seconds > 0 else 0.0
+
+
+def plan_tasks(
+    root: Path, *, span_bytes: int = 4 << 20, files_per_task: int = 500, sign: bool = True
+) -> List[RestoreTask]:
+    tasks = [
+        RestoreTask(f"{path.name}:{start}", str(path), start, stop, sign=sign)
+        for path in sorted(root.glob(f"*{PACK_SUFFIX}"))
+        if path.stem.isdigit()
+        for start, stop in block_spans(path, span_bytes)
+    ]
+    legacy = sorted(path.name for path in root.glob("*.zmem"))
+    for index in range(0, len(legacy), files_per_task):
+        chunk = legacy[index : index + files_per_task]
+        tasks.append(RestoreTask(f"zmem:{chunk[0]}:{chunk[-1]}", str(root), files=tuple(chunk), sign=sign))
+    return tasks
+
+
+def read_task(task: RestoreTask) -> List[Dict[str, Any]]:
+    """Decode and sign the notes of one task; runs in the worker processes."""
+
+    if task.files:
+        payloads = []
+        for name in task.files:
+            with gzip.open(Path(task.path) / name, "rt", encoding="utf-8") as handle:
+                payloads.append(json.load(handle))
+    else:
+        payloads = [json.loads(record) for record in read_span(Path(task.path), task.start, task.stop)]
+    rows = []
+    for payload in payloads:
+        signature = minhash_signature(payload["text"]) if task.sign else None
+        rows.append(
+            {
+                "note_id": payload["note_id"],
+                "user": payload.get("user") or "restore",
+                "agent": payload.get("agent") or "restore",
+                "text": payload["text"],
+                "tags": list(payload.get("tags") or []),
+                "payload": dict(payload.get("metadata") or {}),
+                "minhash": signature_bytes(signature) if signature is not None else None,
+                "buckets": lsh_buckets(signature) if signature is not None else [],
+                "created_at": datetime.fromisoformat(payload["created_at"]),
+                "updated_at": datetime.fromisoformat(payload["updated_at"]),
+            }
+        )
+    return rows
+
+
+def _copy_value(column: str, value: Any) -> Any:
+    if column in {"tags", "payload"}:
+        return json.dumps(value, ensure_ascii=False)
+    if column == "embedding":
+        return "[" + ",".join(f"{float(component):.7g}" for component in value) + "]"
+    return value
+
+
+class ArchiveRestore:
+    def __init__(
+        self,
+        engine: Engine,
+        embedding_service: EmbeddingService | EmbeddingBatcher,
+        root: Path,
+        *,
+        workers: int = 0,
+        batch_size: int = 512,
+        checkpoint_path: Path | None = None,
+        span_bytes: int = 4 << 20,
+        sign: bool | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._engine = engine
+        self._embedding_service = embedding_service
+        self._root = root
+        self._workers = workers
+        self._batch_size = max(1, batch_size)
+        self._checkpoint_path = checkpoint_path
+        self._span_bytes = span_bytes
+        # MinHash signatures and LSH buckets are only needed for near-duplicate detection.
+        self._sign = get_settings().memory_dedup_mode != "off" if sign is None else sign
+        self._clock = clock
+        self._restored = get_metrics_registry().counter("memory_restore_notes", "Notes restored from archives")
+
+    def run(self, *, reset: bool = False) -> RestoreReport:
+        done = set() if reset else self._load_checkpoint()
+        tasks = [task for task in plan_tasks(self._root, span_bytes=self._span_bytes, sign=self._sign) if task.key not in done]
+        report = RestoreReport()
+        started = self._clock()
+        seen: set[str] = set()
+        for task, rows in self._read(tasks):
+            fresh = []
+            for row in rows:
+                if row["note_id"] not in seen:
+                    seen.add(row["note_id"])
+                    fresh.append(row)
+            restored = self._load(fresh)
+            report.tasks += 1
+            report.read += len(rows)
+            report.restored += restored
+            report.skipped += len(rows) - restored
+            report.seconds = self._clock() - started
+            done.add(task.key)
+            self._save_checkpoint(done)
+            logger.info(
+                "Restored archive span",
+                extra={"task": task.key, "restored": report.restored, "notes_per_second": round(report.notes_per_second, 1)},
+            )
+        report.seconds = self._clock() - started
+        return report
+
+    def _read(self, tasks: Sequence[RestoreTask]) -> Iterator[tuple[RestoreTask, List[Dict[str, Any]]]]:
+        if self._workers <= 0:
+            for task in tasks:
+                yield task, read_task(task)
+            return
+        # A bounded window keeps decoded spans from piling up while the parent embeds.
+        with ProcessPoolExecutor(max_workers=self._workers) as pool:
+            window: Deque[tuple[RestoreTask, Future]] = deque()
+            pending = iter(tasks)
+            for task in pending:
+                window.append((task, pool.submit(read_task, task)))
+                if len(window) >= self._workers * 2:
+                    break
+            while window:
+                task, future = window.popleft()
+                rows = future.result()
+                following = next(pending, None)
+                if following is not None:
+                    window.append((following, pool.submit(read_task, following)))
+                yield task, rows
+
+    def _load(self, rows: List[Dict[str, Any]]) -> int:
+        restored = 0
+        for start in range(0, len(rows), self._batch_size):
+            batch = rows[start : start + self._batch_size]
+            with Session(self._engine) as session, session.begin():
+                existing = set(
+                    session.scalars(
+                        select(MemoryNoteModel.note_id).where(
+                            MemoryNoteModel.note_id.in_([row["note_id"] for row in batch])
+                        )
+                    )
+                )
+                batch = [row for row in batch if row["note_id"] not in existing]
+                if not batch:
+                    continue
+                embeddings = self._embedding_service.embed([row["text"] for row in batch])
+                model_id = self._embedding_service.model_id
+                notes = [
+                    {
+                        **{key: value for key, value in row.items() if key != "buckets"},
+                        "embedding": embedding,
+                        "embedding_model": model_id,
+                    }
+                    for row, embedding in zip(batch, embeddings)
+                ]
+                if session.get_bind().dialect.name == "postgresql":
+                    inserted = self._copy(session, notes)
+                else:
+                    inserted = self._insert(session, notes)
+                buckets = [
+                    {"bucket": bucket, "note_id": row["note_id"]}
+                    for row in batch
+                    if row["note_id"] in inserted
+                    for bucket in row["buckets"]
+                ]
+                if buckets:
+                    if session.get_bind().dialect.name == "postgresql":
+                        self._copy_buckets(session, buckets)
+                    else:
+                        session.execute(sqlite_insert(MemoryNoteBucket).on_conflict_do_nothing(), buckets)
+            restored += len(inserted)
+        self._restored.inc(restored)
+        return restored
+
+    @staticmethod
+    def _insert(session: Session, notes: List[Dict[str, Any]]) -> set[str]:
+        stmt = sqlite_insert(MemoryNoteModel).on_conflict_do_nothing().returning(MemoryNoteModel.note_id)
+        return set(session.scalars(stmt, notes))
+
+    @staticmethod
+    def _copy(session: Session, notes: List[Dict[str, Any]]) -> set[str]:
+        session.execute(
+            text("CREATE TEMP TABLE IF NOT EXISTS restore_memory_notes (LIKE memory_notes) ON COMMIT DELETE ROWS")
+        )
+        columns = ", ".join(f'"{column}"' for column in _NOTE_COLUMNS)
+        cursor = session.connection().connection.driver_connection.cursor()
+        with cursor.copy(f"COPY restore_memory_notes ({columns}) FROM STDIN") as copy:
+            for note in notes:
+                copy.write_row([_copy_value(column, note[column]) for column in _NOTE_COLUMNS])
+        return set(
+            session.scalars(
+                text(
+                    f"INSERT INTO memory_notes ({columns}) SELECT {columns} FROM restore_memory_notes "
+                    "ON CONFLICT (note_id) DO NOTHING RETURNING note_id"
+                )
+            )
+        )
+
+    @staticmethod
+    def _copy_buckets(session: Session, buckets: List[Dict[str, Any]]) -> None:
+        session.execute(
+            text(
+                "CREATE TEMP TABLE IF NOT EXISTS restore_memory_note_buckets "
+                "(LIKE memory_note_buckets) ON COMMIT DELETE ROWS"
+            )
+        )
+        cursor = session.connection().connection.driver_connection.cursor()
+        with cursor.copy("COPY restore_memory_note_buckets (bucket, note_id) FROM STDIN") as copy:
+            for bucket in buckets:
+                copy.write_row([bucket["bucket"], bucket["note_id"]])
+        session.execute(
+            text(
+                "INSERT INTO memory_note_buckets (bucket, note_id) "
+                "SELECT bucket, note_id FROM restore_memory_note_buckets ON CONFLICT DO NOTHING"
+            )
+        )
+
+    def _load_checkpoint(self) -> set[str]:
+        if self._checkpoint_path is None or not self._checkpoint_path.exists():
+            return set()
+        try:
+            return set(json.loads(self._checkpoint_path.read_text(encoding="utf-8"))["done"])
+        except (OSError, ValueError, KeyError):
+            logger.warning("Ignoring unreadable restore checkpoint %s", self._checkpoint_path)
+            return set()
+
+    def _save_checkpoint(self, done: set[str]) -> None:
+        if self._checkpoint_path is None:
+            return
+        self._checkpoint_path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = self._checkpoint_path.with_suffix(".tmp")
+        temporary.write_text(json.dumps({"done": sorted(done)}), encoding="utf-8")
+        temporary.replace(self._checkpoint_path)
+
+
+def create_restore(
+    settings: Settings | None = None, engine: Engine | None = None, *, workers: int | None = None
+) -> ArchiveRestore:
+    settings = settings or get_settings()
+    if engine is None:
+        from app.db.session import get_engine
+
+        engine = get_engine()
+    return ArchiveRestore(
+        engine,
+        get_embedding_service(),
+        settings.memory_library_path / "archives",
+        workers=(os.cpu_count() or 1) if workers is None else workers,
+        batch_size=settings.memory_restore_batch_size,
+        checkpoint_path=settings.resolve_path(settings.memory_restore_checkpoint),
+    )
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Restore memory notes from their archives")
+    parser.add_argument("--workers", type=int, default=None, help="Decoding processes (default: CPU count, 0 inline)")
+    parser.add_argument("--reset", action="store_true", help="Ignore the checkpoint and scan every archive again")
+    args = parser.parse_args(argv)
+
+    from app.db.setup import init_db
+
+    logging.basicConfig(level=logging.INFO, format="[%(asctime)s] %(levelname)s %(name)s: %(message)s")
+    init_db()
+    report = create_restore(workers=args.workers).run(reset=args.reset)
+    print(
+        f"restored: {report.restored}, already present: {report.skipped}, "
+        f"{report.notes_per_second:.1f} notes/s over {report.seconds:.1f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,37 @@
 from __future__ import annotations
 
-import json
-import gzip
-from pathlib import Path
-from typing import Sequence
+from typing import Any, Sequence
 
 from sqlalchemy.orm import Session
 
 from app.core.config import get_settings
-from app.memory.domain import MemoryNoteDTO
+from app.core.metrics import get_metrics_registry
+from app.core.singleflight import SingleFlight
+from app.memory.archive import ArchiveWriter, create_archive_writer
+from app.memory.domain import MemoryNoteDTO, MemoryNoteInput, MemoryNotePage, MemoryRerank
 from app.memory.repository import MemoryRepository
+from app.services.query_cache import QueryResultCache, create_query_cache, normalize_query
+
+
+_NOTES_SCOPE = "memory_notes"
 
 
 class MemoryService:
-    def __init__(self, repository: MemoryRepository | None = None) -> None:
+    def __init__(
+        self,
+        repository: MemoryRepository | None = None,
+        query_cache: QueryResultCache | None = None,
+        archive_writer: ArchiveWriter | None = None,
+    ) -> None:
         self._repository = repository or MemoryRepository()
         settings = get_settings()
-        self._archive_dir = settings.memory_library_path / "archives"
-        self._archive_dir.mkdir(parents=True, exist_ok=True)
+        self._query_cache = query_cache or create_query_cache(settings, "memory_query_cache")
+        self._flight: SingleFlight[tuple[MemoryNoteDTO, ...]] = SingleFlight(
+            get_metrics_registry().counter("memory_query_coalesced", "find_notes calls served by an in-flight twin")
+        )
+        self._archives = archive_writer or create_archive_writer(
+            settings, settings.memory_library_path / "archives"
+        )
 
     def add_note(
         self,
@@ -39,10 +53,28 @@ class MemoryService:
             agent=agent,
             note_id=note_id,
         )
+        if created or self._merges_duplicates():
+            self._invalidate(session)
         if created:
-            self._write_archive(note)
+            self._archives.submit(note)
         return note, created
 
+    def add_notes(
+        self,
+        session: Session,
+        *,
+        user: str,
+        agent: str,
+        notes: Sequence[MemoryNoteInput],
+    ) -> list[tuple[MemoryNoteDTO, bool]]:
+        results = self._repository.add_notes(session, notes, user=user, agent=agent)
+        if any(created for _, created in results) or self._merges_duplicates():
+            self._invalidate(session)
+        for note, created in results:
+            if created:
+                self._archives.submit(note)
+        return results
+
     def find_notes(
         self,
         session: Session,
@@ -50,22 +82,103 @@ class MemoryService:
         query: str,
         tags: Sequence[str] | None,
         limit: int,
+        mode: str | None = None,
+        rerank: MemoryRerank | None = None,
     ) -> list[MemoryNoteDTO]:
-        return self._repository.find_notes(session, query=query, tags=tags, limit=limit)
-
-    def _write_archive(self, note: MemoryNoteDTO) -> None:
-        payload = {
-            "note_id": note.note_id,
-            "user": note.user,
-            "agent": note.agent,
-            "text": note.text,
-            "tags": note.tags,
-            "metadata": note.metadata,
-            "created_at": note.created_at.isoformat(),
-            "updated_at": note.updated_at.isoformat(),
-        }
-        archive_path = self._archive_dir / f"{note.note_id}.zmem"
-        if archive_path.exists():
-            return
-        with gzip.open(archive_path, "wt", encoding="utf-8") as handle:
-            json.dump(payload, handle, ensure_ascii=False)
+        key = self._query_key(query, tags, limit, mode, rerank)
+        generation = 0
+        if self._query_cache is not None:
+            cached = self._query_cache.get(_NOTES_SCOPE, key)
+            if cached is not None:
+                return list(cached)
+            generation = self._query_cache.generation(_NOTES_SCOPE)
+        notes = self._flight.do(
+            (key, generation),
+            lambda: tuple(
+                self._repository.find_notes(
+                    session, query=query, tags=tags, limit=limit, mode=mode, rerank=rerank
+                )
+            ),
+        )
+        if self._query_cache is not None:
+            self._query_cache.put(_NOTES_SCOPE, key, notes, generation)
+        return list(notes)
+
+    def find_notes_batch(
+        self,
+        session: Session,
+        *,
+        queries: Sequence[str],
+        tags: Sequence[str] | None,
+        limit: int,
+        mode: str | None = None,
+        rerank: MemoryRerank | None = None,
+    ) -> list[list[MemoryNoteDTO]]:
+        """Per-query results; cache misses are searched together in one batch."""
+
+        keys = [self._query_key(query, tags, limit, mode, rerank) for query in queries]
+        results: list[tuple[MemoryNoteDTO, ...] | None] = [None] * len(queries)
+        generation = 0
+        if self._query_cache is not None:
+            generation = self._query_cache.generation(_NOTES_SCOPE)
+            results = [self._query_cache.get(_NOTES_SCOPE, key) for key in keys]
+        missing = [position for position, cached in enumerate(results) if cached is None]
+        if missing:
+            found = self._repository.find_notes_batch(
+                session,
+                queries=[queries[position] for position in missing],
+                tags=tags,
+                limit=limit,
+                mode=mode,
+                rerank=rerank,
+            )
+            for position, notes in zip(missing, found):
+                results[position] = tuple(notes)
+                if self._query_cache is not None:
+                    self._query_cache.put(_NOTES_SCOPE, keys[position], results[position], generation)
+        return [list(notes or ()) for notes in results]
+
+    @staticmethod
+    def _merges_duplicates() -> bool:
+        # A merge touches the canonical note's tags and updated_at without creating a row.
+        return get_settings().memory_dedup_mode == "merge"
+
+    @staticmethod
+    def _query_key(
+        query: str, tags: Sequence[str] | None, limit: int, mode: str | None, rerank: MemoryRerank | None
+    ) -> tuple[Any, ...]:
+        return (
+            normalize_query(query),
+            tuple(sorted({tag.strip().lower() for tag in tags or [] if tag.strip()})),
+            limit,
+            mode or get_settings().search_default_mode,
+            rerank if rerank is not None and rerank.active else None,
+        )
+
+    def list_notes(
+        self,
+        session: Session,
+        *,
+        tags: Sequence[str] | None,
+        limit: int,
+        cursor: str | None = None,
+        user: str | None = None,
+        agent: str | None = None,
+    ) -> MemoryNotePage:
+        return self._repository.list_notes(session, tags=tags, limit=limit, cursor=cursor, user=user, agent=agent)
+
+    def recover_archives(self) -> int:
+        return self._archives.recover()
+
+    def read_archive(self, note_id: str) -> dict[str, Any] | None:
+        return self._archives.packs.get(note_id)
+
+    def flush_archives(self, timeout: float | None = None) -> bool:
+        return self._archives.flush(timeout)
+
+    def close(self) -> None:
+        self._archives.close()
+
+    def _invalidate(self, session: Session) -> None:
+        if self._query_cache is not None:
+            self._query_cache.invalidate_on_commit(session, _NOTES_SCOPE)
@@ -1,8 +1,8 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Literal
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel, Field
 from sqlalchemy.orm import Session
 
@@ -11,7 +11,7 @@ from app.dependencies import (
     get_db_session,
     get_memory_service,
 )
-from app.memory.domain import MemoryNoteDTO
+from app.memory.domain import MemoryNoteDTO, MemoryNoteInput, MemoryRerank
 from app.memory.service import MemoryService
 from app.services.audit import AuditLogger
 
@@ -62,15 +62,62 @@ class MemoryNoteAddResponse(BaseModel):
     created: bool
 
 
-class MemoryNoteFindRequest(BaseModel):
+class MemoryNoteAddBatchRequest(BaseModel):
+    user: str = Field(..., min_length=1)
+    agent: str = Field(..., min_length=1)
+    notes: List[MemoryNotePayload] = Field(..., min_length=1, max_length=500)
+
+
+class MemoryNoteAddBatchResponse(BaseModel):
+    results: List[MemoryNoteAddResponse]
+
+
+class MemoryRerankParams(BaseModel):
+    recency_weight: float = Field(0.0, ge=0.0, le=1.0, description="Weight of the updated_at decay in the score")
+    recency_half_life_hours: float = Field(168.0, gt=0.0, description="Age at which the recency decay halves")
+    mmr_lambda: float | None = Field(
+        default=None, ge=0.0, le=1.0, description="Enable MMR diversification (1 = relevance only)"
+    )
+    candidates: int | None = Field(default=None, ge=1, le=500, description="Candidate pool reranked down to limit")
+
+    def to_rerank(self) -> MemoryRerank:
+        return MemoryRerank(
+            recency_weight=self.recency_weight,
+            half_life_hours=self.recency_half_life_hours,
+            mmr_lambda=self.mmr_lambda,
+            candidates=self.candidates,
+        )
+
+
+class MemoryNoteFindRequest(MemoryRerankParams):
     user: str = Field(..., min_length=1)
     query: str = Field("", description="Full-text query string")
     tags: List[str] = Field(default_factory=list)
     limit: int = Field(20, ge=1, le=100)
+    mode: Literal["vector", "lexical", "hybrid"] | None = Field(
+        default=None,
+        description="vector, lexical (no embedding) or hybrid (rank fusion); defaults to SEARCH_DEFAULT_MODE",
+    )
+    cursor: str | None = Field(default=None, description="next_cursor of the previous page (empty query only)")
+    author: str | None = Field(default=None, description="Only notes written by this user (empty query only)")
+    agent: str | None = Field(default=None, description="Only notes written by this agent (empty query only)")
 
 
 class MemoryNoteFindResponse(BaseModel):
     results: List[MemoryNoteModel]
+    next_cursor: str | None = None
+
+
+class MemoryNoteFindBatchRequest(MemoryRerankParams):
+    user: str = Field(..., min_length=1)
+    queries: List[str] = Field(..., min_length=1, max_length=50)
+    tags: List[str] = Field(default_factory=list)
+    limit: int = Field(20, ge=1, le=100)
+    mode: Literal["vector", "lexical", "hybrid"] | None = None
+
+
+class MemoryNoteFindBatchResponse(BaseModel):
+    results: List[List[MemoryNoteModel]]
 
 
 @router.post(
@@ -97,6 +144,38 @@ def add_memory_note(
     return MemoryNoteAddResponse(note=MemoryNoteModel.from_domain(note), created=created)
 
 
+@router.post(
+    "/memory/note/add_batch",
+    name="memory.note.add_batch",
+    operation_id="memory.note.add_batch",
+)
+def add_memory_notes(
+    request: MemoryNoteAddBatchRequest,
+    audit_logger: AuditLogger = Depends(get_audit_logger),
+    service: MemoryService = Depends(get_memory_service),
+    session: Session = Depends(get_db_session),
+) -> MemoryNoteAddBatchResponse:
+    audit_logger.log(
+        "memory.note.add_batch",
+        {"agent": request.agent, "count": len(request.notes)},
+        request.user,
+    )
+    results = service.add_notes(
+        session,
+        user=request.user,
+        agent=request.agent,
+        notes=[
+            MemoryNoteInput(text=note.text, tags=note.tags, metadata=note.metadata, note_id=note.note_id)
+            for note in request.notes
+        ],
+    )
+    return MemoryNoteAddBatchResponse(
+        results=[
+            MemoryNoteAddResponse(note=MemoryNoteModel.from_domain(note), created=created) for note, created in results
+        ]
+    )
+
+
 @router.post(
     "/memory/note/find",
     name="memory.note.find",
@@ -109,10 +188,57 @@ def find_memory_notes(
     session: Session = Depends(get_db_session),
 ) -> MemoryNoteFindResponse:
     audit_logger.log("memory.note.find", request.model_dump(exclude={"user"}), request.user)
+    if not request.query.strip():
+        try:
+            page = service.list_notes(
+                session,
+                tags=request.tags,
+                limit=request.limit,
+                cursor=request.cursor,
+                user=request.author,
+                agent=request.agent,
+            )
+        except ValueError as error:
+            raise HTTPException(status_code=400, detail=str(error)) from error
+        return MemoryNoteFindResponse(
+            results=[MemoryNoteModel.from_domain(note) for note in page.notes],
+            next_cursor=page.next_cursor,
+        )
+    if request.cursor or request.author or request.agent:
+        raise HTTPException(status_code=400, detail="cursor, author and agent require an empty query")
     notes = service.find_notes(
         session,
         query=request.query,
         tags=request.tags,
         limit=request.limit,
+        mode=request.mode,
+        rerank=request.to_rerank(),
     )
     return MemoryNoteFindResponse(results=[MemoryNoteModel.from_domain(note) for note in notes])
+
+
+@router.post(
+    "/memory/note/find_batch",
+    name="memory.note.find_batch",
+    operation_id="memory.note.find_batch",
+)
+def find_memory_notes_batch(
+    request: MemoryNoteFindBatchRequest,
+    audit_logger: AuditLogger = Depends(get_audit_logger),
+    service: MemoryService = Depends(get_memory_service),
+    session: Session = Depends(get_db_session),
+) -> MemoryNoteFindBatchResponse:
+    audit_logger.log("memory.note.find_batch", request.model_dump(exclude={"user"}), request.user)
+    if not all(query.strip() for query in request.queries):
+        raise HTTPException(status_code=400, detail="Queries must not be empty")
+    results = service.find_notes_batch(
+        session,
+        queries=request.queries,
+        tags=request.tags,
+        limit=request.limit,
+        mode=request.mode,
+        rerank=request.to_rerank(),
+    )
+    return MemoryNoteFindBatchResponse(
+        results=[[MemoryNoteModel.from_domain(note) for note in notes] for notes in results]
+    )
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 import json
 from hashlib import sha256
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Literal
 
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel, Field
@@ -40,6 +40,10 @@ class RAGIndexRequest(BaseModel):
 
 class RAGIndexResponse(BaseModel):
     document_ids: List[str]
+    created: int = 0
+    updated: int = 0
+    embedded: int = 0
+    skipped: int = 0
 
 
 class RAGQueryRequest(BaseModel):
@@ -47,6 +51,10 @@ class RAGQueryRequest(BaseModel):
     collection: str = Field(..., min_length=1)
     query: str = Field(..., min_length=1)
     n_results: int = Field(5, ge=1, le=50)
+    mode: Literal["vector", "lexical", "hybrid"] | None = Field(
+        default=None,
+        description="vector, lexical (no embedding) or hybrid (rank fusion); defaults to SEARCH_DEFAULT_MODE",
+    )
 
 
 class RAGQueryHit(BaseModel):
@@ -60,6 +68,18 @@ class RAGQueryResponse(BaseModel):
     results: List[RAGQueryHit] = Field(default_factory=list)
 
 
+class RAGQueryBatchRequest(BaseModel):
+    user: str = Field(..., min_length=1)
+    collection: str = Field(..., min_length=1)
+    queries: List[str] = Field(..., min_length=1, max_length=50)
+    n_results: int = Field(5, ge=1, le=50)
+    mode: Literal["vector", "lexical", "hybrid"] | None = None
+
+
+class RAGQueryBatchResponse(BaseModel):
+    results: List[RAGQueryResponse]
+
+
 @router.post("/rag/index", name="rag.index", operation_id="rag.index")
 def rag_index(
     request: RAGIndexRequest,
@@ -75,10 +95,16 @@ def rag_index(
         for doc in request.documents
     ]
     try:
-        ids = service.index(session, request.collection, documents)
+        result = service.index(session, request.collection, documents)
     except Exception as error:  # pragma: no cover - runtime errors propagate
         raise HTTPException(status_code=500, detail=str(error)) from error
-    return RAGIndexResponse(document_ids=ids)
+    return RAGIndexResponse(
+        document_ids=result.document_ids,
+        created=result.created,
+        updated=result.updated,
+        embedded=result.embedded,
+        skipped=result.skipped,
+    )
 
 
 @router.post("/rag/query", name="rag.query", operation_id="rag.query")
@@ -90,8 +116,26 @@ def rag_query(
 ) -> RAGQueryResponse:
     audit_logger.log("rag.query", request.model_dump(exclude={"user"}), request.user)
     try:
-        result = service.query(session, request.collection, request.query, request.n_results)
+        result = service.query(session, request.collection, request.query, request.n_results, mode=request.mode)
     except Exception as error:  # pragma: no cover
         raise HTTPException(status_code=500, detail=str(error)) from error
     return RAGQueryResponse(results=result)
 
+
+@router.post("/rag/query_batch", name="rag.query_batch", operation_id="rag.query_batch")
+def rag_query_batch(
+    request: RAGQueryBatchRequest,
+    audit_logger: AuditLogger = Depends(get_audit_logger),
+    service: RAGService = Depends(get_rag_service),
+    session: Session = Depends(get_db_session),
+) -> RAGQueryBatchResponse:
+    audit_logger.log("rag.query_batch", request.model_dump(exclude={"user"}), request.user)
+    if not all(query.strip() for query in request.queries):
+        raise HTTPException(status_code=400, detail="Queries must not be empty")
+    try:
+        results = service.query_batch(
+            session, request.collection, request.queries, request.n_results, mode=request.mode
+        )
+    except Exception as error:  # pragma: no cover
+        raise HTTPException(status_code=500, detail=str(error)) from error
+    return RAGQueryBatchResponse(results=[RAGQueryResponse(results=hits) for hits in results])
@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from dataclasses import dataclass
+import threading
+import time
+from typing import Any, Dict, Hashable, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.core.config import Settings
+from app.core.metrics import get_metrics_registry
+
+
+@dataclass(slots=True)
+class QueryCacheStats:
+    hits: int = 0
+    misses: int = 0
+    stale: int = 0
+    evictions: int = 0
+    invalidations: int = 0
+
+    def as_dict(self, entries: int) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale": self.stale,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "entries": entries,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class QueryResultCache:
+    """Bounded LRU of query results, invalidated per scope by a generation counter.
+
+    A scope is a table or a RAG collection. Callers read ``generation(scope)``
+    before running the query and pass it to ``put``; a write bumps the
+    generation, so results computed from older data are never served again.
+    Generations are process-local: writes from other processes are only
+    bounded by ``ttl_seconds``.
+    """
+
+    def __init__(self, *, max_entries: int, ttl_seconds: float) -> None:
+        self._max_entries = max_entries
+        self._ttl = ttl_seconds
+        self._entries: "OrderedDict[Tuple[Hashable, Hashable], Tuple[int, float, Any]]" = OrderedDict()
+        self._generations: Dict[Hashable, int] = {}
+        self._stats = QueryCacheStats()
+        self._lock = threading.Lock()
+
+    def generation(self, scope: Hashable) -> int:
+        return self._generations.get(scope, 0)
+
+    def get(self, scope: Hashable, key: Hashable) -> Any | None:
+        with self._lock:
+            entry = self._entries.get((scope, key))
+            if entry is None:
+                self._stats.misses += 1
+                return None
+            generation, stored_at, value = entry
+            if generation != self._generations.get(scope, 0) or (
+                self._ttl > 0 and time.monotonic() - stored_at > self._ttl
+            ):
+                del self._entries[(scope, key)]
+                self._stats.stale += 1
+                self._stats.misses += 1
+                return None
+            self._entries.move_to_end((scope, key))
+            self._stats.hits += 1
+            return value
+
+    def put(self, scope: Hashable, key: Hashable, value: Any, generation: int) -> None:
+        if self._max_entries <= 0:
+            return
+        with self._lock:
+            if generation != self._generations.get(scope, 0):
+                return
+            self._entries[(scope, key)] = (generation, time.monotonic(), value)
+            self._entries.move_to_end((scope, key))
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+                self._stats.evictions += 1
+
+    def invalidate(self, scope: Hashable) -> None:
+        with self._lock:
+            self._generations[scope] = self._generations.get(scope, 0) + 1
+            self._stats.invalidations += 1
+
+    def invalidate_on_commit(self, session: Session, scope: Hashable) -> None:
+        """Invalidate now and again once ``session`` commits.
+
+        The second bump discards results computed by other requests while the
+        write was not yet visible to them. Pending scopes live in
+        ``session.info`` and the session hooks are registered once, since the
+        scoped session is reused across requests.
+        """
+
+        self.invalidate(scope)
+        pending = session.info.get(self)
+        if pending is None:
+            pending = session.info[self] = set()
+            event.listen(session, "after_commit", self._invalidate_pending)
+            event.listen(session, "after_transaction_end", self._drop_pending)
+        pending.add(scope)
+
+    def _invalidate_pending(self, session: Session) -> None:
+        pending = session.info.get(self)
+        while pending:
+            self.invalidate(pending.pop())
+
+    def _drop_pending(self, session: Session, transaction: Any) -> None:
+        if transaction.parent is None and session.info.get(self):
+            session.info[self].clear()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._stats = QueryCacheStats()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return self._stats.as_dict(len(self._entries))
+
+
+def create_query_cache(settings: Settings, metrics_name: str) -> QueryResultCache | None:
+    if not settings.query_cache_enabled:
+        return None
+    cache = QueryResultCache(
+        max_entries=settings.query_cache_max_entries,
+        ttl_seconds=settings.query_cache_ttl_seconds,
+    )
+    get_metrics_registry().register_collector(metrics_name, cache.stats)
+    return cache
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.split())
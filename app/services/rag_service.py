@@ -2,13 +2,51 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from datetime import datetime, timezone
+import hashlib
 from typing import Any, Dict, List, Sequence
 
-from sqlalchemy import select
+from sqlalchemy import Select, select, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Row
 from sqlalchemy.orm import Session
 
+from app.core.config import Settings, get_settings
+from app.core.metrics import get_metrics_registry
+from app.core.singleflight import SingleFlight
 from app.db.models.rag import RAGDocument as RAGDocumentModel
-from app.vector.embedding import EmbeddingService, get_embedding_service
+from app.db.fulltext import match_fulltext
+from app.db.vector_indexes import apply_search_settings, nearest_neighbours_many
+from app.services.query_cache import QueryResultCache, create_query_cache, normalize_query
+from app.vector.batching import EmbeddingBatcher, get_embedding_scheduler
+from app.vector.embedding import EmbeddingService
+from app.vector.index import TableVectorIndex, create_vector_index, index_persist_path
+from app.vector.ranking import reciprocal_rank_fusion
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def create_rag_vector_index(settings: Settings, *, fresh: bool = False) -> TableVectorIndex:
+    persist_path = index_persist_path(settings, RAGDocumentModel.__tablename__)
+    return TableVectorIndex(
+        index=create_vector_index(settings, persist_path),
+        key_columns=(RAGDocumentModel.collection, RAGDocumentModel.doc_id),
+        embedding_column=RAGDocumentModel.embedding,
+        updated_column=RAGDocumentModel.updated_at,
+        label_column=RAGDocumentModel.collection,
+        model_column=RAGDocumentModel.embedding_model,
+        labels=lambda collection: (collection,),
+        sync_interval=settings.vector_index_sync_interval_seconds,
+        sync_window=settings.vector_index_sync_window_seconds,
+        persist_path=persist_path,
+        persist_interval=settings.vector_index_persist_interval_seconds,
+        restore=not fresh,
+        # Serving indexes build their graph off the request path; rebuilds (fresh) block.
+        background_build=not fresh,
+        max_tombstone_ratio=settings.hnsw_max_tombstone_ratio,
+    )
 
 
 @dataclass(slots=True)
@@ -18,45 +56,133 @@ class RAGDocument:
     metadata: Dict[str, Any]
 
 
+@dataclass(slots=True)
+class RAGIndexResult:
+    document_ids: List[str]
+    created: int = 0
+    updated: int = 0
+    embedded: int = 0
+    skipped: int = 0
+
+
 class RAGService:
-    def __init__(self, embedding_service: EmbeddingService | None = None) -> None:
-        self._embedding_service = embedding_service or get_embedding_service()
+    def __init__(
+        self,
+        embedding_service: EmbeddingService | EmbeddingBatcher | None = None,
+        vector_index: TableVectorIndex | None = None,
+        query_cache: QueryResultCache | None = None,
+    ) -> None:
+        settings = get_settings()
+        self._embedding_service = embedding_service or get_embedding_scheduler()
+        self._vector_index = vector_index or create_rag_vector_index(settings)
+        self._query_cache = query_cache or create_query_cache(settings, "rag_query_cache")
+        self._flight: SingleFlight[tuple[Dict[str, Any], ...]] = SingleFlight(
+            get_metrics_registry().counter("rag_query_coalesced", "RAG queries served by an in-flight twin")
+        )
 
     def index(
         self,
         session: Session,
         collection_name: str,
         documents: Sequence[RAGDocument],
-    ) -> List[str]:
+    ) -> RAGIndexResult:
+        """Upsert documents in chunks of ``RAG_INDEX_CHUNK_SIZE``; the last copy of a repeated id wins.
+
+        Only new texts, changed texts (by ``content_hash``) and vectors of another
+        model are embedded; unchanged documents keep their vector and only get
+        their metadata rewritten when it differs.
+        """
+
         if not documents:
-            return []
-        embeddings = self._embedding_service.embed([doc.text for doc in documents])
+            return RAGIndexResult(document_ids=[])
+        latest = {doc.doc_id: doc for doc in documents}
+        model_id = self._embedding_service.model_id
+        chunk_size = max(1, get_settings().rag_index_chunk_size)
+        ids = list(latest)
+        stored: Dict[str, Row] = {}
+        for start in range(0, len(ids), chunk_size):
+            stored.update(self._stored_versions(session, collection_name, ids[start : start + chunk_size]))
+        changed: List[tuple[RAGDocument, str]] = []
+        retagged: List[RAGDocument] = []
+        for doc in latest.values():
+            digest = content_hash(doc.text)
+            current = stored.get(doc.doc_id)
+            if current is None or current.content_hash != digest or current.embedding_model != model_id:
+                changed.append((doc, digest))
+            elif current.payload != dict(doc.metadata or {}):
+                retagged.append(doc)
+
+        embeddings = self._embedding_service.embed([doc.text for doc, _ in changed])
         now = datetime.now(timezone.utc)
-        indexed_ids: List[str] = []
-        for doc, vector in zip(documents, embeddings):
-            primary_key = (collection_name, doc.doc_id)
-            existing = session.get(RAGDocumentModel, primary_key)
-            payload = dict(doc.metadata or {})
-            if existing:
-                existing.text = doc.text
-                existing.payload = payload
-                existing.embedding = vector
-                existing.updated_at = now
-                session.add(existing)
-            else:
-                record = RAGDocumentModel(
-                    collection=collection_name,
-                    doc_id=doc.doc_id,
-                    text=doc.text,
-                    payload=payload,
-                    embedding=vector,
-                    created_at=now,
-                    updated_at=now,
-                )
-                session.add(record)
-            indexed_ids.append(doc.doc_id)
-        session.flush()
-        return indexed_ids
+        rows = [
+            {
+                "collection": collection_name,
+                "doc_id": doc.doc_id,
+                "text": doc.text,
+                "payload": dict(doc.metadata or {}),
+                "embedding": vector,
+                "embedding_model": model_id,
+                "content_hash": digest,
+                "created_at": now,
+                "updated_at": now,
+            }
+            for (doc, digest), vector in zip(changed, embeddings)
+        ]
+        for start in range(0, len(rows), chunk_size):
+            self._upsert(session, rows[start : start + chunk_size])
+        created = sum(1 for doc, _ in changed if doc.doc_id not in stored)
+        if retagged:
+            session.execute(
+                update(RAGDocumentModel),
+                [
+                    {
+                        "collection": collection_name,
+                        "doc_id": doc.doc_id,
+                        "payload": dict(doc.metadata or {}),
+                        "updated_at": now,
+                    }
+                    for doc in retagged
+                ],
+            )
+        for row in rows:
+            self._vector_index.upsert_on_commit(
+                session, (collection_name, row["doc_id"]), row["embedding"], collection_name, model_id
+            )
+        if self._query_cache is not None and (rows or retagged):
+            self._query_cache.invalidate_on_commit(session, collection_name)
+        return RAGIndexResult(
+            document_ids=[doc.doc_id for doc in documents],
+            created=created,
+            updated=len(rows) - created + len(retagged),
+            embedded=len(rows),
+            skipped=len(latest) - len(rows),
+        )
+
+    @staticmethod
+    def _stored_versions(session: Session, collection_name: str, doc_ids: Sequence[str]) -> Dict[str, Row]:
+        stmt = select(
+            RAGDocumentModel.doc_id,
+            RAGDocumentModel.content_hash,
+            RAGDocumentModel.embedding_model,
+            RAGDocumentModel.payload,
+        ).where(RAGDocumentModel.collection == collection_name, RAGDocumentModel.doc_id.in_(doc_ids))
+        return {row.doc_id: row for row in session.execute(stmt)}
+
+    @staticmethod
+    def _upsert(session: Session, rows: List[Dict[str, Any]]) -> None:
+        """One INSERT ... ON CONFLICT DO UPDATE for the chunk; updates keep the stored created_at."""
+
+        bind = session.get_bind()
+        insert = postgresql_insert if bind is not None and bind.dialect.name == "postgresql" else sqlite_insert
+        stmt = insert(RAGDocumentModel)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[RAGDocumentModel.collection, RAGDocumentModel.doc_id],
+            set_={
+                column: stmt.excluded[column]
+                for column in ("text", "payload", "embedding", "embedding_model", "content_hash", "updated_at")
+            },
+        )
+        session.execute(stmt, rows)
 
     def query(
         self,
@@ -64,42 +190,144 @@ class RAGService:
         collection_name: str,
         query_text: str,
         n_results: int,
+        mode: str | None = None,
     ) -> List[Dict[str, Any]]:
-        embedding = self._embedding_service.embed([query_text])[0]
+        mode = mode or get_settings().search_default_mode
+        key = (normalize_query(query_text), n_results, mode)
+        generation = 0
+        if self._query_cache is not None:
+            cached = self._query_cache.get(collection_name, key)
+            if cached is not None:
+                return [dict(result) for result in cached]
+            generation = self._query_cache.generation(collection_name)
+        results = self._flight.do(
+            (collection_name, key, generation),
+            lambda: tuple(self._query(session, collection_name, [query_text], n_results, mode)[0]),
+        )
+        if self._query_cache is not None:
+            self._query_cache.put(collection_name, key, results, generation)
+        return [dict(result) for result in results]
+
+    def query_batch(
+        self,
+        session: Session,
+        collection_name: str,
+        queries: Sequence[str],
+        n_results: int,
+        mode: str | None = None,
+    ) -> List[List[Dict[str, Any]]]:
+        """Per-query results; cache misses are embedded and scored together."""
+
+        mode = mode or get_settings().search_default_mode
+        keys = [(normalize_query(query_text), n_results, mode) for query_text in queries]
+        results: List[tuple[Dict[str, Any], ...] | None] = [None] * len(queries)
+        generation = 0
+        if self._query_cache is not None:
+            generation = self._query_cache.generation(collection_name)
+            results = [self._query_cache.get(collection_name, key) for key in keys]
+        missing = [position for position, cached in enumerate(results) if cached is None]
+        if missing:
+            found = self._query(session, collection_name, [queries[position] for position in missing], n_results, mode)
+            for position, hits in zip(missing, found):
+                results[position] = tuple(hits)
+                if self._query_cache is not None:
+                    self._query_cache.put(collection_name, keys[position], results[position], generation)
+        return [[dict(result) for result in hits or ()] for hits in results]
+
+    def _query(
+        self,
+        session: Session,
+        collection_name: str,
+        queries: Sequence[str],
+        n_results: int,
+        mode: str,
+    ) -> List[List[Dict[str, Any]]]:
+        settings = get_settings()
+        if mode not in {"vector", "lexical", "hybrid"}:
+            raise ValueError(f"Unknown search mode {mode!r}")
         base_stmt = select(RAGDocumentModel).where(RAGDocumentModel.collection == collection_name)
-        bind = session.get_bind()
-        if bind and bind.dialect.name == "postgresql":
-            distance = RAGDocumentModel.embedding.cosine_distance(embedding)  # type: ignore[attr-defined]
-            stmt = (
-                base_stmt.add_columns((1 - distance).label("score"))
-                .order_by(distance.asc())
-                .limit(n_results)
-            )
-            rows = session.execute(stmt).all()
-            results = []
-            for record, score in rows:
-                formatted = self._format_result(record, float(score) if score is not None else 0.0)
-                if formatted:
-                    results.append(formatted)
-            return results
+        depth = n_results if mode != "hybrid" else max(n_results, settings.search_hybrid_candidates)
+        vector_hits: List[List[tuple[str, float]]] = [[] for _ in queries]
+        if mode != "lexical":
+            vector_hits = self._vector_hits(session, base_stmt, collection_name, queries, depth)
 
-        rows = session.execute(base_stmt).scalars().all()
-        scored = []
-        for record in rows:
-            if not record.embedding:
+        ranked: List[Sequence[tuple[str, float]]] = []
+        for query_text, hits in zip(queries, vector_hits):
+            if mode == "vector":
+                ranked.append(hits)
                 continue
-            score = MemorySearchMixin.cosine_similarity(embedding, record.embedding)
-            scored.append((record, score))
-        scored.sort(key=lambda item: item[1], reverse=True)
-        limited = scored[:n_results]
+            rankings = [self._lexical_ranking(session, base_stmt, query_text, depth)]
+            if mode == "hybrid":
+                rankings.insert(0, [doc_id for doc_id, _ in hits])
+            ranked.append(reciprocal_rank_fusion(rankings, k=settings.search_rrf_k)[:n_results])
+
+        doc_ids = list({doc_id for hits in ranked for doc_id, _ in hits})
+        by_id: Dict[str, Row[Any]] = {}
+        if doc_ids:
+            records = session.execute(
+                base_stmt.with_only_columns(
+                    RAGDocumentModel.doc_id, RAGDocumentModel.text, RAGDocumentModel.payload
+                ).where(RAGDocumentModel.doc_id.in_(doc_ids))
+            )
+            by_id = {record.doc_id: record for record in records}
         results = []
-        for record, score in limited:
-            formatted = self._format_result(record, score)
-            if formatted:
-                results.append(formatted)
+        for hits in ranked:
+            formatted = [
+                self._format_result(by_id[doc_id], score) if doc_id in by_id else None for doc_id, score in hits
+            ]
+            results.append([result for result in formatted if result])
         return results
 
-    def _format_result(self, record: RAGDocumentModel, score: float) -> Dict[str, Any] | None:
+    def _vector_hits(
+        self,
+        session: Session,
+        base_stmt: Select[tuple[RAGDocumentModel]],
+        collection_name: str,
+        queries: Sequence[str],
+        limit: int,
+    ) -> List[List[tuple[str, float]]]:
+        embeddings = self._embedding_service.embed(queries)
+        model_id = self._embedding_service.model_id
+        bind = session.get_bind()
+        if bind and bind.dialect.name == "postgresql":
+            apply_search_settings(session, limit=limit)
+            base_stmt = base_stmt.where(RAGDocumentModel.embedding_model == model_id)
+            if len(embeddings) == 1:
+                distance = RAGDocumentModel.embedding.cosine_distance(embeddings[0])  # type: ignore[attr-defined]
+                stmt = (
+                    base_stmt.with_only_columns(RAGDocumentModel.doc_id, (1 - distance).label("score"))
+                    .order_by(distance.asc())
+                    .limit(limit)
+                )
+                hits = [(doc_id, float(score)) for doc_id, score in session.execute(stmt) if score is not None]
+                # ivfflat iterative scans only guarantee a relaxed order.
+                return [sorted(hits, key=lambda hit: hit[1], reverse=True)]
+            stmt = nearest_neighbours_many(base_stmt, RAGDocumentModel.doc_id, RAGDocumentModel.embedding, embeddings, limit)
+            results: List[List[tuple[str, float]]] = [[] for _ in embeddings]
+            for position, doc_id, score in session.execute(stmt):
+                if score is not None:
+                    results[position].append((doc_id, float(score)))
+            return results
+        hits = self._vector_index.search_many(
+            session, embeddings, limit, required_labels=(collection_name,), model_id=model_id
+        )
+        return [[(doc_id, score) for (_, doc_id), score in query_hits] for query_hits in hits]
+
+    def _lexical_ranking(
+        self,
+        session: Session,
+        base_stmt: Select[tuple[RAGDocumentModel]],
+        query_text: str,
+        limit: int,
+    ) -> List[str]:
+        stmt = match_fulltext(
+            base_stmt.with_only_columns(RAGDocumentModel.doc_id), RAGDocumentModel, query_text, session.get_bind()
+        )
+        if stmt is None:
+            return []
+        return list(session.execute(stmt.limit(limit)).scalars())
+
+    def _format_result(self, record: Row[Any], score: float) -> Dict[str, Any] | None:
         metadata = dict(getattr(record, "payload", {}) or {})
         source = metadata.get("source")
         if not source:
@@ -111,15 +339,3 @@ class RAGService:
             "metadata": metadata,
         }
 
-
-class MemorySearchMixin:
-    @staticmethod
-    def cosine_similarity(vector_a: Sequence[float], vector_b: Sequence[float]) -> float:
-        if not vector_a or not vector_b:
-            return 0.0
-        dot = sum(a * b for a, b in zip(vector_a, vector_b))
-        norm_a = sum(a * a for a in vector_a) ** 0.5
-        norm_b = sum(b * b for b in vector_b) ** 0.5
-        if norm_a == 0 or norm_b == 0:
-            return 0.0
-        return dot / (norm_a * norm_b)
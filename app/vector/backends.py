@@ -0,0 +1,316 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import math
+import re
+import socket
+import threading
+from pathlib import Path
+from typing import Callable, Dict, List, Protocol, Sequence
+
+from app.core.config import Settings
+from app.vector import wire
+
+try:  # pragma: no cover - heavy dependency not exercised in unit tests by default
+    from sentence_transformers import SentenceTransformer  # type: ignore
+except Exception:  # pragma: no cover - optional dependency
+    SentenceTransformer = None
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingBackend(Protocol):
+    """Common interface of every embedding backend.
+
+    ``model_id`` identifies the vector space (backend + model); vectors produced by
+    backends with different ids must never be compared or cached together.
+    """
+
+    name: str
+    model_id: str
+    cacheable: bool
+
+    @property
+    def dimension(self) -> int: ...
+
+    def encode(self, texts: Sequence[str]) -> List[List[float]]: ...
+
+
+class BackendUnavailable(RuntimeError):
+    """Raised when a backend cannot be loaded in the current environment."""
+
+
+class SentenceTransformerBackend:
+    name = "sentence_transformers"
+    cacheable = True
+
+    def __init__(self, model_name: str, device: str | None, dimension: int) -> None:
+        if SentenceTransformer is None:
+            raise BackendUnavailable("sentence-transformers is not installed")
+        self._model = SentenceTransformer(model_name_or_path=model_name, device=device)
+        self._dimension = getattr(self._model, "get_sentence_embedding_dimension", lambda: dimension)()
+        self.model_id = f"{self.name}:{model_name}"
+
+    @property
+    def dimension(self) -> int:
+        return self._dimension
+
+    def encode(self, texts: Sequence[str]) -> List[List[float]]:
+        vectors = self._model.encode(list(texts), show_progress_bar=False, normalize_embeddings=True)
+        return [list(map(float, vec)) for vec in vectors]
+
+
+class OnnxBackend:
+    """CPU inference of an exported transformer with ONNX Runtime (mean pooling, L2 norm).
+
+    ``model_dir`` must contain ``model.onnx`` and ``tokenizer.json`` (as produced by
+    ``optimum-cli export onnx``). With ``quantize`` the weights are dynamically
+    quantized to int8 once and cached as ``model.int8.onnx`` in the same directory.
+    """
+
+    name = "onnx"
+    cacheable = True
+
+    def __init__(
+        self,
+        model_dir: Path,
+        *,
+        dimension: int,
+        quantize: bool = True,
+        max_length: int = 256,
+        threads: int | None = None,
+    ) -> None:
+        try:
+            import numpy as np
+            import onnxruntime as ort  # type: ignore
+            from tokenizers import Tokenizer  # type: ignore
+        except Exception as error:  # pragma: no cover - optional dependency
+            raise BackendUnavailable("onnxruntime and tokenizers are required for the onnx backend") from error
+
+        model_path = model_dir / "model.onnx"
+        tokenizer_path = model_dir / "tokenizer.json"
+        if not model_path.exists() or not tokenizer_path.exists():
+            raise BackendUnavailable(f"ONNX model or tokenizer missing in {model_dir}")
+        if quantize:
+            model_path = self._quantized(model_path)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        self._np = np
+        self._session = ort.InferenceSession(str(model_path), options, providers=["CPUExecutionProvider"])
+        self._input_names = {item.name for item in self._session.get_inputs()}
+
+        self._tokenizer = Tokenizer.from_file(str(tokenizer_path))
+        self._tokenizer.enable_truncation(max_length=max_length)
+        pad_id = self._tokenizer.token_to_id("[PAD]")
+        self._tokenizer.enable_padding(pad_id=pad_id if pad_id is not None else 0, pad_token="[PAD]")
+
+        self._dimension = dimension
+        probe = self.encode(["dimension probe"])
+        if len(probe[0]) != dimension:
+            raise BackendUnavailable(f"ONNX model dimension {len(probe[0])} does not match configured {dimension}")
+        suffix = "-int8" if quantize else ""
+        self.model_id = f"{self.name}{suffix}:{model_dir.name}"
+
+    @property
+    def dimension(self) -> int:
+        return self._dimension
+
+    def encode(self, texts: Sequence[str]) -> List[List[float]]:
+        np = self._np
+        encodings = self._tokenizer.encode_batch(list(texts))
+        input_ids = np.asarray([item.ids for item in encodings], dtype=np.int64)
+        attention = np.asarray([item.attention_mask for item in encodings], dtype=np.int64)
+        feeds = {"input_ids": input_ids, "attention_mask": attention}
+        if "token_type_ids" in self._input_names:
+            feeds["token_type_ids"] = np.asarray([item.type_ids for item in encodings], dtype=np.int64)
+        hidden = self._session.run(None, feeds)[0]
+        mask = attention[..., None].astype(np.float32)
+        pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+        return pooled.astype(np.float32).tolist()
+
+    @staticmethod
+    def _quantized(model_path: Path) -> Path:
+        target = model_path.with_name("model.int8.onnx")
+        if not target.exists():
+            from onnxruntime.quantization import QuantType, quantize_dynamic  # type: ignore
+
+            logger.info("Quantizing %s to int8", model_path)
+            quantize_dynamic(str(model_path), str(target), weight_type=QuantType.QInt8)
+        return target
+
+
+class HashingBackend:
+    """Deterministic lexical embeddings via the hashing trick.
+
+    Word unigrams/bigrams and character trigrams are hashed into ``dimension``
+    signed buckets with sublinear term weighting, then L2-normalised, so cosine
+    similarity approximates TF overlap. No model, no I/O.
+    """
+
+    name = "hashing"
+    cacheable = False
+    _TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+    def __init__(self, dimension: int) -> None:
+        self._dimension = dimension
+        self.model_id = f"{self.name}:{dimension}"
+
+    @property
+    def dimension(self) -> int:
+        return self._dimension
+
+    def encode(self, texts: Sequence[str]) -> List[List[float]]:
+        return [self._encode_one(text) for text in texts]
+
+    def _encode_one(self, text: str) -> List[float]:
+        words = self._TOKEN_PATTERN.findall(text.lower())
+        features: Dict[str, float] = {}
+        for word in words:
+            features[word] = features.get(word, 0.0) + 1.0
+            padded = f"#{word}#"
+            for start in range(len(padded) - 2):
+                gram = "3:" + padded[start : start + 3]
+                features[gram] = features.get(gram, 0.0) + 0.5
+        for left, right in zip(words, words[1:]):
+            bigram = f"2:{left} {right}"
+            features[bigram] = features.get(bigram, 0.0) + 1.0
+
+        vector = [0.0] * self._dimension
+        for feature, count in features.items():
+            digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self._dimension
+            sign = 1.0 if digest[4] & 1 else -1.0
+            weight = 1.0 + math.log(count) if count > 1.0 else count
+            vector[bucket] += sign * weight
+        norm = math.sqrt(sum(value * value for value in vector))
+        if norm == 0:
+            return vector
+        return [value / norm for value in vector]
+
+
+class RemoteEmbeddingBackend:
+    """Client of the shared embedding server (``python -m app.vector.server``).
+
+    Each thread keeps its own connection; a broken connection is re-opened once
+    per request before the error is surfaced.
+    """
+
+    name = "remote"
+    cacheable = True
+
+    def __init__(self, socket_path: Path, *, timeout: float = 30.0) -> None:
+        self._socket_path = socket_path
+        self._timeout = timeout
+        self._local = threading.local()
+        try:
+            self.model_id, self._dimension = wire.decode_info(self._request(wire.info_request()))
+        except OSError as error:
+            raise BackendUnavailable(f"Embedding server unreachable at {socket_path}: {error}") from error
+
+    @property
+    def dimension(self) -> int:
+        return self._dimension
+
+    def encode(self, texts: Sequence[str]) -> List[List[float]]:
+        return wire.decode_vectors(self._request(wire.encode_request(texts)))
+
+    def _request(self, body: bytes) -> bytes:
+        payload = wire.frame(body)
+        for attempt in range(2):
+            sock = self._connection()
+            try:
+                sock.sendall(payload)
+                return wire.recv_frame(sock)
+            except (ConnectionError, socket.timeout):
+                self._local.sock = None
+                sock.close()
+                if attempt:
+                    raise
+        raise AssertionError("unreachable")
+
+    def _connection(self) -> socket.socket:
+        sock = getattr(self._local, "sock", None)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self._timeout)
+            sock.connect(str(self._socket_path))
+            self._local.sock = sock
+        return sock
+
+
+BackendFactory = Callable[[Settings], EmbeddingBackend]
+
+_BACKENDS: Dict[str, BackendFactory] = {}
+
+
+def register_backend(name: str, factory: BackendFactory) -> None:
+    _BACKENDS[name] = factory
+
+
+def available_backends() -> List[str]:
+    return sorted(_BACKENDS)
+
+
+def create_backend(settings: Settings, name: str | None = None, *, fallback: bool = True) -> EmbeddingBackend:
+    """Instantiate the configured backend, falling back to hashing if it cannot load."""
+
+    backend_name = name or settings.embedding_backend
+    factory = _BACKENDS.get(backend_name)
+    if factory is None:
+        raise ValueError(f"Unknown embedding backend {backend_name!r}; expected one of {available_backends()}")
+    try:
+        backend = factory(settings)
+        if backend.dimension != settings.embedding_vector_dimension:
+            raise BackendUnavailable(
+                f"{backend_name} produces {backend.dimension}-d vectors, "
+                f"expected {settings.embedding_vector_dimension}"
+            )
+        return backend
+    except Exception as error:
+        if not fallback or backend_name == HashingBackend.name:
+            raise
+        logger.warning("Embedding backend %s unavailable (%s); using hashing fallback", backend_name, error)
+        return HashingBackend(settings.embedding_vector_dimension)
+
+
+def _sentence_transformers_factory(settings: Settings) -> EmbeddingBackend:
+    return SentenceTransformerBackend(
+        settings.embedding_model_name,
+        settings.embedding_device,
+        settings.embedding_vector_dimension,
+    )
+
+
+def _onnx_factory(settings: Settings) -> EmbeddingBackend:
+    if settings.embedding_onnx_model_dir is None:
+        raise BackendUnavailable("embedding_onnx_model_dir is not configured")
+    return OnnxBackend(
+        settings.resolve_path(settings.embedding_onnx_model_dir),
+        dimension=settings.embedding_vector_dimension,
+        quantize=settings.embedding_onnx_quantize,
+        threads=settings.embedding_onnx_threads,
+    )
+
+
+def _hashing_factory(settings: Settings) -> EmbeddingBackend:
+    return HashingBackend(settings.embedding_vector_dimension)
+
+
+def _remote_factory(settings: Settings) -> EmbeddingBackend:
+    if settings.embedding_server_socket is None:
+        raise BackendUnavailable("embedding_server_socket is not configured")
+    return RemoteEmbeddingBackend(
+        settings.resolve_path(settings.embedding_server_socket),
+        timeout=settings.embedding_server_timeout_seconds,
+    )
+
+
+register_backend(SentenceTransformerBackend.name, _sentence_transformers_factory)
+register_backend(OnnxBackend.name, _onnx_factory)
+register_backend(HashingBackend.name, _hashing_factory)
+register_backend(RemoteEmbeddingBackend.name, _remote_factory)
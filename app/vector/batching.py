@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import asyncio
+from concurrent.futures import Future
+from dataclasses import dataclass
+from functools import lru_cache
+import queue
+import threading
+import time
+from typing import Iterable, List
+
+from app.core.config import get_settings
+from app.core.metrics import MetricsRegistry, get_metrics_registry
+from app.vector.embedding import EmbeddingService, get_embedding_service
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+QUEUE_WAIT_MS_BUCKETS = (0.5, 1, 2, 5, 10, 25, 50, 100, 250, 1000)
+
+
+@dataclass(slots=True)
+class _PendingRequest:
+    texts: List[str]
+    future: "Future[List[List[float]]]"
+    enqueued_at: float
+
+
+class EmbeddingBatcher:
+    """Coalesces concurrent small ``embed`` calls into one model invocation.
+
+    Requests are queued and drained by a single worker thread which waits at most
+    ``max_wait_ms`` after the first request for others to join, up to
+    ``max_batch_size`` texts. Calls that already reach the batch size bypass the queue.
+    """
+
+    def __init__(
+        self,
+        service: EmbeddingService,
+        *,
+        max_batch_size: int,
+        max_wait_ms: float,
+        metrics: MetricsRegistry | None = None,
+    ) -> None:
+        self._service = service
+        self._max_batch_size = max(1, max_batch_size)
+        self._max_wait = max(0.0, max_wait_ms) / 1000.0
+        self._queue: "queue.Queue[_PendingRequest | None]" = queue.Queue()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+        registry = metrics or get_metrics_registry()
+        self._batch_size = registry.histogram(
+            "embedding_batch_size", BATCH_SIZE_BUCKETS, "Texts per coalesced encode call"
+        )
+        self._queue_wait = registry.histogram(
+            "embedding_queue_wait_ms", QUEUE_WAIT_MS_BUCKETS, "Time requests spent waiting for a batch"
+        )
+
+    @property
+    def dimension(self) -> int:
+        return self._service.dimension
+
+    @property
+    def model_id(self) -> str:
+        return self._service.model_id
+
+    @property
+    def service(self) -> EmbeddingService:
+        return self._service
+
+    def embed(self, texts: Iterable[str]) -> List[List[float]]:
+        items = list(texts)
+        if not items:
+            return []
+        if len(items) >= self._max_batch_size:
+            return self._service.embed(items)
+        return self.submit(items).result()
+
+    async def aembed(self, texts: Iterable[str]) -> List[List[float]]:
+        items = list(texts)
+        if not items:
+            return []
+        if len(items) >= self._max_batch_size:
+            return await asyncio.to_thread(self._service.embed, items)
+        return await asyncio.wrap_future(self.submit(items))
+
+    def submit(self, texts: List[str]) -> "Future[List[List[float]]]":
+        self._ensure_worker()
+        future: "Future[List[List[float]]]" = Future()
+        self._queue.put(_PendingRequest(texts=texts, future=future, enqueued_at=time.monotonic()))
+        return future
+
+    def close(self) -> None:
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join(timeout=5)
+
+    def _ensure_worker(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = [first]
+            size = len(first.texts)
+            stopping = False
+            deadline = time.monotonic() + self._max_wait
+            while size < self._max_batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+                size += len(item.texts)
+            self._dispatch(batch)
+            if stopping:
+                return
+
+    def _dispatch(self, batch: List[_PendingRequest]) -> None:
+        started = time.monotonic()
+        active = [request for request in batch if request.future.set_running_or_notify_cancel()]
+        if not active:
+            return
+        texts: List[str] = []
+        for request in active:
+            self._queue_wait.observe((started - request.enqueued_at) * 1000.0)
+            texts.extend(request.texts)
+        self._batch_size.observe(len(texts))
+        try:
+            vectors = self._service.embed(texts)
+        except Exception as error:
+            for request in active:
+                request.future.set_exception(error)
+            return
+        offset = 0
+        for request in active:
+            request.future.set_result(vectors[offset : offset + len(request.texts)])
+            offset += len(request.texts)
+
+
+@lru_cache(maxsize=1)
+def get_embedding_scheduler() -> EmbeddingService | EmbeddingBatcher:
+    """Embedding entry point for request handlers (batched unless disabled)."""
+
+    settings = get_settings()
+    service = get_embedding_service()
+    if not settings.embedding_batching_enabled:
+        return service
+    return EmbeddingBatcher(
+        service,
+        max_batch_size=settings.embedding_batch_max_size,
+        max_wait_ms=settings.embedding_batch_max_wait_ms,
+    )
@@ -0,0 +1,204 @@
+from __future__ import annotations
+
+from array import array
+from collections import OrderedDict
+from dataclasses import dataclass
+import hashlib
+from pathlib import Path
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Sequence
+
+
+def cache_key(namespace: str, text: str) -> str:
+    """Content address of ``text`` for a given model namespace."""
+
+    digest = hashlib.sha256()
+    digest.update(namespace.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(text.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def pack_vector(vector: Sequence[float]) -> bytes:
+    return array("f", vector).tobytes()
+
+
+def unpack_vector(blob: bytes) -> List[float]:
+    values = array("f")
+    values.frombytes(blob)
+    return values.tolist()
+
+
+@dataclass(slots=True)
+class CacheStats:
+    hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    entries: int = 0
+    bytes: int = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": self.entries,
+            "bytes": self.bytes,
+        }
+
+
+class DiskEmbeddingStore:
+    """SQLite-backed vector store shared between processes (WAL mode)."""
+
+    _CHUNK_SIZE = 500
+
+    def __init__(self, path: Path, ttl_seconds: int) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._ttl = ttl_seconds
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " key TEXT PRIMARY KEY,"
+            " vector BLOB NOT NULL,"
+            " created_at REAL NOT NULL)"
+        )
+        self.purge_expired()
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, bytes]:
+        found: Dict[str, bytes] = {}
+        cutoff = self._cutoff()
+        with self._lock:
+            for start in range(0, len(keys), self._CHUNK_SIZE):
+                chunk = keys[start : start + self._CHUNK_SIZE]
+                placeholders = ",".join("?" for _ in chunk)
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders}) AND created_at >= ?",
+                    (*chunk, cutoff),
+                ).fetchall()
+                found.update({key: blob for key, blob in rows})
+        return found
+
+    def put_many(self, items: Dict[str, bytes]) -> None:
+        if not items:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, vector, created_at) VALUES (?, ?, ?)",
+                    [(key, blob, now) for key, blob in items.items()],
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def purge_expired(self) -> int:
+        if self._ttl <= 0:
+            return 0
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM embeddings WHERE created_at < ?", (self._cutoff(),))
+            return cursor.rowcount
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _cutoff(self) -> float:
+        if self._ttl <= 0:
+            return 0.0
+        return time.time() - self._ttl
+
+
+class EmbeddingCache:
+    """Two-tier embedding cache: in-process LRU bounded in bytes plus optional disk store."""
+
+    def __init__(
+        self,
+        *,
+        max_bytes: int,
+        ttl_seconds: int,
+        disk_path: Path | None = None,
+    ) -> None:
+        self._max_bytes = max_bytes
+        self._ttl = ttl_seconds
+        self._entries: "OrderedDict[str, tuple[bytes, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = CacheStats()
+        self._disk = DiskEmbeddingStore(disk_path, ttl_seconds) if disk_path else None
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, List[float]]:
+        """Return cached vectors for ``keys``; absent keys are left out of the result."""
+
+        found: Dict[str, List[float]] = {}
+        missing: List[str] = []
+        now = time.monotonic()
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is None:
+                    missing.append(key)
+                    continue
+                blob, stored_at = entry
+                if self._ttl > 0 and now - stored_at > self._ttl:
+                    self._drop(key)
+                    missing.append(key)
+                    continue
+                self._entries.move_to_end(key)
+                found[key] = unpack_vector(blob)
+                self._stats.hits += 1
+
+        from_disk: Dict[str, bytes] = {}
+        if missing and self._disk is not None:
+            from_disk = self._disk.get_many(missing)
+        with self._lock:
+            for key, blob in from_disk.items():
+                self._store(key, blob, now)
+                found[key] = unpack_vector(blob)
+            self._stats.disk_hits += len(from_disk)
+            self._stats.misses += len(missing) - len(from_disk)
+        return found
+
+    def put_many(self, items: Dict[str, Sequence[float]]) -> None:
+        packed = {key: pack_vector(vector) for key, vector in items.items()}
+        now = time.monotonic()
+        with self._lock:
+            for key, blob in packed.items():
+                self._store(key, blob, now)
+        if self._disk is not None:
+            self._disk.put_many(packed)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            self._stats.entries = len(self._entries)
+            return self._stats.as_dict()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._stats = CacheStats()
+
+    def _store(self, key: str, blob: bytes, stored_at: float) -> None:
+        if key in self._entries:
+            self._drop(key)
+        if len(blob) > self._max_bytes:
+            return
+        self._entries[key] = (blob, stored_at)
+        self._stats.bytes += len(blob)
+        while self._stats.bytes > self._max_bytes and self._entries:
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+            self._stats.evictions += 1
+
+    def _drop(self, key: str) -> None:
+        blob, _ = self._entries.pop(key)
+        self._stats.bytes -= len(blob)
+
@@ -1,55 +1,127 @@
 from __future__ import annotations
 
-import hashlib
-import math
 from functools import lru_cache
-from typing import Iterable, List
+import logging
+import threading
+from typing import Callable, Dict, Iterable, List
 
 from app.core.config import get_settings
+from app.core.metrics import get_metrics_registry
+from app.vector.backends import EmbeddingBackend, create_backend
+from app.vector.cache import EmbeddingCache, cache_key
 
-try:  # pragma: no cover - heavy dependency not exercised in unit tests by default
-    from sentence_transformers import SentenceTransformer  # type: ignore
-except Exception:  # pragma: no cover - optional dependency
-    SentenceTransformer = None
+logger = logging.getLogger(__name__)
+
+WARMUP_TEXT = "SENTRA embedding warmup"
 
 
 class EmbeddingService:
-    """Provides text embeddings with optional sentence-transformer backend."""
-
-    def __init__(self, model_name: str, device: str | None, dimension: int) -> None:
-        self._dimension = dimension
-        self._model = None
-        if SentenceTransformer is not None:
-            try:
-                self._model = SentenceTransformer(model_name_or_path=model_name, device=device)
-                self._dimension = getattr(self._model, "get_sentence_embedding_dimension", lambda: dimension)()
-            except Exception:
-                self._model = None
+    """Provides text embeddings through a pluggable backend with an optional cache.
+
+    The backend is either given directly or built on first use by ``loader``; the
+    load happens once, concurrent callers wait for it instead of loading again.
+    """
+
+    def __init__(
+        self,
+        backend: EmbeddingBackend | None = None,
+        cache: EmbeddingCache | None = None,
+        *,
+        loader: Callable[[], EmbeddingBackend] | None = None,
+    ) -> None:
+        if backend is None and loader is None:
+            raise ValueError("EmbeddingService requires a backend or a loader")
+        self._loader = loader
+        self._cache_candidate = cache
+        self._cache: EmbeddingCache | None = None
+        self._load_lock = threading.Lock()
+        self._backend: EmbeddingBackend | None = None
+        if backend is not None:
+            self._publish(backend)
 
     @property
     def dimension(self) -> int:
-        return self._dimension
+        return self.backend.dimension
+
+    @property
+    def backend(self) -> EmbeddingBackend:
+        return self._backend or self._load()
+
+    @property
+    def model_id(self) -> str:
+        return self.backend.model_id
+
+    @property
+    def cache(self) -> EmbeddingCache | None:
+        return self._cache
+
+    @property
+    def is_ready(self) -> bool:
+        return self._backend is not None
+
+    def warmup(self) -> None:
+        """Load the backend now (no-op when already loaded)."""
+
+        self._load()
 
     def embed(self, texts: Iterable[str]) -> List[List[float]]:
         items = list(texts)
         if not items:
             return []
-        if self._model is not None:
-            vectors = self._model.encode(items, show_progress_bar=False, normalize_embeddings=True)
-            return [list(map(float, vec)) for vec in vectors]
-        return [self._fallback_embedding(text) for text in items]
+        backend = self.backend
+        if self._cache is None:
+            return backend.encode(items)
+
+        keys = [cache_key(backend.model_id, text) for text in items]
+        cached = self._cache.get_many(keys)
+        pending: Dict[str, str] = {}
+        for key, text in zip(keys, items):
+            if key not in cached:
+                pending.setdefault(key, text)
+        if pending:
+            computed = dict(zip(pending.keys(), backend.encode(list(pending.values()))))
+            self._cache.put_many(computed)
+            cached.update(computed)
+        return [cached[key] for key in keys]
+
+    def _load(self) -> EmbeddingBackend:
+        with self._load_lock:
+            if self._backend is None:
+                assert self._loader is not None
+                backend = self._loader()
+                backend.encode([WARMUP_TEXT])
+                self._publish(backend)
+                logger.info("Embedding backend ready", extra={"model_id": backend.model_id})
+        assert self._backend is not None
+        return self._backend
 
-    def _fallback_embedding(self, text: str) -> List[float]:
-        digest = hashlib.sha256(text.encode("utf-8")).digest()
-        repeated = (digest * math.ceil(self._dimension / len(digest)))[: self._dimension]
-        return [b / 255.0 for b in repeated]
+    def _publish(self, backend: EmbeddingBackend) -> None:
+        self._cache = self._cache_candidate if backend.cacheable else None
+        self._backend = backend
 
 
 @lru_cache(maxsize=1)
 def get_embedding_service() -> EmbeddingService:
     settings = get_settings()
-    return EmbeddingService(
-        model_name=settings.embedding_model_name,
-        device=settings.embedding_device,
-        dimension=settings.embedding_vector_dimension,
+    cache_path = settings.resolve_path(settings.embedding_cache_path) if settings.embedding_cache_path else None
+    cache = EmbeddingCache(
+        max_bytes=settings.embedding_cache_max_bytes,
+        ttl_seconds=settings.embedding_cache_ttl_seconds,
+        disk_path=cache_path,
     )
+    get_metrics_registry().register_collector("embedding_cache", cache.stats)
+    return EmbeddingService(cache=cache, loader=lambda: create_backend(settings))
+
+
+def start_warmup() -> threading.Thread:
+    """Load the embedding backend in a background thread."""
+
+    def _run() -> None:
+        try:
+            get_embedding_service().warmup()
+        except Exception:  # pragma: no cover - surfaced through /ready
+            logger.exception("Embedding warmup failed")
+
+    thread = threading.Thread(target=_run, name="embedding-warmup", daemon=True)
+    thread.start()
+    return thread
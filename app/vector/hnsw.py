@@ -0,0 +1,420 @@
+"""Hierarchical Navigable Small World graph for approximate cosine search.
+
+Pure Python graph bookkeeping with NumPy distance computations, so it has no
+native dependency. Intended for SQLite/local deployments where pgvector is not
+available; the graph is persisted next to the database file and can be rebuilt
+from the table with ``python -m app.vector.hnsw``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import heapq
+import json
+import math
+import os
+from pathlib import Path
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Sequence, Set, Tuple
+
+import numpy as np
+
+_Candidate = Tuple[float, int]
+
+
+class HNSWIndex:
+    """Approximate top-k cosine search (Malkov & Yashunin) with label filters.
+
+    Updating a key inserts a new node and tombstones the old one; tombstones are
+    traversed but never returned and disappear on rebuild. Filters that match
+    fewer than ``exact_threshold`` rows are answered by an exact scan instead.
+    """
+
+    _INITIAL_CAPACITY = 1024
+
+    def __init__(
+        self,
+        dimension: int,
+        *,
+        m: int = 16,
+        ef_construction: int = 200,
+        ef_search: int = 64,
+        exact_threshold: int = 2048,
+        seed: int = 42,
+    ) -> None:
+        self._dimension = dimension
+        self.m = max(2, m)
+        self.ef_construction = max(self.m, ef_construction)
+        self.ef_search = ef_search
+        self.exact_threshold = exact_threshold
+        self._level_mult = 1.0 / math.log(self.m)
+        self._rng = random.Random(seed)
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self._vectors = np.zeros((self._INITIAL_CAPACITY, self._dimension), dtype=np.float32)
+        self._keys: List[Hashable] = []
+        self._positions: Dict[Hashable, int] = {}
+        self._levels: List[int] = []
+        self._links: List[List[List[int]]] = []
+        self._deleted: Set[int] = set()
+        self._labels: Dict[str, Set[int]] = {}
+        self._node_labels: List[Tuple[str, ...]] = []
+        self._entry: int | None = None
+        self._max_level = -1
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    @property
+    def dimension(self) -> int:
+        return self._dimension
+
+    @property
+    def tombstones(self) -> int:
+        return len(self._deleted)
+
+    def upsert(self, key: Hashable, vector: Sequence[float] | np.ndarray | None, labels: Iterable[str] = ()) -> None:
+        row = self._normalise(vector)
+        with self._lock:
+            if row is None:
+                self._remove(key)
+                return
+            label_tuple = tuple(labels)
+            current = self._positions.get(key)
+            if current is not None and np.array_equal(self._vectors[current], row):
+                self._set_labels(current, label_tuple)
+                return
+            if current is not None:
+                self._remove(key)
+            node = self._insert(row, key)
+            self._positions[key] = node
+            self._set_labels(node, label_tuple)
+
+    def remove(self, key: Hashable) -> None:
+        with self._lock:
+            self._remove(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._reset()
+
+    def search(
+        self,
+        query: Sequence[float] | np.ndarray,
+        k: int,
+        *,
+        required_labels: Sequence[str] = (),
+        ef: int | None = None,
+    ) -> List[Tuple[Hashable, float]]:
+        vector = self._normalise(query)
+        if vector is None or k <= 0:
+            return []
+        with self._lock:
+            if self._entry is None:
+                return []
+            allowed: Set[int] | None = None
+            if required_labels:
+                postings = [self._labels.get(label, set()) for label in required_labels]
+                allowed = set.intersection(*postings) if postings else set()
+                if len(allowed) <= self.exact_threshold:
+                    return self._exact(vector, sorted(allowed), k)
+            accept: Callable[[int], bool]
+            if allowed is None:
+                accept = lambda node: node not in self._deleted  # noqa: E731
+            else:
+                accept = allowed.__contains__
+            entry = self._entry
+            entry_dist = self._distance(vector, entry)
+            for level in range(self._max_level, 0, -1):
+                entry, entry_dist = self._greedy(vector, entry, entry_dist, level)
+            found = self._search_layer(vector, [(entry_dist, entry)], max(ef or self.ef_search, k), 0, accept)
+            return [(self._keys[node], 1.0 - dist) for dist, node in found[:k]]
+
+    def search_many(
+        self,
+        queries: Sequence[Sequence[float] | np.ndarray],
+        k: int,
+        *,
+        required_labels: Sequence[str] = (),
+    ) -> List[List[Tuple[Hashable, float]]]:
+        return [self.search(query, k, required_labels=required_labels) for query in queries]
+
+    # -- persistence -----------------------------------------------------------------
+
+    def save(self, path: Path, extra: Dict[str, Any] | None = None) -> None:
+        """Atomically write the graph, keys and labels to ``path`` (NumPy ``.npz``)."""
+
+        with self._lock:
+            size = len(self._keys)
+            vectors = self._vectors[:size].copy()
+            levels = np.asarray(self._levels, dtype=np.int32)
+            flat_lists = [links for node_links in self._links for links in node_links]
+            offsets = np.zeros(len(flat_lists) + 1, dtype=np.int64)
+            offsets[1:] = np.cumsum([len(links) for links in flat_lists])
+            data = np.fromiter(
+                (neighbor for links in flat_lists for neighbor in links), dtype=np.int32, count=int(offsets[-1])
+            )
+            meta = {
+                "dimension": self._dimension,
+                "m": self.m,
+                "ef_construction": self.ef_construction,
+                "entry": self._entry,
+                "max_level": self._max_level,
+                "keys": [list(key) if isinstance(key, tuple) else key for key in self._keys],
+                "deleted": sorted(self._deleted),
+                "labels": [list(labels) for labels in self._node_labels],
+                "extra": extra or {},
+            }
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + ".tmp")
+        with tmp_path.open("wb") as handle:
+            np.savez(
+                handle,
+                vectors=vectors,
+                levels=levels,
+                link_offsets=offsets,
+                link_data=data,
+                meta=np.frombuffer(json.dumps(meta).encode("utf-8"), dtype=np.uint8),
+            )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: Path, *, ef_search: int = 64, exact_threshold: int = 2048) -> Tuple["HNSWIndex", Dict[str, Any]]:
+        with np.load(path) as archive:
+            meta = json.loads(archive["meta"].tobytes().decode("utf-8"))
+            vectors = archive["vectors"]
+            levels = archive["levels"].tolist()
+            offsets = archive["link_offsets"]
+            data = archive["link_data"].tolist()
+        index = cls(
+            meta["dimension"],
+            m=meta["m"],
+            ef_construction=meta["ef_construction"],
+            ef_search=ef_search,
+            exact_threshold=exact_threshold,
+        )
+        size = len(levels)
+        index._grow(size)
+        index._vectors[:size] = vectors
+        index._levels = levels
+        cursor = 0
+        for level in levels:
+            node_links = []
+            for _ in range(level + 1):
+                node_links.append(data[offsets[cursor] : offsets[cursor + 1]])
+                cursor += 1
+            index._links.append(node_links)
+        index._keys = [tuple(key) if isinstance(key, list) else key for key in meta["keys"]]
+        index._deleted = set(meta["deleted"])
+        index._node_labels = [tuple(labels) for labels in meta["labels"]]
+        for node, key in enumerate(index._keys):
+            if node in index._deleted:
+                continue
+            index._positions[key] = node
+            for label in index._node_labels[node]:
+                index._labels.setdefault(label, set()).add(node)
+        index._entry = meta["entry"]
+        index._max_level = meta["max_level"]
+        return index, meta["extra"]
+
+    # -- graph construction ----------------------------------------------------------
+
+    def _insert(self, row: np.ndarray, key: Hashable) -> int:
+        node = len(self._keys)
+        self._grow(node + 1)
+        self._vectors[node] = row
+        level = int(-math.log(1.0 - self._rng.random()) * self._level_mult)
+        self._keys.append(key)
+        self._levels.append(level)
+        self._links.append([[] for _ in range(level + 1)])
+        self._node_labels.append(())
+        if self._entry is None:
+            self._entry, self._max_level = node, level
+            return node
+
+        entry = self._entry
+        entry_dist = self._distance(row, entry)
+        for layer in range(self._max_level, level, -1):
+            entry, entry_dist = self._greedy(row, entry, entry_dist, layer)
+        entry_points: List[_Candidate] = [(entry_dist, entry)]
+        live = lambda candidate: candidate not in self._deleted  # noqa: E731
+        for layer in range(min(level, self._max_level), -1, -1):
+            candidates = self._search_layer(row, entry_points, self.ef_construction, layer, live)
+            if not candidates:
+                candidates = entry_points
+            max_links = self.m * 2 if layer == 0 else self.m
+            selected = self._select(candidates, self.m)
+            self._links[node][layer] = [neighbor for _, neighbor in selected]
+            for _, neighbor in selected:
+                neighbor_links = self._links[neighbor][layer]
+                neighbor_links.append(node)
+                if len(neighbor_links) > max_links:
+                    self._links[neighbor][layer] = self._shrink(neighbor, neighbor_links, max_links)
+            entry_points = candidates
+        if level > self._max_level:
+            self._entry, self._max_level = node, level
+        return node
+
+    def _select(self, candidates: List[_Candidate], m: int) -> List[_Candidate]:
+        """Neighbour selection heuristic keeping diverse directions, topped up with the nearest pruned."""
+
+        if len(candidates) <= 1:
+            return list(candidates)
+        nodes = [node for _, node in candidates]
+        block = self._vectors[nodes]
+        similarities = (block @ block.T).tolist()
+        selected: List[_Candidate] = []
+        chosen: List[int] = []
+        pruned: List[_Candidate] = []
+        for position, (dist, candidate) in enumerate(candidates):
+            if len(selected) >= m:
+                break
+            row = similarities[position]
+            # Keep the candidate only if it is closer to the query than to every kept neighbour.
+            if chosen and max(row[index] for index in chosen) >= 1.0 - dist:
+                pruned.append((dist, candidate))
+                continue
+            selected.append((dist, candidate))
+            chosen.append(position)
+        for item in pruned:
+            if len(selected) >= m:
+                break
+            selected.append(item)
+        return selected
+
+    def _shrink(self, node: int, links: List[int], max_links: int) -> List[int]:
+        distances = 1.0 - self._vectors[links] @ self._vectors[node]
+        ordered = sorted(zip(distances.tolist(), links))
+        return [neighbor for _, neighbor in self._select(ordered, max_links)]
+
+    # -- search primitives -----------------------------------------------------------
+
+    def _greedy(self, query: np.ndarray, entry: int, entry_dist: float, level: int) -> Tuple[int, float]:
+        improved = True
+        while improved:
+            improved = False
+            neighbors = self._links[entry][level]
+            if not neighbors:
+                break
+            distances = 1.0 - self._vectors[neighbors] @ query
+            best = int(np.argmin(distances))
+            if distances[best] < entry_dist:
+                entry, entry_dist = neighbors[best], float(distances[best])
+                improved = True
+        return entry, entry_dist
+
+    def _search_layer(
+        self,
+        query: np.ndarray,
+        entry_points: List[_Candidate],
+        ef: int,
+        level: int,
+        accept: Callable[[int], bool],
+    ) -> List[_Candidate]:
+        visited = {node for _, node in entry_points}
+        candidates = list(entry_points)
+        heapq.heapify(candidates)
+        results = [(-dist, node) for dist, node in entry_points if accept(node)]
+        heapq.heapify(results)
+        while len(results) > ef:
+            heapq.heappop(results)
+        while candidates:
+            dist, node = heapq.heappop(candidates)
+            if len(results) >= ef and dist > -results[0][0]:
+                break
+            neighbors = [neighbor for neighbor in self._links[node][level] if neighbor not in visited]
+            if not neighbors:
+                continue
+            visited.update(neighbors)
+            distances = (1.0 - self._vectors[neighbors] @ query).tolist()
+            for neighbor, neighbor_dist in zip(neighbors, distances):
+                if len(results) < ef or neighbor_dist < -results[0][0]:
+                    heapq.heappush(candidates, (neighbor_dist, neighbor))
+                    if accept(neighbor):
+                        heapq.heappush(results, (-neighbor_dist, neighbor))
+                        if len(results) > ef:
+                            heapq.heappop(results)
+        return sorted((-negative, node) for negative, node in results)
+
+    def _exact(self, query: np.ndarray, nodes: List[int], k: int) -> List[Tuple[Hashable, float]]:
+        if not nodes:
+            return []
+        scores = self._vectors[nodes] @ query
+        top = np.argsort(-scores, kind="stable")[:k]
+        return [(self._keys[nodes[index]], float(scores[index])) for index in top]
+
+    def _distance(self, query: np.ndarray, node: int) -> float:
+        return float(1.0 - self._vectors[node] @ query)
+
+    # -- bookkeeping -----------------------------------------------------------------
+
+    def _normalise(self, vector: Sequence[float] | np.ndarray | None) -> np.ndarray | None:
+        if vector is None:
+            return None
+        array = np.asarray(vector, dtype=np.float32)
+        if array.shape != (self._dimension,):
+            return None
+        norm = float(np.linalg.norm(array))
+        if norm == 0.0:
+            return None
+        return array / norm
+
+    def _grow(self, required: int) -> None:
+        capacity = self._vectors.shape[0]
+        if required <= capacity:
+            return
+        while capacity < required:
+            capacity *= 2
+        vectors = np.zeros((capacity, self._dimension), dtype=np.float32)
+        vectors[: len(self._keys)] = self._vectors[: len(self._keys)]
+        self._vectors = vectors
+
+    def _set_labels(self, node: int, labels: Tuple[str, ...]) -> None:
+        for label in self._node_labels[node]:
+            self._labels.get(label, set()).discard(node)
+        for label in labels:
+            self._labels.setdefault(label, set()).add(node)
+        self._node_labels[node] = labels
+
+    def _remove(self, key: Hashable) -> None:
+        node = self._positions.pop(key, None)
+        if node is None:
+            return
+        self._deleted.add(node)
+        self._set_labels(node, ())
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    from app.core.config import get_settings
+    from app.db.session import get_session
+    from app.memory.repository import create_memory_vector_index
+    from app.services.rag_service import create_rag_vector_index
+    from app.vector.embedding import get_embedding_service
+
+    factories = {"memory_notes": create_memory_vector_index, "rag_documents": create_rag_vector_index}
+    parser = argparse.ArgumentParser(description="Rebuild the persisted HNSW index of a table")
+    parser.add_argument("--table", choices=sorted(factories), nargs="+", default=sorted(factories))
+    args = parser.parse_args(argv)
+
+    settings = get_settings()
+    settings.vector_index_backend = "hnsw"
+    # Stamp the graph with the serving model so the first query does not discard it.
+    model_id = get_embedding_service().model_id
+    for table in args.table:
+        table_index = factories[table](settings, fresh=True)
+        if table_index.persist_path is None:
+            raise SystemExit("HNSW persistence requires a file-based SQLite database_url")
+        started = time.perf_counter()
+        with get_session() as session:
+            table_index.sync(session, force=True, model_id=model_id)
+        table_index.persist()
+        elapsed = time.perf_counter() - started
+        print(f"{table}: {len(table_index.index)} vectors indexed in {elapsed:.1f}s -> {table_index.persist_path}")
+
+
+if __name__ == "__main__":
+    main()
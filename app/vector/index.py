@@ -0,0 +1,552 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+import logging
+from pathlib import Path
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Protocol, Sequence, Set, Tuple
+
+import numpy as np
+from sqlalchemy import case, event, func, select
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.elements import ColumnElement
+
+from app.core.config import Settings
+from app.vector.hnsw import HNSWIndex
+
+logger = logging.getLogger(__name__)
+
+
+class InMemoryVectorIndex:
+    """Exact cosine search over a contiguous float32 matrix of normalised vectors.
+
+    Rows are addressed by an arbitrary hashable key and may carry string labels
+    (tags, collection) used to build boolean filter masks.
+    """
+
+    _INITIAL_CAPACITY = 1024
+
+    def __init__(self, dimension: int) -> None:
+        self._dimension = dimension
+        self._matrix = np.zeros((self._INITIAL_CAPACITY, dimension), dtype=np.float32)
+        self._alive = np.zeros(self._INITIAL_CAPACITY, dtype=bool)
+        self._keys: List[Hashable] = []
+        self._positions: Dict[Hashable, int] = {}
+        self._labels: Dict[str, Set[int]] = {}
+        self._row_labels: List[Tuple[str, ...]] = []
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return int(np.count_nonzero(self._alive[: len(self._keys)]))
+
+    @property
+    def dimension(self) -> int:
+        return self._dimension
+
+    def upsert(self, key: Hashable, vector: Sequence[float] | np.ndarray | None, labels: Iterable[str] = ()) -> None:
+        row = self._normalise(vector)
+        with self._lock:
+            if row is None:
+                self._remove(key)
+                return
+            position = self._positions.get(key)
+            if position is None:
+                position = len(self._keys)
+                self._grow(position + 1)
+                self._keys.append(key)
+                self._row_labels.append(())
+                self._positions[key] = position
+            self._matrix[position] = row
+            self._alive[position] = True
+            self._set_labels(position, tuple(labels))
+
+    def remove(self, key: Hashable) -> None:
+        with self._lock:
+            self._remove(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._alive[:] = False
+            self._keys.clear()
+            self._positions.clear()
+            self._labels.clear()
+            self._row_labels.clear()
+
+    def search(
+        self,
+        query: Sequence[float] | np.ndarray,
+        k: int,
+        *,
+        required_labels: Sequence[str] = (),
+    ) -> List[Tuple[Hashable, float]]:
+        """Top-``k`` keys by cosine similarity among rows carrying every required label."""
+
+        return self.search_many([query], k, required_labels=required_labels)[0]
+
+    def search_many(
+        self,
+        queries: Sequence[Sequence[float] | np.ndarray],
+        k: int,
+        *,
+        required_labels: Sequence[str] = (),
+    ) -> List[List[Tuple[Hashable, float]]]:
+        """``search`` for several queries with one matrix-matrix product."""
+
+        results: List[List[Tuple[Hashable, float]]] = [[] for _ in queries]
+        rows = [(position, self._normalise(query)) for position, query in enumerate(queries)]
+        valid = [(position, vector) for position, vector in rows if vector is not None]
+        if not valid or k <= 0:
+            return results
+        matrix = np.stack([vector for _, vector in valid])
+        with self._lock:
+            size = len(self._keys)
+            if size == 0:
+                return results
+            mask = self._alive[:size].copy()
+            for label in required_labels:
+                postings = self._labels.get(label)
+                if not postings:
+                    return results
+                label_mask = np.zeros(size, dtype=bool)
+                label_mask[np.fromiter(postings, dtype=np.int64, count=len(postings))] = True
+                mask &= label_mask
+            candidates = np.flatnonzero(mask)
+            if candidates.size == 0:
+                return results
+            if candidates.size == size:
+                scores = self._matrix[:size] @ matrix.T
+            else:
+                scores = self._matrix[candidates] @ matrix.T
+            for column, (position, _) in enumerate(valid):
+                column_scores = scores[:, column]
+                if k < column_scores.size:
+                    top = np.argpartition(-column_scores, k - 1)[:k]
+                else:
+                    top = np.arange(column_scores.size)
+                top = top[np.argsort(-column_scores[top], kind="stable")]
+                positions = top if candidates.size == size else candidates[top]
+                results[position] = [
+                    (self._keys[row], float(column_scores[index])) for row, index in zip(positions, top)
+                ]
+        return results
+
+    def _normalise(self, vector: Sequence[float] | np.ndarray | None) -> np.ndarray | None:
+        if vector is None:
+            return None
+        array = np.asarray(vector, dtype=np.float32)
+        if array.shape != (self._dimension,):
+            return None
+        norm = float(np.linalg.norm(array))
+        if norm == 0.0:
+            return None
+        return array / norm
+
+    def _grow(self, required: int) -> None:
+        capacity = self._matrix.shape[0]
+        if required <= capacity:
+            return
+        while capacity < required:
+            capacity *= 2
+        matrix = np.zeros((capacity, self._dimension), dtype=np.float32)
+        matrix[: len(self._keys)] = self._matrix[: len(self._keys)]
+        alive = np.zeros(capacity, dtype=bool)
+        alive[: len(self._keys)] = self._alive[: len(self._keys)]
+        self._matrix, self._alive = matrix, alive
+
+    def _set_labels(self, position: int, labels: Tuple[str, ...]) -> None:
+        for label in self._row_labels[position]:
+            self._labels.get(label, set()).discard(position)
+        for label in labels:
+            self._labels.setdefault(label, set()).add(position)
+        self._row_labels[position] = labels
+
+    def _remove(self, key: Hashable) -> None:
+        position = self._positions.get(key)
+        if position is None:
+            return
+        self._alive[position] = False
+        self._set_labels(position, ())
+
+
+class VectorIndex(Protocol):
+    def __len__(self) -> int: ...
+
+    def upsert(self, key: Hashable, vector: Sequence[float] | np.ndarray | None, labels: Iterable[str] = ()) -> None: ...
+
+    def remove(self, key: Hashable) -> None: ...
+
+    def clear(self) -> None: ...
+
+    def search(
+        self, query: Sequence[float] | np.ndarray, k: int, *, required_labels: Sequence[str] = ()
+    ) -> List[Tuple[Hashable, float]]: ...
+
+    def search_many(
+        self, queries: Sequence[Sequence[float] | np.ndarray], k: int, *, required_labels: Sequence[str] = ()
+    ) -> List[List[Tuple[Hashable, float]]]: ...
+
+
+class TableVectorIndex:
+    """Keeps a vector index in sync with one ORM table.
+
+    The first query loads every embedding (or restores a persisted HNSW graph
+    and only reads rows changed since it was saved); afterwards rows written
+    through this process are upserted when their transaction commits
+    (``upsert_on_commit``), and writes from other processes are picked up by
+    comparing the table's row count and latest ``updated_at`` against the last
+    seen watermark (checked at most every ``sync_interval`` seconds). A row
+    stamped before it committed can land behind the watermark, so incremental
+    loads re-read the last ``sync_window`` seconds; upserts are keyed by id.
+
+    With a ``model_column`` only rows embedded by the model passed to
+    ``search`` are indexed; rows re-embedded in place (same ``updated_at``)
+    are noticed through the count of current-model rows and trigger a reload.
+
+    With ``background_build`` an HNSW graph is never built or restored inside
+    a query: loads fill an exact index that serves searches while a thread
+    restores or builds the graph, persists it and swaps it in. Graphs whose
+    tombstones exceed ``max_tombstone_ratio`` of their live rows are rebuilt
+    from scratch the same way.
+    """
+
+    def __init__(
+        self,
+        *,
+        index: VectorIndex,
+        key_columns: Sequence[ColumnElement[Any]],
+        embedding_column: ColumnElement[Any],
+        updated_column: ColumnElement[Any],
+        label_column: ColumnElement[Any],
+        labels: Callable[[Any], Iterable[str]],
+        model_column: ColumnElement[Any] | None = None,
+        sync_interval: float = 1.0,
+        sync_window: float = 300.0,
+        persist_path: Path | None = None,
+        persist_interval: float = 30.0,
+        restore: bool = True,
+        background_build: bool = False,
+        max_tombstone_ratio: float = 0.25,
+    ) -> None:
+        self._graph = index if background_build and isinstance(index, HNSWIndex) else None
+        self.index = InMemoryVectorIndex(index.dimension) if self._graph is not None else index
+        self._key_columns = list(key_columns)
+        self._embedding_column = embedding_column
+        self._updated_column = updated_column
+        self._label_column = label_column
+        self._labels = labels
+        self._model_column = model_column
+        self._model_id: str | None = None
+        self._current_count: int | None = None
+        self._sync_interval = sync_interval
+        self._sync_window = timedelta(seconds=sync_window)
+        self._persist_path = persist_path if isinstance(index, HNSWIndex) else None
+        self._persist_interval = persist_interval
+        self._restore_pending = restore and self._persist_path is not None and self._graph is None
+        self._restore_graph = restore
+        self._max_tombstone_ratio = max_tombstone_ratio
+        self._building: threading.Thread | None = None
+        self._row_count: int | None = None
+        self._watermark: datetime | None = None
+        self._checked_at = 0.0
+        self._dirty = False
+        self._persisted_at = time.monotonic()
+        self._saving = False
+        self._lock = threading.Lock()
+
+    @property
+    def persist_path(self) -> Path | None:
+        return self._persist_path
+
+    def upsert(
+        self, key: Hashable, vector: Sequence[float] | None, label_value: Any, model_id: str | None = None
+    ) -> None:
+        if self._row_count is None:
+            return
+        if model_id is not None and self._model_id is not None and model_id != self._model_id:
+            vector = None
+        self.index.upsert(key, vector, self._labels(label_value))
+        self._mark_dirty()
+
+    def upsert_on_commit(
+        self,
+        session: Session,
+        key: Hashable,
+        vector: Sequence[float] | None,
+        label_value: Any,
+        model_id: str | None = None,
+    ) -> None:
+        """Queue an ``upsert`` applied once ``session`` commits and dropped if it rolls back.
+
+        The queue lives in ``session.info``; the session hooks are registered
+        once because the scoped session is reused across requests.
+        """
+
+        pending = session.info.get(self)
+        if pending is None:
+            pending = session.info[self] = []
+            event.listen(session, "after_commit", self._apply_pending)
+            event.listen(session, "after_transaction_end", self._drop_pending)
+        pending.append((key, vector, label_value, model_id))
+
+    def search(
+        self,
+        session: Session,
+        query: Sequence[float],
+        k: int,
+        *,
+        required_labels: Sequence[str] = (),
+        model_id: str | None = None,
+    ) -> List[Tuple[Hashable, float]]:
+        self.sync(session, model_id=model_id)
+        return self.index.search(query, k, required_labels=required_labels)
+
+    def search_many(
+        self,
+        session: Session,
+        queries: Sequence[Sequence[float]],
+        k: int,
+        *,
+        required_labels: Sequence[str] = (),
+        model_id: str | None = None,
+    ) -> List[List[Tuple[Hashable, float]]]:
+        self.sync(session, model_id=model_id)
+        return self.index.search_many(queries, k, required_labels=required_labels)
+
+    def sync(self, session: Session, *, force: bool = False, model_id: str | None = None) -> None:
+        now = time.monotonic()
+        tracked = self._model_column is not None and model_id is not None
+        switched = tracked and model_id != self._model_id
+        if not force and not switched and self._row_count is not None and now - self._checked_at < self._sync_interval:
+            return
+        with self._lock:
+            if self._restore_pending:
+                self._restore()
+            if tracked and model_id != self._model_id:
+                self._model_id = model_id
+                self._row_count = None
+            columns = [func.count(), func.max(self._updated_column)]
+            if self._model_id is not None and self._model_column is not None:
+                columns.append(func.count(case((self._model_column == self._model_id, 1))))
+            table_count, latest, *current = session.execute(
+                select(*columns).select_from(self._updated_column.table)
+            ).one()
+            current_count = current[0] if current else None
+            self._checked_at = now
+            reembedded = (
+                current_count is not None
+                and self._row_count is not None
+                and self._current_count is not None
+                and current_count - self._current_count != table_count - self._row_count
+            )
+            if self._row_count is None or table_count < self._row_count or reembedded:
+                if self._graph is not None:
+                    self.index = InMemoryVectorIndex(self._graph.dimension)
+                    self._start_graph_build(session, restore=self._restore_graph)
+                    self._restore_graph = False
+                else:
+                    self.index.clear()
+                self._load(session, since=None)
+                self._dirty = True
+            elif table_count != self._row_count or latest != self._watermark:
+                since = self._watermark - self._sync_window if self._watermark is not None else None
+                self._load(session, since=since)
+                self._dirty = True
+            self._row_count = table_count
+            self._current_count = current_count
+            self._watermark = latest
+            if self._graph is not None and self._needs_compaction(self.index):
+                self._start_graph_build(session, restore=False)
+        self._maybe_persist()
+
+    def wait_for_graph(self, timeout: float | None = None) -> bool:
+        """Wait for a background graph build; True once the HNSW graph serves queries."""
+
+        building = self._building
+        if building is not None:
+            building.join(timeout)
+        return isinstance(self.index, HNSWIndex)
+
+    def persist(self) -> None:
+        """Write the HNSW graph and its sync watermark next to the database."""
+
+        if self._persist_path is None or not isinstance(self.index, HNSWIndex):
+            return
+        self._dirty = False
+        self._persisted_at = time.monotonic()
+        watermark = self._watermark.isoformat() if self._watermark is not None else None
+        self.index.save(
+            self._persist_path,
+            extra={
+                "row_count": self._row_count,
+                "watermark": watermark,
+                "model_id": self._model_id,
+                "current_count": self._current_count,
+            },
+        )
+
+    def _restore(self) -> None:
+        self._restore_pending = False
+        assert self._persist_path is not None and isinstance(self.index, HNSWIndex)
+        if not self._persist_path.exists():
+            return
+        try:
+            restored, extra = HNSWIndex.load(
+                self._persist_path,
+                ef_search=self.index.ef_search,
+                exact_threshold=self.index.exact_threshold,
+            )
+        except Exception:
+            logger.warning("Ignoring unreadable vector index %s", self._persist_path, exc_info=True)
+            return
+        if restored.dimension != self.index.dimension:
+            return
+        self.index = restored
+        self._row_count = extra.get("row_count")
+        self._model_id = extra.get("model_id")
+        self._current_count = extra.get("current_count")
+        watermark = extra.get("watermark")
+        self._watermark = datetime.fromisoformat(watermark) if watermark else None
+
+    def _start_graph_build(self, session: Session, *, restore: bool) -> None:
+        if self._building is not None and self._building.is_alive():
+            return
+        bind, model_id = session.get_bind(), self._model_id
+        self._building = threading.Thread(
+            target=self._build_graph, args=(bind, model_id, restore), name="vector-index-build", daemon=True
+        )
+        self._building.start()
+
+    def _build_graph(self, bind: Any, model_id: str | None, restore: bool) -> None:
+        try:
+            started = time.perf_counter()
+            while True:
+                builder = self._graph_builder(restore)
+                with Session(bind) as session:
+                    builder.sync(session, force=True, model_id=model_id)
+                    if self._needs_compaction(builder.index):
+                        builder = self._graph_builder(False)
+                        builder.sync(session, force=True, model_id=model_id)
+                builder.persist()
+                with self._lock:
+                    if model_id == self._model_id:
+                        self.index = builder.index
+                        self._row_count = builder._row_count
+                        self._current_count = builder._current_count
+                        self._watermark = builder._watermark
+                        self._checked_at = 0.0  # catch up on writes made during the build
+                        break
+                    # The model changed while building: start over for the new one.
+                    model_id, restore = self._model_id, False
+            logger.info(
+                "Vector index graph ready",
+                extra={"rows": len(builder.index), "seconds": round(time.perf_counter() - started, 1)},
+            )
+        except Exception:
+            logger.exception("Failed to build vector index graph %s", self._persist_path)
+
+    def _needs_compaction(self, index: VectorIndex) -> bool:
+        return isinstance(index, HNSWIndex) and index.tombstones > self._max_tombstone_ratio * max(len(index), 1)
+
+    def _graph_builder(self, restore: bool) -> "TableVectorIndex":
+        assert self._graph is not None
+        graph = HNSWIndex(
+            self._graph.dimension,
+            m=self._graph.m,
+            ef_construction=self._graph.ef_construction,
+            ef_search=self._graph.ef_search,
+            exact_threshold=self._graph.exact_threshold,
+        )
+        return TableVectorIndex(
+            index=graph,
+            key_columns=self._key_columns,
+            embedding_column=self._embedding_column,
+            updated_column=self._updated_column,
+            label_column=self._label_column,
+            labels=self._labels,
+            model_column=self._model_column,
+            sync_window=self._sync_window.total_seconds(),
+            persist_path=self._persist_path,
+            restore=restore,
+        )
+
+    def _apply_pending(self, session: Session) -> None:
+        queued = session.info.get(self)
+        if queued:
+            pending, queued[:] = list(queued), []
+            for key, vector, label_value, model_id in pending:
+                self.upsert(key, vector, label_value, model_id)
+
+    def _drop_pending(self, session: Session, transaction: Any) -> None:
+        if transaction.parent is None and session.info.get(self):
+            session.info[self].clear()
+
+    def _mark_dirty(self) -> None:
+        self._dirty = True
+        self._maybe_persist()
+
+    def _maybe_persist(self) -> None:
+        if self._persist_path is None or not self._dirty or self._saving:
+            return
+        if time.monotonic() - self._persisted_at < self._persist_interval:
+            return
+        self._saving = True
+
+        def _run() -> None:
+            try:
+                self.persist()
+            except Exception:  # pragma: no cover - disk errors only logged
+                logger.exception("Failed to persist vector index %s", self._persist_path)
+            finally:
+                self._saving = False
+
+        threading.Thread(target=_run, name="vector-index-persist", daemon=True).start()
+
+    def _load(self, session: Session, *, since: datetime | None) -> None:
+        model_column = self._model_column if self._model_id is not None else None
+        stmt = select(*self._key_columns, self._embedding_column, self._label_column)
+        if model_column is not None:
+            stmt = stmt.add_columns(model_column)
+        if since is not None:
+            stmt = stmt.where(self._updated_column >= since)
+        elif model_column is not None:
+            stmt = stmt.where(model_column == self._model_id)
+        for row in session.execute(stmt.execution_options(yield_per=5000)):
+            if model_column is not None:
+                *key_parts, vector, label_value, model_id = row
+                if model_id != self._model_id:
+                    vector = None
+            else:
+                *key_parts, vector, label_value = row
+            key = key_parts[0] if len(key_parts) == 1 else tuple(key_parts)
+            if vector is None:
+                self.index.remove(key)
+                continue
+            self.index.upsert(key, vector, self._labels(label_value))
+
+
+def index_persist_path(settings: Settings, table_name: str) -> Path | None:
+    """Location of a table's persisted graph: next to a file-based SQLite database."""
+
+    url = make_url(settings.database_url)
+    if url.get_backend_name() != "sqlite" or not url.database or url.database == ":memory:":
+        return None
+    database = Path(url.database).resolve()
+    return database.with_name(f"{database.name}.{table_name}.hnsw.npz")
+
+
+def create_vector_index(settings: Settings, persist_path: Path | None) -> VectorIndex:
+    """Pick the index implementation from ``vector_index_backend`` (exact | hnsw | auto)."""
+
+    kind = settings.vector_index_backend
+    if kind == "hnsw" or (kind == "auto" and persist_path is not None and persist_path.exists()):
+        return HNSWIndex(
+            settings.embedding_vector_dimension,
+            m=settings.hnsw_m,
+            ef_construction=settings.hnsw_ef_construction,
+            ef_search=settings.hnsw_ef_search,
+        )
+    if kind not in {"exact", "auto"}:
+        raise ValueError(f"Unknown vector_index_backend {kind!r}")
+    return InMemoryVectorIndex(settings.embedding_vector_dimension)
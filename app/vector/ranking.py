@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+from typing import Dict, Hashable, Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+
+def reciprocal_rank_fusion(rankings: Iterable[Sequence[Hashable]], *, k: int = 60) -> List[Tuple[Hashable, float]]:
+    """Merge ranked key lists: each key scores ``sum(1 / (k + rank))`` over the lists containing it."""
+
+    scores: Dict[Hashable, float] = {}
+    for ranking in rankings:
+        for rank, key in enumerate(ranking, start=1):
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+def recency_decay(age_seconds: np.ndarray, half_life_seconds: float) -> np.ndarray:
+    """Exponential decay in ``(0, 1]``: 1 for a fresh item, 0.5 after one half-life."""
+
+    ages = np.maximum(np.asarray(age_seconds, dtype=np.float64), 0.0)
+    return np.exp2(-ages / half_life_seconds)
+
+
+def maximal_marginal_relevance(
+    relevance: np.ndarray,
+    embeddings: np.ndarray,
+    k: int,
+    *,
+    lambda_: float = 0.5,
+) -> List[int]:
+    """Greedy MMR: indices maximising ``lambda * relevance - (1 - lambda) * max similarity to picked``."""
+
+    count = len(relevance)
+    if count == 0 or k <= 0:
+        return []
+    vectors = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors = np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+    similarity = vectors @ vectors.T
+    relevance = np.asarray(relevance, dtype=np.float32)
+    picked = [int(np.argmax(relevance))]
+    redundancy = similarity[:, picked[0]].copy()
+    available = np.ones(count, dtype=bool)
+    available[picked[0]] = False
+    while len(picked) < min(k, count):
+        marginal = np.where(available, lambda_ * relevance - (1 - lambda_) * redundancy, -np.inf)
+        choice = int(np.argmax(marginal))
+        picked.append(choice)
+        available[choice] = False
+        np.maximum(redundancy, similarity[:, choice], out=redundancy)
+    return picked
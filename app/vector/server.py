@@ -0,0 +1,116 @@
+"""Local embedding server: one process owns the model, workers connect over a Unix socket.
+
+Run with ``python -m app.vector.server`` and point API workers at it with
+``EMBEDDING_BACKEND=remote`` and ``EMBEDDING_SERVER_SOCKET``. Requests from all
+clients go through one :class:`EmbeddingBatcher`, so concurrent workers share
+encode calls.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import os
+from pathlib import Path
+import struct
+from typing import Sequence
+
+from app.core.config import get_settings
+from app.vector import wire
+from app.vector.batching import EmbeddingBatcher
+from app.vector.embedding import EmbeddingService, get_embedding_service
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingServer:
+    def __init__(
+        self,
+        service: EmbeddingService,
+        socket_path: Path,
+        *,
+        max_batch_size: int,
+        max_wait_ms: float,
+    ) -> None:
+        self._service = service
+        self._socket_path = socket_path
+        self._batcher = EmbeddingBatcher(service, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+
+    async def serve_forever(self) -> None:
+        self._service.warmup()
+        if self._service.backend.name == "remote":
+            raise RuntimeError("The embedding server cannot use the remote backend itself")
+        self._socket_path.parent.mkdir(parents=True, exist_ok=True)
+        if self._socket_path.exists():
+            self._socket_path.unlink()
+        server = await asyncio.start_unix_server(self._handle, path=str(self._socket_path))
+        os.chmod(self._socket_path, 0o660)
+        logger.info(
+            "Embedding server listening",
+            extra={"socket": str(self._socket_path), "model_id": self._service.model_id},
+        )
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self._batcher.close()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    header = await reader.readexactly(4)
+                except asyncio.IncompleteReadError:
+                    break
+                (length,) = struct.unpack("<I", header)
+                if length > wire.MAX_FRAME_BYTES:
+                    writer.write(wire.frame(wire.encode_error("Frame too large")))
+                    break
+                body = await reader.readexactly(length)
+                writer.write(wire.frame(await self._respond(body)))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, body: bytes) -> bytes:
+        try:
+            op, texts = wire.decode_request(body)
+            if op == wire.OP_INFO:
+                return wire.encode_info(self._service.model_id, self._service.dimension)
+            if op != wire.OP_ENCODE:
+                return wire.encode_error(f"Unknown op {op}")
+            vectors = await self._batcher.aembed(texts)
+            return wire.encode_vectors(vectors, self._service.dimension)
+        except Exception as error:
+            logger.exception("Embedding request failed")
+            return wire.encode_error(str(error))
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description="Serve embeddings over a Unix domain socket")
+    parser.add_argument("--socket", type=Path, default=settings.embedding_server_socket)
+    parser.add_argument("--max-batch-size", type=int, default=settings.embedding_batch_max_size)
+    parser.add_argument("--max-wait-ms", type=float, default=settings.embedding_batch_max_wait_ms)
+    args = parser.parse_args(argv)
+    if args.socket is None:
+        parser.error("--socket or EMBEDDING_SERVER_SOCKET is required")
+
+    logging.basicConfig(level=logging.INFO, format="[%(asctime)s] %(levelname)s %(name)s: %(message)s")
+    server = EmbeddingServer(
+        get_embedding_service(),
+        settings.resolve_path(args.socket),
+        max_batch_size=args.max_batch_size,
+        max_wait_ms=args.max_wait_ms,
+    )
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:  # pragma: no cover - manual stop
+        logger.info("Embedding server stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Binary framing used between the embedding server and its clients.
+
+Every message is ``<u32 length><body>`` (little endian). Request bodies start with
+an op byte; ``OP_ENCODE`` is followed by ``<u32 count>`` and ``count`` entries of
+``<u32 size><utf-8 bytes>``. Responses start with a status byte; a successful
+encode carries ``<u32 count><u32 dim>`` then ``count * dim`` float32 values.
+"""
+
+from __future__ import annotations
+
+import socket
+import struct
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+OP_ENCODE = 1
+OP_INFO = 2
+
+STATUS_OK = 0
+STATUS_ERROR = 1
+
+MAX_FRAME_BYTES = 64 * 1024 * 1024
+
+_U32 = struct.Struct("<I")
+_HEADER = struct.Struct("<BI")
+_VECTORS_HEADER = struct.Struct("<BII")
+
+
+class WireError(RuntimeError):
+    """Malformed frame or error reported by the peer."""
+
+
+def frame(body: bytes) -> bytes:
+    return _U32.pack(len(body)) + body
+
+
+def encode_request(texts: Sequence[str]) -> bytes:
+    parts = [_HEADER.pack(OP_ENCODE, len(texts))]
+    for text in texts:
+        raw = text.encode("utf-8")
+        parts.append(_U32.pack(len(raw)))
+        parts.append(raw)
+    return b"".join(parts)
+
+
+def info_request() -> bytes:
+    return _HEADER.pack(OP_INFO, 0)
+
+
+def decode_request(body: bytes) -> Tuple[int, List[str]]:
+    op, count = _HEADER.unpack_from(body, 0)
+    offset = _HEADER.size
+    texts: List[str] = []
+    view = memoryview(body)
+    for _ in range(count):
+        (size,) = _U32.unpack_from(body, offset)
+        offset += _U32.size
+        texts.append(bytes(view[offset : offset + size]).decode("utf-8"))
+        offset += size
+    if offset != len(body):
+        raise WireError("Trailing bytes in request frame")
+    return op, texts
+
+
+def encode_vectors(vectors: Sequence[Sequence[float]], dimension: int) -> bytes:
+    matrix = np.asarray(vectors, dtype="<f4").reshape(len(vectors), dimension)
+    return _VECTORS_HEADER.pack(STATUS_OK, matrix.shape[0], dimension) + matrix.tobytes()
+
+
+def decode_vectors(body: bytes) -> List[List[float]]:
+    status = body[0]
+    if status != STATUS_OK:
+        raise WireError(body[1:].decode("utf-8", errors="replace"))
+    _, count, dimension = _VECTORS_HEADER.unpack_from(body, 0)
+    matrix = np.frombuffer(body, dtype="<f4", offset=_VECTORS_HEADER.size, count=count * dimension)
+    return matrix.reshape(count, dimension).tolist()
+
+
+def encode_info(model_id: str, dimension: int) -> bytes:
+    return bytes([STATUS_OK]) + _U32.pack(dimension) + model_id.encode("utf-8")
+
+
+def decode_info(body: bytes) -> Tuple[str, int]:
+    if body[0] != STATUS_OK:
+        raise WireError(body[1:].decode("utf-8", errors="replace"))
+    (dimension,) = _U32.unpack_from(body, 1)
+    return body[1 + _U32.size :].decode("utf-8"), dimension
+
+
+def encode_error(message: str) -> bytes:
+    return bytes([STATUS_ERROR]) + message.encode("utf-8")
+
+
+def recv_frame(sock: socket.socket) -> bytes:
+    (length,) = _U32.unpack(_recv_exactly(sock, _U32.size))
+    if length > MAX_FRAME_BYTES:
+        raise WireError(f"Frame of {length} bytes exceeds limit")
+    return _recv_exactly(sock, length)
+
+
+def _recv_exactly(sock: socket.socket, size: int) -> bytes:
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+    while received < size:
+        chunk = sock.recv_into(view[received:], size - received)
+        if chunk == 0:
+            raise ConnectionError("Embedding server closed the connection")
+        received += chunk
+    return bytes(buffer)
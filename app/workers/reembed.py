@@ -0,0 +1,204 @@
+"""Re-embed rows whose vector is missing or was produced by another model.
+
+Run once with ``python -m app.workers.reembed`` (``--status`` only counts the
+stale rows) or continuously through ``app.workers.vector_ingestion``. Rows are
+walked in primary-key order in batches of ``EMBEDDING_BACKFILL_BATCH_SIZE``;
+the last key of each committed batch is checkpointed in
+``EMBEDDING_BACKFILL_CHECKPOINT`` so an interrupted run resumes where it
+stopped (the checkpoint restarts when the model changes). Throughput is capped
+at ``EMBEDDING_BACKFILL_MAX_ROWS_PER_SECOND`` and ``updated_at`` is left
+untouched. The worker never uses the hashing fallback: if the configured model
+cannot load it fails instead of re-embedding with the wrong model.
+"""
+
+from __future__ import annotations
+
+import argparse
+from dataclasses import dataclass
+import json
+import logging
+from pathlib import Path
+import time
+from typing import Any, Callable, Dict, List, Sequence
+
+from sqlalchemy import func, literal, or_, select, tuple_, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.core.config import Settings, get_settings
+from app.core.metrics import get_metrics_registry
+from app.db.models.memory import MemoryNote
+from app.db.models.rag import RAGDocument
+from app.vector.backends import create_backend
+from app.vector.batching import EmbeddingBatcher
+from app.vector.embedding import EmbeddingService
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class BackfillTarget:
+    model: Any
+    key_columns: tuple[str, ...]
+
+    @property
+    def table(self) -> str:
+        return self.model.__tablename__
+
+    def keys(self) -> List[Any]:
+        return [getattr(self.model, name) for name in self.key_columns]
+
+
+BACKFILL_TARGETS: tuple[BackfillTarget, ...] = (
+    BackfillTarget(MemoryNote, ("note_id",)),
+    BackfillTarget(RAGDocument, ("collection", "doc_id")),
+)
+
+
+class EmbeddingBackfill:
+    def __init__(
+        self,
+        engine: Engine,
+        embedding_service: EmbeddingService | EmbeddingBatcher,
+        *,
+        batch_size: int = 256,
+        max_rows_per_second: float = 0.0,
+        checkpoint_path: Path | None = None,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self._engine = engine
+        self._embedding_service = embedding_service
+        self._batch_size = max(1, batch_size)
+        self._max_rows_per_second = max_rows_per_second
+        self._checkpoint_path = checkpoint_path
+        self._sleep = sleep
+        self._rows = get_metrics_registry().counter("embedding_backfill_rows", "Rows re-embedded by the backfill")
+
+    def pending(self) -> Dict[str, int]:
+        """Stale rows per table for the current model."""
+
+        model_id = self._embedding_service.model_id
+        with Session(self._engine) as session:
+            return {
+                target.table: session.execute(
+                    select(func.count()).select_from(target.model).where(self._stale(target, model_id))
+                ).scalar_one()
+                for target in BACKFILL_TARGETS
+            }
+
+    def run(self, *, max_batches: int | None = None) -> Dict[str, int]:
+        """Re-embed stale rows table by table; returns the rows rewritten per table."""
+
+        model_id = self._embedding_service.model_id
+        checkpoint = self._load_checkpoint(model_id)
+        done: Dict[str, int] = {}
+        batches = 0
+        for target in BACKFILL_TARGETS:
+            after = checkpoint["tables"].get(target.table)
+            done[target.table] = 0
+            while max_batches is None or batches < max_batches:
+                started = time.monotonic()
+                rewritten, after = self._run_batch(target, model_id, after)
+                batches += 1
+                if after is None:
+                    checkpoint["tables"].pop(target.table, None)
+                    self._save_checkpoint(checkpoint)
+                    break
+                done[target.table] += rewritten
+                checkpoint["tables"][target.table] = after
+                self._save_checkpoint(checkpoint)
+                self._throttle(rewritten, time.monotonic() - started)
+            if done[target.table]:
+                logger.info(
+                    "Re-embedded rows", extra={"table": target.table, "rows": done[target.table], "model_id": model_id}
+                )
+        return done
+
+    def _run_batch(
+        self, target: BackfillTarget, model_id: str, after: List[Any] | None
+    ) -> tuple[int, List[Any] | None]:
+        keys = target.keys()
+        stmt = select(*keys, target.model.text).where(self._stale(target, model_id))
+        if after is not None:
+            stmt = stmt.where(tuple_(*keys) > tuple_(*(literal(value) for value in after)))
+        with Session(self._engine) as session, session.begin():
+            rows = session.execute(stmt.order_by(*keys).limit(self._batch_size)).all()
+            if not rows:
+                return 0, None
+            embeddings = self._embedding_service.embed([row.text for row in rows])
+            session.execute(
+                update(target.model),
+                [
+                    {
+                        **{name: getattr(row, name) for name in target.key_columns},
+                        "embedding": embedding,
+                        "embedding_model": model_id,
+                    }
+                    for row, embedding in zip(rows, embeddings)
+                ],
+            )
+        self._rows.inc(len(rows))
+        return len(rows), [getattr(rows[-1], name) for name in target.key_columns]
+
+    @staticmethod
+    def _stale(target: BackfillTarget, model_id: str) -> Any:
+        model = target.model
+        return or_(model.embedding_model.is_(None), model.embedding_model != model_id, model.embedding.is_(None))
+
+    def _throttle(self, rows: int, elapsed: float) -> None:
+        if self._max_rows_per_second <= 0:
+            return
+        remaining = rows / self._max_rows_per_second - elapsed
+        if remaining > 0:
+            self._sleep(remaining)
+
+    def _load_checkpoint(self, model_id: str) -> Dict[str, Any]:
+        fresh: Dict[str, Any] = {"model_id": model_id, "tables": {}}
+        if self._checkpoint_path is None or not self._checkpoint_path.exists():
+            return fresh
+        try:
+            checkpoint = json.loads(self._checkpoint_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            logger.warning("Ignoring unreadable backfill checkpoint %s", self._checkpoint_path)
+            return fresh
+        return checkpoint if checkpoint.get("model_id") == model_id else fresh
+
+    def _save_checkpoint(self, checkpoint: Dict[str, Any]) -> None:
+        if self._checkpoint_path is None:
+            return
+        self._checkpoint_path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = self._checkpoint_path.with_suffix(".tmp")
+        temporary.write_text(json.dumps(checkpoint), encoding="utf-8")
+        temporary.replace(self._checkpoint_path)
+
+
+def create_backfill(settings: Settings | None = None, engine: Engine | None = None) -> EmbeddingBackfill:
+    settings = settings or get_settings()
+    if engine is None:
+        from app.db.session import get_engine
+
+        engine = get_engine()
+    return EmbeddingBackfill(
+        engine,
+        EmbeddingService(loader=lambda: create_backend(settings, fallback=False)),
+        batch_size=settings.embedding_backfill_batch_size,
+        max_rows_per_second=settings.embedding_backfill_max_rows_per_second,
+        checkpoint_path=settings.resolve_path(settings.embedding_backfill_checkpoint),
+    )
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Re-embed rows produced by another embedding model")
+    parser.add_argument("--status", action="store_true", help="Only print the number of stale rows per table")
+    parser.add_argument("--max-batches", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="[%(asctime)s] %(levelname)s %(name)s: %(message)s")
+    backfill = create_backfill()
+    counts = backfill.pending() if args.status else backfill.run(max_batches=args.max_batches)
+    for table, count in counts.items():
+        print(f"{table}: {count} rows {'stale' if args.status else 're-embedded'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,7 @@ import asyncio
 import logging
 
 from app.core.config import get_settings
+from app.workers.reembed import create_backfill
 
 logger = logging.getLogger(__name__)
 
@@ -17,8 +18,13 @@ async def run_worker() -> None:
             "dimension": settings.embedding_vector_dimension,
         },
     )
+    backfill = create_backfill(settings)
     while True:
-        await asyncio.sleep(300)
+        try:
+            await asyncio.to_thread(backfill.run)
+        except Exception:
+            logger.exception("Embedding backfill failed; retrying later")
+        await asyncio.sleep(settings.embedding_backfill_interval_seconds)
 
 
 def main() -> None:
@@ -0,0 +1,108 @@
+"""Compare embedding backends on throughput and retrieval quality.
+
+Usage::
+
+    python -m benchmarks.embedding_backends --corpus projects --backends sentence_transformers onnx hashing
+
+The corpus is split into paragraphs; each query is a word window taken from one
+paragraph and the paragraph itself is the relevant answer (self-retrieval).
+Reported per backend: vectors/sec, recall@k, MRR and top-k overlap with the
+first backend in the list (the reference).
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import time
+from pathlib import Path
+from typing import List, Sequence
+
+import numpy as np
+
+from app.core.config import get_settings
+from app.vector.backends import EmbeddingBackend, available_backends, create_backend
+
+DEFAULT_BACKENDS = ["sentence_transformers", "onnx", "hashing"]
+
+
+def load_paragraphs(root: Path, min_chars: int, limit: int) -> List[str]:
+    paragraphs: List[str] = []
+    for path in sorted(root.rglob("*.md")) + sorted(root.rglob("*.txt")):
+        text = path.read_text(encoding="utf-8", errors="ignore")
+        for block in text.split("\n\n"):
+            block = " ".join(block.split())
+            if len(block) >= min_chars:
+                paragraphs.append(block)
+    return list(dict.fromkeys(paragraphs))[:limit]
+
+
+def build_queries(paragraphs: Sequence[str], count: int, window: int, seed: int) -> List[tuple[str, int]]:
+    rng = random.Random(seed)
+    queries: List[tuple[str, int]] = []
+    for index in rng.sample(range(len(paragraphs)), min(count, len(paragraphs))):
+        words = paragraphs[index].split()
+        start = rng.randrange(max(1, len(words) - window))
+        queries.append((" ".join(words[start : start + window]), index))
+    return queries
+
+
+def encode_timed(backend: EmbeddingBackend, texts: Sequence[str], batch_size: int) -> tuple[np.ndarray, float]:
+    started = time.perf_counter()
+    vectors: List[List[float]] = []
+    for start in range(0, len(texts), batch_size):
+        vectors.extend(backend.encode(texts[start : start + batch_size]))
+    elapsed = time.perf_counter() - started
+    return np.asarray(vectors, dtype=np.float32), len(texts) / elapsed if elapsed else float("inf")
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", type=Path, default=Path("projects"))
+    parser.add_argument("--backends", nargs="+", default=DEFAULT_BACKENDS, choices=available_backends())
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--window", type=int, default=8, help="Words per query")
+    parser.add_argument("--limit", type=int, default=5000, help="Maximum paragraphs")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("-k", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=13)
+    args = parser.parse_args(argv)
+
+    paragraphs = load_paragraphs(args.corpus, min_chars=80, limit=args.limit)
+    if not paragraphs:
+        raise SystemExit(f"No paragraphs found under {args.corpus}")
+    queries = build_queries(paragraphs, args.queries, args.window, args.seed)
+    query_texts = [text for text, _ in queries]
+    expected = np.asarray([index for _, index in queries])
+    print(f"corpus={len(paragraphs)} paragraphs queries={len(queries)} k={args.k}")
+
+    settings = get_settings()
+    reference: np.ndarray | None = None
+    header = f"{'backend':<28}{'vec/s':>10}{'recall@k':>10}{'MRR':>8}{'overlap':>9}"
+    print(header)
+    print("-" * len(header))
+    for name in args.backends:
+        try:
+            backend = create_backend(settings, name, fallback=False)
+        except Exception as error:
+            print(f"{name:<28}skipped: {error}")
+            continue
+        doc_vectors, rate = encode_timed(backend, paragraphs, args.batch_size)
+        query_vectors, _ = encode_timed(backend, query_texts, args.batch_size)
+        ranking = np.argsort(-(query_vectors @ doc_vectors.T), axis=1)
+        positions = np.argmax(ranking == expected[:, None], axis=1)
+        recall = float(np.mean(positions < args.k))
+        mrr = float(np.mean(1.0 / (positions + 1)))
+        hits = ranking[:, : args.k]
+        if reference is None:
+            reference = hits
+            overlap = 1.0
+        else:
+            overlap = float(
+                np.mean([len(set(row) & set(ref)) / args.k for row, ref in zip(hits, reference)])
+            )
+        print(f"{backend.model_id[:27]:<28}{rate:>10.1f}{recall:>10.3f}{mrr:>8.3f}{overlap:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
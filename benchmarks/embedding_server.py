@@ -0,0 +1,118 @@
+"""Compare in-process embedding against the shared embedding server.
+
+Usage::
+
+    python -m benchmarks.embedding_server --workers 4 --threads 8 --requests 200
+
+``inprocess`` starts ``--workers`` processes that each load the configured
+backend, like uvicorn workers do today. ``server`` starts one
+``app.vector.server`` process and the same number of workers using the remote
+backend. Each worker fires single-text requests from ``--threads`` threads
+through an EmbeddingBatcher. Reported: aggregate requests/sec and the peak RSS
+summed over all processes.
+"""
+
+from __future__ import annotations
+
+import argparse
+import multiprocessing
+import os
+from pathlib import Path
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Sequence
+
+from app.core.config import get_settings
+from app.core.metrics import MetricsRegistry
+from app.vector.backends import create_backend
+from app.vector.batching import EmbeddingBatcher
+from app.vector.embedding import EmbeddingService
+
+
+def _worker(backend_name: str, socket_path: str | None, threads: int, requests: int, queue) -> None:
+    settings = get_settings()
+    if socket_path:
+        settings.embedding_server_socket = Path(socket_path)
+    service = EmbeddingService(create_backend(settings, backend_name, fallback=False))
+    batcher = EmbeddingBatcher(
+        service,
+        max_batch_size=settings.embedding_batch_max_size,
+        max_wait_ms=settings.embedding_batch_max_wait_ms,
+        metrics=MetricsRegistry(),
+    )
+    texts = [f"benchmark request {os.getpid()} {index}" for index in range(requests)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(lambda text: batcher.embed([text]), texts))
+    elapsed = time.perf_counter() - started
+    batcher.close()
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    queue.put((requests / elapsed, peak_kb))
+
+
+def _peak_rss_kb(pid: int) -> int:
+    try:
+        for line in Path(f"/proc/{pid}/status").read_text().splitlines():
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+def _run_workers(backend_name: str, socket_path: str | None, args) -> tuple[float, int]:
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    processes = [
+        context.Process(target=_worker, args=(backend_name, socket_path, args.threads, args.requests, queue))
+        for _ in range(args.workers)
+    ]
+    for process in processes:
+        process.start()
+    results = [queue.get() for _ in processes]
+    for process in processes:
+        process.join()
+    return sum(rate for rate, _ in results), sum(peak for _, peak in results)
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", default=get_settings().embedding_backend)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=200, help="Requests per worker")
+    args = parser.parse_args(argv)
+
+    rate, rss = _run_workers(args.backend, None, args)
+    print(f"{'mode':<10}{'req/s':>12}{'peak RSS MiB':>15}")
+    print(f"{'inprocess':<10}{rate:>12.1f}{rss / 1024:>15.1f}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        socket_path = Path(tmp) / "embed.sock"
+        env = dict(os.environ, EMBEDDING_BACKEND=args.backend)
+        server = subprocess.Popen(
+            [sys.executable, "-m", "app.vector.server", "--socket", str(socket_path)],
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            deadline = time.monotonic() + 300
+            while not socket_path.exists():
+                if server.poll() is not None or time.monotonic() > deadline:
+                    raise SystemExit("Embedding server failed to start")
+                time.sleep(0.1)
+            rate, rss = _run_workers("remote", str(socket_path), args)
+            server_rss = _peak_rss_kb(server.pid)
+        finally:
+            server.terminate()
+            server.wait()
+    print(f"{'server':<10}{rate:>12.1f}{(rss + server_rss) / 1024:>15.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Recall@k versus latency of the HNSW index against the exact NumPy scan.
+
+Usage::
+
+    python -m benchmarks.hnsw_recall --size 20000 --dimension 384 --ef 16 32 64 128
+
+Vectors are drawn around random cluster centres so neighbourhoods look like
+real embeddings; recall is measured against ``InMemoryVectorIndex`` results.
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from typing import Sequence
+
+import numpy as np
+
+from app.vector.hnsw import HNSWIndex
+from app.vector.index import InMemoryVectorIndex
+
+
+def clustered(rng: np.random.Generator, count: int, dimension: int, clusters: int = 64) -> np.ndarray:
+    centers = rng.normal(size=(clusters, dimension))
+    noise = 0.35 * rng.normal(size=(count, dimension))
+    return (centers[rng.integers(0, clusters, count)] + noise).astype(np.float32)
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=20000)
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("-m", type=int, default=16)
+    parser.add_argument("--ef-construction", type=int, default=200)
+    parser.add_argument("--ef", type=int, nargs="+", default=[16, 32, 64, 128])
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(0)
+    vectors = clustered(rng, args.size, args.dimension)
+    queries = clustered(rng, args.queries, args.dimension)
+    exact = InMemoryVectorIndex(args.dimension)
+    hnsw = HNSWIndex(args.dimension, m=args.m, ef_construction=args.ef_construction)
+
+    started = time.perf_counter()
+    for position, vector in enumerate(vectors):
+        hnsw.upsert(position, vector)
+    build_s = time.perf_counter() - started
+    for position, vector in enumerate(vectors):
+        exact.upsert(position, vector)
+    print(f"built {args.size} nodes in {build_s:.1f}s ({build_s / args.size * 1000:.2f} ms/insert)")
+
+    started = time.perf_counter()
+    truth = [{key for key, _ in exact.search(query, args.k)} for query in queries]
+    exact_ms = (time.perf_counter() - started) / len(queries) * 1000.0
+    print(f"{'ef':>6}{'recall@' + str(args.k):>11}{'ms/query':>10}")
+    print(f"{'exact':>6}{1.0:>11.3f}{exact_ms:>10.2f}")
+    for ef in args.ef:
+        started = time.perf_counter()
+        found = [{key for key, _ in hnsw.search(query, args.k, ef=ef)} for query in queries]
+        elapsed_ms = (time.perf_counter() - started) / len(queries) * 1000.0
+        recall = sum(len(a & b) for a, b in zip(truth, found)) / (args.k * len(queries))
+        print(f"{ef:>6}{recall:>11.3f}{elapsed_ms:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
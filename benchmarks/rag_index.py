@@ -0,0 +1,114 @@
+"""Documents/sec of ``RAGService.index``: per-document ``session.get`` versus chunked upsert.
+
+Usage::
+
+    python -m benchmarks.rag_index --sizes 1000 10000 100000 --chunk-size 500
+
+Each size indexes a fresh SQLite collection ("insert") and then re-indexes it
+with new texts ("update"). "lookup" is the former loop (one ``session.get``
+and one ORM object per document); "upsert" is the current
+``INSERT ... ON CONFLICT DO UPDATE`` path. Embeddings are precomputed so only
+the database work is timed. The lookup loop is skipped above ``--lookup-max``.
+"""
+
+from __future__ import annotations
+
+import argparse
+from datetime import datetime, timezone
+from pathlib import Path
+import tempfile
+import time
+from typing import Callable, List, Sequence
+
+import numpy as np
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.db.base import Base
+from app.db.models.rag import RAGDocument as RAGDocumentModel
+from app.services.rag_service import RAGDocument, RAGService
+
+
+class _PrecomputedEmbeddings:
+    model_id = "bench"
+
+    def __init__(self, dimension: int) -> None:
+        self._vector = np.random.default_rng(0).normal(size=dimension).astype(np.float32).tolist()
+
+    def embed(self, texts: Sequence[str]) -> List[List[float]]:
+        return [self._vector] * len(texts)
+
+
+class _NoIndex:
+    def upsert_on_commit(self, *args, **kwargs) -> None:
+        return None
+
+
+def lookup_index(session: Session, collection: str, documents: Sequence[RAGDocument], embeddings) -> None:
+    vectors = embeddings.embed([doc.text for doc in documents])
+    now = datetime.now(timezone.utc)
+    for doc, vector in zip(documents, vectors):
+        existing = session.get(RAGDocumentModel, (collection, doc.doc_id))
+        if existing:
+            existing.text = doc.text
+            existing.payload = dict(doc.metadata)
+            existing.embedding = vector
+            existing.embedding_model = embeddings.model_id
+            existing.updated_at = now
+        else:
+            session.add(
+                RAGDocumentModel(
+                    collection=collection,
+                    doc_id=doc.doc_id,
+                    text=doc.text,
+                    payload=dict(doc.metadata),
+                    embedding=vector,
+                    embedding_model=embeddings.model_id,
+                    created_at=now,
+                    updated_at=now,
+                )
+            )
+    session.flush()
+
+
+def timed(engine, function: Callable[[Session], None]) -> float:
+    started = time.perf_counter()
+    with Session(engine) as session, session.begin():
+        function(session)
+    return time.perf_counter() - started
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--chunk-size", type=int, default=500)
+    parser.add_argument("--lookup-max", type=int, default=10000)
+    args = parser.parse_args(argv)
+
+    get_settings().rag_index_chunk_size = args.chunk_size
+    embeddings = _PrecomputedEmbeddings(args.dimension)
+    service = RAGService(embedding_service=embeddings, vector_index=_NoIndex())
+    print(f"{'docs':>8}  {'method':<7}{'insert docs/s':>15}{'update docs/s':>15}")
+    with tempfile.TemporaryDirectory() as directory:
+        for size in args.sizes:
+            first = [
+                RAGDocument(f"doc-{index}", f"chunk {index} " + "lorem ipsum " * 40, {"source": f"{index}.md"})
+                for index in range(size)
+            ]
+            second = [RAGDocument(doc.doc_id, doc.text + " edited", dict(doc.metadata)) for doc in first]
+            methods = {"upsert": lambda session, docs: service.index(session, "bench", docs)}
+            if size <= args.lookup_max:
+                methods["lookup"] = lambda session, docs: lookup_index(session, "bench", docs, embeddings)
+            for name, method in methods.items():
+                engine = create_engine(f"sqlite:///{Path(directory) / f'{name}-{size}.db'}")
+                Base.metadata.create_all(engine)
+                inserted = timed(engine, lambda session: method(session, first))
+                updated = timed(engine, lambda session: method(session, second))
+                engine.dispose()
+                print(f"{size:>8}  {name:<7}{size / inserted:>15.0f}{size / updated:>15.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Rows/sec of note listing and search hydration: full ORM entities versus column projection.
+
+Usage::
+
+    python -m benchmarks.search_projection --rows 20000 --dimension 384
+
+"entities" loads ``MemoryNote`` objects with the embedding undeferred (the
+former behaviour); "columns" selects only the DTO columns as row tuples.
+"""
+
+from __future__ import annotations
+
+import argparse
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+import random
+import tempfile
+import time
+from typing import Callable, Sequence
+
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import Session, undefer
+
+from app.db.base import Base
+from app.db.models.memory import MemoryNote
+from app.memory import repository as repository_module
+
+
+def rows_per_second(engine, function: Callable[[Session], int], repeat: int) -> float:
+    total = 0
+    started = time.perf_counter()
+    for _ in range(repeat):
+        with Session(engine) as session:
+            total += function(session)
+    return total / (time.perf_counter() - started)
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--page", type=int, default=100)
+    parser.add_argument("--hits", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{Path(directory) / 'bench.db'}")
+        Base.metadata.create_all(engine)
+        start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        with engine.begin() as connection:
+            connection.execute(
+                insert(MemoryNote),
+                [
+                    {
+                        "note_id": f"note-{index}",
+                        "user": "bench",
+                        "agent": "bench",
+                        "text": f"note {index} " + "lorem ipsum " * 20,
+                        "tags": ["misc"],
+                        "payload": {"source": "bench", "index": index},
+                        "embedding": [rng.random() for _ in range(args.dimension)],
+                        "created_at": start + timedelta(seconds=index),
+                        "updated_at": start + timedelta(seconds=index),
+                    }
+                    for index in range(args.rows)
+                ],
+            )
+
+        order = (MemoryNote.updated_at.desc(), MemoryNote.note_id.desc())
+        hit_ids = [f"note-{rng.randrange(args.rows)}" for _ in range(args.hits)]
+        entities = select(MemoryNote).options(undefer(MemoryNote.embedding))
+        columns = select(*repository_module._NOTE_COLUMNS)
+        scenarios = {
+            "list page": lambda stmt: lambda session: len(
+                session.execute(stmt.order_by(*order).limit(args.page)).all()
+            ),
+            "list all": lambda stmt: lambda session: len(session.execute(stmt.order_by(*order)).all()),
+            "search hydrate": lambda stmt: lambda session: len(
+                session.execute(stmt.where(MemoryNote.note_id.in_(hit_ids))).all()
+            ),
+        }
+        print(f"{'scenario':<16}{'entities rows/s':>17}{'columns rows/s':>16}{'speedup':>9}")
+        for name, build in scenarios.items():
+            repeat = 2 if name == "list all" else args.repeat
+            before = rows_per_second(engine, build(entities), repeat)
+            after = rows_per_second(engine, build(columns), repeat)
+            print(f"{name:<16}{before:>17.0f}{after:>16.0f}{after / before:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
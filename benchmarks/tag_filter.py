@@ -0,0 +1,81 @@
+"""Tag-filtered note listing on SQLite: Python filtering versus ``json_each`` in SQL.
+
+Usage::
+
+    python -m benchmarks.tag_filter --rows 100000 --selectivity 0.01
+
+Both variants return the ``--limit`` most recent notes carrying the tag; the
+Python variant has to hydrate every row to get a correct answer.
+"""
+
+from __future__ import annotations
+
+import argparse
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+import tempfile
+import time
+from typing import Sequence
+
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import Session
+
+from app.db.base import Base
+from app.db.models.memory import MemoryNote
+from app.memory.repository import MemoryRepository
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--selectivity", type=float, default=0.01)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{Path(directory) / 'bench.db'}")
+        Base.metadata.create_all(engine)
+        every = max(1, round(1 / args.selectivity))
+        start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        with engine.begin() as connection:
+            connection.execute(
+                insert(MemoryNote),
+                [
+                    {
+                        "note_id": f"note-{index}",
+                        "user": "bench",
+                        "agent": "bench",
+                        "text": f"note {index}",
+                        "tags": ["needle", "misc"] if index % every == 0 else ["misc"],
+                        "payload": {},
+                        "embedding": None,
+                        "created_at": start + timedelta(seconds=index),
+                        "updated_at": start + timedelta(seconds=index),
+                    }
+                    for index in range(args.rows)
+                ],
+            )
+
+        repository = MemoryRepository.__new__(MemoryRepository)
+        stmt = select(MemoryNote).order_by(MemoryNote.updated_at.desc())
+
+        def python_filter(session: Session) -> list:
+            rows = [row for row in session.execute(stmt).scalars() if "needle" in row.tags]
+            return rows[: args.limit]
+
+        def sql_filter(session: Session) -> list:
+            condition = repository._tag_condition(["needle"], "sqlite")
+            return session.execute(stmt.where(condition).limit(args.limit)).scalars().all()
+
+        for label, function in (("python", python_filter), ("json_each", sql_filter)):
+            started = time.perf_counter()
+            for _ in range(args.repeat):
+                with Session(engine) as session:
+                    found = function(session)
+            elapsed = (time.perf_counter() - started) / args.repeat * 1000.0
+            print(f"{label:>10}: {elapsed:8.1f} ms ({len(found)} rows)")
+
+
+if __name__ == "__main__":
+    main()
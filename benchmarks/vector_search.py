@@ -0,0 +1,71 @@
+"""Latency of top-k vector search on the non-Postgres path.
+
+Usage::
+
+    python -m benchmarks.vector_search --sizes 10000 100000 --dimension 384
+
+Compares the former per-row Python cosine loop (skipped above
+``--python-limit`` rows) with the NumPy ``InMemoryVectorIndex``, with and
+without a label filter matching ~10% of rows.
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from typing import Callable, List, Sequence
+
+import numpy as np
+
+from app.vector.index import InMemoryVectorIndex
+
+
+def python_cosine_top_k(rows: List[List[float]], query: List[float], k: int) -> List[int]:
+    scored = []
+    for position, vector in enumerate(rows):
+        dot = sum(a * b for a, b in zip(query, vector))
+        norm_a = sum(a * a for a in query) ** 0.5
+        norm_b = sum(b * b for b in vector) ** 0.5
+        scored.append((position, dot / (norm_a * norm_b)))
+    scored.sort(key=lambda item: item[1], reverse=True)
+    return [position for position, _ in scored[:k]]
+
+
+def timed(function: Callable[[], object], repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - started) / repeat * 1000.0
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("-k", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--python-limit", type=int, default=20000)
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(0)
+    print(f"{'rows':>9}{'python ms':>12}{'numpy ms':>11}{'numpy+tag ms':>14}")
+    for size in args.sizes:
+        vectors = rng.normal(size=(size, args.dimension)).astype(np.float32)
+        query = rng.normal(size=args.dimension).astype(np.float32)
+        index = InMemoryVectorIndex(args.dimension)
+        for position, vector in enumerate(vectors):
+            index.upsert(position, vector, labels=("tagged",) if position % 10 == 0 else ())
+
+        numpy_ms = timed(lambda: index.search(query, args.k), args.repeat)
+        tagged_ms = timed(lambda: index.search(query, args.k, required_labels=("tagged",)), args.repeat)
+        if size <= args.python_limit:
+            rows = vectors.tolist()
+            query_list = query.tolist()
+            python_ms = f"{timed(lambda: python_cosine_top_k(rows, query_list, args.k), 1):.1f}"
+        else:
+            python_ms = "skipped"
+        print(f"{size:>9}{python_ms:>12}{numpy_ms:>11.2f}{tagged_ms:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Size and read latency of embedding storage formats on SQLite.
+
+Usage::
+
+    python -m benchmarks.vector_storage --rows 20000 --dimension 384
+
+Compares the former JSON text column with the binary float32 / float16 /
+int8 encodings of ``VectorType``: bytes per row, database file size and the
+time to read every vector back as a float32 array.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+from pathlib import Path
+import sqlite3
+import tempfile
+import time
+from typing import Sequence
+
+import numpy as np
+
+from app.db.types import decode_vector, encode_vector
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--dimension", type=int, default=384)
+    args = parser.parse_args(argv)
+
+    vectors = np.random.default_rng(0).normal(size=(args.rows, args.dimension)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    formats = {
+        "json": (lambda vector: json.dumps(vector.tolist()), lambda value: np.asarray(json.loads(value), dtype=np.float32)),
+        "float32": (lambda vector: encode_vector(vector, "float32"), decode_vector),
+        "float16": (lambda vector: encode_vector(vector, "float16"), decode_vector),
+        "int8": (lambda vector: encode_vector(vector, "int8"), decode_vector),
+    }
+
+    print(f"{'format':<9}{'bytes/row':>11}{'file MB':>9}{'read ms':>9}{'max abs err':>13}")
+    with tempfile.TemporaryDirectory() as directory:
+        for name, (encode, decode) in formats.items():
+            path = Path(directory) / f"{name}.db"
+            connection = sqlite3.connect(path)
+            connection.execute("CREATE TABLE vectors (id INTEGER PRIMARY KEY, embedding BLOB)")
+            encoded = [encode(vector) for vector in vectors]
+            connection.executemany("INSERT INTO vectors (embedding) VALUES (?)", [(value,) for value in encoded])
+            connection.commit()
+            connection.close()
+
+            connection = sqlite3.connect(path)
+            started = time.perf_counter()
+            decoded = [decode(value) for (value,) in connection.execute("SELECT embedding FROM vectors")]
+            elapsed = (time.perf_counter() - started) * 1000.0
+            connection.close()
+            error = float(np.max(np.abs(np.stack(decoded) - vectors)))
+            row_bytes = sum(len(value) for value in encoded) / len(encoded)
+            print(f"{name:<9}{row_bytes:>11.0f}{path.stat().st_size / 1e6:>9.1f}{elapsed:>9.1f}{error:>13.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -99,6 +99,8 @@ if "chromadb" not in sys.modules:
 
 import pytest
 from fastapi.testclient import TestClient
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
 
 from app import dependencies as dependencies_module
 from app.core import config as config_module
@@ -108,7 +110,32 @@ from app.main import create_app
 from app.memory.service import MemoryService
 from app.services import paths as paths_module
 from app.services.bus_service import BusServiceError
+from app.services.rag_service import RAGIndexResult
+from app.vector import backends as backends_module
+from app.vector import batching as batching_module
 from app.vector import embedding as embedding_module
+from app.vector.backends import HashingBackend
+from app.vector.embedding import EmbeddingService
+
+class CountingEmbeddingService(EmbeddingService):
+    """Hashing embeddings that count ``embed`` calls."""
+
+    def __init__(self) -> None:
+        super().__init__(HashingBackend(384))
+        self.calls = 0
+
+    def embed(self, texts):
+        self.calls += 1
+        return super().embed(texts)
+
+
+def count_rows(model: Any, session: Session | None = None) -> int:
+    statement = select(func.count()).select_from(model)
+    if session is not None:
+        return session.execute(statement).scalar_one()
+    with session_module.get_session() as own_session:
+        return own_session.execute(statement).scalar_one()
+
 
 class DummyAuditLogger:
     def __init__(self) -> None:
@@ -354,15 +381,26 @@ class DummyRAGService:
     def __init__(self) -> None:
         self.collections: Dict[str, Dict[str, Dict[str, Any]]] = {}
 
-    def index(self, session, collection_name: str, documents: List[Any]) -> List[str]:
+    def index(self, session, collection_name: str, documents: List[Any]) -> RAGIndexResult:
         collection = self.collections.setdefault(collection_name, {})
-        ids: List[str] = []
+        result = RAGIndexResult(document_ids=[])
         for document in documents:
-            ids.append(document.doc_id)
+            result.document_ids.append(document.doc_id)
+            stored = collection.get(document.doc_id)
+            if stored is None:
+                result.created += 1
+            elif stored["text"] != document.text or stored["metadata"] != dict(document.metadata):
+                result.updated += 1
+            if stored is None or stored["text"] != document.text:
+                result.embedded += 1
+            else:
+                result.skipped += 1
             collection[document.doc_id] = {"text": document.text, "metadata": dict(document.metadata)}
-        return ids
+        return result
 
-    def query(self, session, collection_name: str, query_text: str, n_results: int) -> List[Dict[str, Any]]:
+    def query(
+        self, session, collection_name: str, query_text: str, n_results: int, mode: str | None = None
+    ) -> List[Dict[str, Any]]:
         collection = self.collections.get(collection_name, {})
         results: List[Dict[str, Any]] = []
         lowered = query_text.lower()
@@ -383,6 +421,11 @@ class DummyRAGService:
                 break
         return results
 
+    def query_batch(
+        self, session, collection_name: str, queries: List[str], n_results: int, mode: str | None = None
+    ) -> List[List[Dict[str, Any]]]:
+        return [self.query(session, collection_name, query_text, n_results, mode) for query_text in queries]
+
 
 @pytest.fixture
 def api_context(tmp_path, monkeypatch):
@@ -409,7 +452,8 @@ def api_context(tmp_path, monkeypatch):
     settings.database_echo = False
 
     embedding_module.get_embedding_service.cache_clear()
-    embedding_module.SentenceTransformer = None
+    batching_module.get_embedding_scheduler.cache_clear()
+    backends_module.SentenceTransformer = None
 
     session_module.reset_engine()
     setup_module.init_db()
@@ -445,6 +489,11 @@ def api_context(tmp_path, monkeypatch):
     }
 
 
+@pytest.fixture
+def counting_embeddings() -> CountingEmbeddingService:
+    return CountingEmbeddingService()
+
+
 @pytest.fixture
 def client(api_context):
     app = create_app()
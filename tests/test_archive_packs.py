@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import gzip
+import json
+
+from app.memory.packs import PackedArchive, compact, convert_zmem
+
+
+def _payload(note_id: str, text: str | None = None) -> dict:
+    return {"note_id": note_id, "text": text or f"note {note_id} " * 8, "tags": [], "metadata": {}}
+
+
+def test_segments_roll_seal_and_serve_point_reads(tmp_path) -> None:
+    archive = PackedArchive(tmp_path, segment_bytes=2048, block_bytes=512)
+    assert archive.append([_payload(f"n{index}") for index in range(200)]) == 200
+    assert archive.append([_payload("n5"), _payload("n5"), _payload("extra")]) == 1
+    archive.close()
+
+    packs = sorted(tmp_path.glob("*.pack"))
+    assert len(packs) > 1
+    assert sorted(tmp_path.glob("*.idx")) == [path.with_suffix(".idx") for path in packs]
+    assert not list(tmp_path.glob("*.log"))
+    assert not list(tmp_path.glob("*.zmem"))
+
+    reader = PackedArchive(tmp_path)
+    assert reader.get("n137")["text"].startswith("note n137")
+    assert reader.get("missing") is None
+    assert len(reader) == 201
+    assert sorted(payload["note_id"] for payload in reader.iter_payloads()) == sorted(
+        [f"n{index}" for index in range(200)] + ["extra"]
+    )
+
+
+def test_live_and_crashed_writers(tmp_path) -> None:
+    live = PackedArchive(tmp_path)
+    live.append([_payload("live-1")])
+    reader = PackedArchive(tmp_path)
+    assert reader.get("live-1") is not None
+    live.append([_payload("live-2")])
+    assert reader.get("live-2") is not None
+    assert not list(tmp_path.glob("*.idx"))
+
+    # Dropping the writer without sealing releases its lock like a crash would.
+    live._active.pack.write(b"ZMB1\x00\x00\x10\x00torn")
+    live._active.pack.close()
+    live._active.log.close()
+    live._active = None
+
+    recovered = PackedArchive(tmp_path)
+    assert len(list(tmp_path.glob("*.idx"))) == 1
+    assert not list(tmp_path.glob("*.log"))
+    assert recovered.get("live-2")["note_id"] == "live-2"
+    assert recovered.append([_payload("live-1"), _payload("after")]) == 1
+
+
+def test_compact_merges_segments_and_drops_duplicates(tmp_path) -> None:
+    first = PackedArchive(tmp_path)
+    second = PackedArchive(tmp_path)
+    first.append([_payload("a"), _payload("b")])
+    second.append([_payload("b", "later copy"), _payload("c")])
+    first.close()
+    second.close()
+
+    report = compact(tmp_path)
+
+    assert (report.segments_before, report.segments_after) == (2, 1)
+    assert (report.records, report.duplicates) == (3, 1)
+    reader = PackedArchive(tmp_path)
+    assert reader.get("b")["text"].startswith("note b")
+    assert len(list(tmp_path.glob("*.pack"))) == 1
+
+
+def test_convert_zmem_moves_legacy_files(tmp_path) -> None:
+    for note_id in ("old-1", "old-2"):
+        with gzip.open(tmp_path / f"{note_id}.zmem", "wt", encoding="utf-8") as handle:
+            json.dump(_payload(note_id), handle)
+    archive = PackedArchive(tmp_path)
+
+    assert convert_zmem(tmp_path, archive, delete=True) == 2
+    assert not list(tmp_path.glob("*.zmem"))
+    assert archive.get("old-2")["note_id"] == "old-2"
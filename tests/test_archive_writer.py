@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+from datetime import datetime, timezone
+import json
+import threading
+
+from app.memory.archive import SPOOL_DIRNAME, ArchiveWriter, archive_payload
+from app.memory.domain import MemoryNoteDTO
+from app.memory.packs import PackedArchive
+
+
+def _note(note_id: str) -> MemoryNoteDTO:
+    now = datetime(2024, 5, 1, tzinfo=timezone.utc)
+    return MemoryNoteDTO(note_id, "u", "a", f"text {note_id}", ["t"], {}, now, now)
+
+
+def test_writer_drains_queue_and_truncates_spool(tmp_path) -> None:
+    writer = ArchiveWriter(tmp_path, batch_size=4)
+    for index in range(10):
+        writer.submit(_note(f"n{index}"))
+
+    assert writer.flush(timeout=5)
+    assert writer.packs.get("n3")["text"] == "text n3"
+    assert len(writer.packs) == 10
+    stats = writer.stats()
+    assert (stats["queue_depth"], stats["pending"], stats["written"]) == (0, 0, 10)
+    spools = list((tmp_path / SPOOL_DIRNAME).glob("*.jsonl"))
+    assert len(spools) == 1 and spools[0].stat().st_size == 0
+
+    writer.close()
+    assert not list((tmp_path / SPOOL_DIRNAME).glob("*.jsonl"))
+
+
+def test_full_queue_falls_back_to_inline_writes(tmp_path, monkeypatch) -> None:
+    release = threading.Event()
+    append = PackedArchive.append
+
+    def _blocking_append(self, payloads):
+        if threading.current_thread().name == "memory-archive-writer":
+            release.wait(5)
+        return append(self, payloads)
+
+    monkeypatch.setattr(PackedArchive, "append", _blocking_append)
+    writer = ArchiveWriter(tmp_path, max_queue=1, batch_size=1)
+    for index in range(3):
+        writer.submit(_note(f"n{index}"))
+    assert writer.stats()["overflow"] >= 1
+
+    release.set()
+    assert writer.flush(timeout=5)
+    assert all(f"n{index}" in writer.packs for index in range(3))
+    writer.close()
+
+
+def test_recover_replays_orphaned_spools_only(tmp_path) -> None:
+    spool_dir = tmp_path / SPOOL_DIRNAME
+    spool_dir.mkdir()
+    orphan = spool_dir / "4242-deadbeef.jsonl"
+    lines = [json.dumps(archive_payload(_note(note_id))) for note_id in ("lost-1", "lost-2")]
+    orphan.write_text("\n".join(lines) + '\n{"note_id": "torn', encoding="utf-8")
+
+    live = ArchiveWriter(tmp_path)
+    live.submit(_note("live"))
+    live.flush(timeout=5)
+    writer = ArchiveWriter(tmp_path)
+
+    assert writer.recover() == 2
+    assert writer.packs.get("lost-2")["note_id"] == "lost-2"
+    assert not orphan.exists()
+    assert len(list(spool_dir.glob("*.jsonl"))) == 1
+    live.close()
+    writer.close()
+
+
+def test_failed_batch_releases_spool_for_recovery(tmp_path, monkeypatch) -> None:
+    append = PackedArchive.append
+    failures = ["boom"]
+
+    def _flaky_append(self, payloads):
+        if failures and threading.current_thread().name == "memory-archive-writer":
+            raise OSError(failures.pop())
+        return append(self, payloads)
+
+    monkeypatch.setattr(PackedArchive, "append", _flaky_append)
+    writer = ArchiveWriter(tmp_path, batch_size=1)
+    writer.submit(_note("lost"))
+    assert writer.flush(timeout=5)
+    writer.submit(_note("kept"))
+    assert writer.flush(timeout=5)
+
+    assert writer.stats()["failed"] == 1
+    spools = sorted((tmp_path / SPOOL_DIRNAME).glob("*.jsonl"), key=lambda path: path.stat().st_size)
+    assert len(spools) == 2 and spools[0].stat().st_size == 0
+    assert writer.recover() == 1
+    assert writer.packs.get("lost")["note_id"] == "lost"
+    writer.close()
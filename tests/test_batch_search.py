@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import numpy as np
+
+from app.db import session as session_module
+from app.memory.domain import MemoryNoteInput
+from app.memory.repository import MemoryRepository
+from app.services.rag_service import RAGDocument, RAGService
+from app.vector.index import InMemoryVectorIndex
+
+
+def test_in_memory_search_many_matches_exact_scan() -> None:
+    rng = np.random.default_rng(3)
+    vectors = rng.normal(size=(40, 16)).astype(np.float32)
+    index = InMemoryVectorIndex(16)
+    for position, vector in enumerate(vectors):
+        index.upsert(position, vector, ("even",) if position % 2 == 0 else ("odd",))
+    queries = rng.normal(size=(5, 16)).astype(np.float32)
+
+    batched = index.search_many(list(queries), 4, required_labels=("even",))
+
+    normalised = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    for query, hits in zip(queries, batched):
+        scores = normalised[::2] @ (query / np.linalg.norm(query))
+        assert [key for key, _ in hits] == [int(row) * 2 for row in np.argsort(-scores)[:4]]
+
+
+def test_memory_find_batch_embeds_once_and_matches_single_queries(api_context, counting_embeddings) -> None:
+    service = counting_embeddings
+    repository = MemoryRepository(embedding_service=service)
+    notes = [
+        MemoryNoteInput(text="Rotate the staging database credentials", tags=["ops"]),
+        MemoryNoteInput(text="The parser chokes on nested quotes", tags=["dev"]),
+        MemoryNoteInput(text="Quarterly planning moved to Thursday", tags=["team"]),
+    ]
+    queries = ["database credentials", "nested quotes parser", "planning"]
+    with session_module.get_session() as session:
+        repository.add_notes(session, notes, user="u", agent="a")
+
+    with session_module.get_session() as session:
+        single = [repository.find_notes(session, query=query, tags=None, limit=2, mode="hybrid") for query in queries]
+        service.calls = 0
+        batched = repository.find_notes_batch(session, queries=queries, tags=None, limit=2, mode="hybrid")
+
+    assert service.calls == 1
+    assert batched == single
+    assert [hits[0].text for hits in batched] == [note.text for note in notes]
+
+
+def test_rag_query_batch_endpoint_returns_per_query_results(api_context, client, counting_embeddings) -> None:
+    rag = RAGService(embedding_service=counting_embeddings)
+    with session_module.get_session() as session:
+        rag.index(
+            session,
+            "docs",
+            [
+                RAGDocument("a", "Error E1234 means quota exceeded", {"source": "a.md"}),
+                RAGDocument("b", "Restart the worker after a deploy", {"source": "b.md"}),
+            ],
+        )
+
+    with session_module.get_session() as session:
+        batched = rag.query_batch(session, "docs", ["E1234 quota", "restart worker"], 1, mode="vector")
+    assert [[hit["source"] for hit in hits] for hits in batched] == [["a.md"], ["b.md"]]
+
+    response = client.post(
+        "/rag/query_batch",
+        json={"user": "tester", "collection": "docs", "queries": ["quota", "missing"], "n_results": 2},
+    )
+    assert response.status_code == 200
+    assert len(response.json()["results"]) == 2
+    assert client.post(
+        "/rag/query_batch", json={"user": "tester", "collection": "docs", "queries": [" "]}
+    ).status_code == 400
+
+
+def test_memory_find_batch_endpoint(client) -> None:
+    for text in ("Alpha release checklist", "Beta feedback triage"):
+        response = client.post(
+            "/memory/note/add",
+            json={"user": "tester", "agent": "unit", "note": {"text": text, "tags": ["release"]}},
+        )
+        assert response.status_code == 200
+
+    response = client.post(
+        "/memory/note/find_batch",
+        json={"user": "tester", "queries": ["alpha checklist", "beta triage"], "limit": 1},
+    )
+
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [[note["text"] for note in notes] for notes in results] == [
+        ["Alpha release checklist"],
+        ["Beta feedback triage"],
+    ]
@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import math
+
+import pytest
+
+from app.core.config import Settings
+from app.vector import backends as backends_module
+from app.vector.backends import HashingBackend, create_backend
+
+
+def _cosine(a, b) -> float:
+    return sum(x * y for x, y in zip(a, b))
+
+
+def test_hashing_backend_is_deterministic_and_normalised() -> None:
+    backend = HashingBackend(384)
+    first, second = backend.encode(["Deploy the API container", "Deploy the API container"])
+
+    assert first == second
+    assert len(first) == 384
+    assert math.isclose(math.sqrt(sum(value * value for value in first)), 1.0, rel_tol=1e-9)
+
+
+def test_hashing_backend_ranks_lexical_overlap_higher() -> None:
+    backend = HashingBackend(384)
+    query, related, unrelated = backend.encode(
+        ["error code E4012 in postgres", "postgres failed with error code E4012", "planning the sprint demo"]
+    )
+
+    assert _cosine(query, related) > _cosine(query, unrelated)
+
+
+def test_create_backend_falls_back_to_hashing_when_model_missing(monkeypatch) -> None:
+    monkeypatch.setattr(backends_module, "SentenceTransformer", None)
+    backend = create_backend(Settings(embedding_backend="sentence_transformers"))
+
+    assert backend.name == "hashing"
+    assert backend.dimension == 384
+
+
+def test_onnx_backend_without_model_dir_falls_back() -> None:
+    backend = create_backend(Settings(embedding_backend="onnx", embedding_onnx_model_dir=None))
+
+    assert backend.name == "hashing"
+
+
+def test_create_backend_rejects_unknown_name() -> None:
+    with pytest.raises(ValueError):
+        create_backend(Settings(embedding_backend="does-not-exist"))
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import json
+
+from app.core.config import get_settings
+from app.db import session as session_module
+from app.memory.domain import MemoryNoteInput
+from app.memory.repository import MemoryRepository
+from app.services.rag_service import RAGDocument, RAGService
+from app.vector.backends import HashingBackend
+from app.vector.embedding import EmbeddingService
+from app.workers.reembed import EmbeddingBackfill
+
+
+def _service(model_id: str) -> EmbeddingService:
+    backend = HashingBackend(384)
+    backend.model_id = model_id
+    return EmbeddingService(backend)
+
+
+def test_queries_skip_stale_vectors_until_backfill_completes(api_context, tmp_path) -> None:
+    get_settings().vector_index_sync_interval_seconds = 0
+    old_repository = MemoryRepository(embedding_service=_service("old:384"))
+    new_service = _service("new:384")
+    new_repository = MemoryRepository(embedding_service=new_service)
+    with session_module.get_session() as session:
+        old_repository.add_notes(
+            session,
+            [MemoryNoteInput(text=text) for text in ("alpha release", "beta rollout", "gamma incident")],
+            user="u",
+            agent="a",
+        )
+        RAGService(embedding_service=_service("old:384")).index(
+            session, "docs", [RAGDocument("d1", "alpha handbook", {"source": "a.md"})]
+        )
+
+    with session_module.get_session() as session:
+        assert new_repository.find_notes(session, query="alpha release", tags=None, limit=3, mode="vector") == []
+
+    checkpoint = tmp_path / "backfill.json"
+    sleeps: list[float] = []
+    backfill = EmbeddingBackfill(
+        session_module.get_engine(),
+        new_service,
+        batch_size=2,
+        max_rows_per_second=1.0,
+        checkpoint_path=checkpoint,
+        sleep=sleeps.append,
+    )
+
+    assert backfill.run(max_batches=1) == {"memory_notes": 2, "rag_documents": 0}
+    assert json.loads(checkpoint.read_text())["model_id"] == "new:384"
+    assert backfill.pending() == {"memory_notes": 1, "rag_documents": 1}
+    with session_module.get_session() as session:
+        partial = new_repository.find_notes(session, query="alpha release", tags=None, limit=3, mode="vector")
+    assert len(partial) == 2
+
+    assert backfill.run() == {"memory_notes": 1, "rag_documents": 1}
+    assert backfill.pending() == {"memory_notes": 0, "rag_documents": 0}
+    assert json.loads(checkpoint.read_text())["tables"] == {}
+    assert sleeps and all(delay > 0 for delay in sleeps)
+    with session_module.get_session() as session:
+        results = new_repository.find_notes(session, query="alpha release", tags=None, limit=3, mode="vector")
+    assert results[0].text == "alpha release"
+    assert len(results) == 3
+
+
+def test_backfill_restarts_checkpoint_for_another_model(api_context, tmp_path) -> None:
+    checkpoint = tmp_path / "backfill.json"
+    checkpoint.write_text(json.dumps({"model_id": "previous:384", "tables": {"memory_notes": ["zzz"]}}))
+    with session_module.get_session() as session:
+        MemoryRepository(embedding_service=_service("old:384")).add_note(
+            session, text="delta", tags=[], metadata=None, user="u", agent="a"
+        )
+
+    backfill = EmbeddingBackfill(session_module.get_engine(), _service("new:384"), checkpoint_path=checkpoint)
+
+    assert backfill.run()["memory_notes"] == 1
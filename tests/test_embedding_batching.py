@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+import pytest
+
+from app.core.metrics import MetricsRegistry
+from app.vector.batching import EmbeddingBatcher
+
+
+class _RecordingService:
+    dimension = 2
+
+    def __init__(self) -> None:
+        self.calls: List[List[str]] = []
+        self._lock = threading.Lock()
+
+    def embed(self, texts):
+        items = list(texts)
+        with self._lock:
+            self.calls.append(items)
+        return [[float(len(text)), float(index)] for index, text in enumerate(items)]
+
+
+def test_concurrent_single_text_requests_share_one_encode() -> None:
+    service = _RecordingService()
+    registry = MetricsRegistry()
+    batcher = EmbeddingBatcher(service, max_batch_size=8, max_wait_ms=200, metrics=registry)
+    texts = [f"text-{index:02d}" + "x" * index for index in range(8)]
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda text: batcher.embed([text]), texts))
+    batcher.close()
+
+    assert [result[0][0] for result in results] == [float(len(text)) for text in texts]
+    assert sum(len(call) for call in service.calls) == 8
+    assert len(service.calls) < 8
+    snapshot = registry.snapshot()
+    assert snapshot["embedding_batch_size"]["count"] == len(service.calls)
+    assert snapshot["embedding_queue_wait_ms"]["count"] == 8
+
+
+def test_large_requests_bypass_queue() -> None:
+    service = _RecordingService()
+    batcher = EmbeddingBatcher(service, max_batch_size=2, max_wait_ms=50, metrics=MetricsRegistry())
+
+    vectors = batcher.embed(["a", "bb", "ccc"])
+
+    assert len(vectors) == 3
+    assert service.calls == [["a", "bb", "ccc"]]
+
+
+def test_async_callers_are_batched() -> None:
+    service = _RecordingService()
+    batcher = EmbeddingBatcher(service, max_batch_size=4, max_wait_ms=200, metrics=MetricsRegistry())
+
+    async def _gather() -> list:
+        return await asyncio.gather(*(batcher.aembed([text]) for text in ("a", "bb", "ccc", "dddd")))
+
+    results = asyncio.run(_gather())
+    batcher.close()
+
+    assert [vectors[0][0] for vectors in results] == [1.0, 2.0, 3.0, 4.0]
+    assert service.calls == [["a", "bb", "ccc", "dddd"]]
+
+
+def test_encode_errors_reach_every_caller() -> None:
+    class _FailingService(_RecordingService):
+        def embed(self, texts):
+            raise RuntimeError("model unavailable")
+
+    batcher = EmbeddingBatcher(_FailingService(), max_batch_size=4, max_wait_ms=1, metrics=MetricsRegistry())
+    with pytest.raises(RuntimeError, match="model unavailable"):
+        batcher.embed(["boom"])
+    batcher.close()
@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+from typing import List
+
+from app.vector.cache import EmbeddingCache, cache_key
+from app.vector.embedding import EmbeddingService
+
+
+class _CountingBackend:
+    name = "counting"
+    model_id = "counting:unit-model"
+    cacheable = True
+    dimension = 4
+
+    def __init__(self) -> None:
+        self.batches: List[List[str]] = []
+
+    def encode(self, items):
+        self.batches.append(list(items))
+        return [[float(len(text)), 1.0, 0.0, 0.5] for text in items]
+
+
+def _service_with_model(cache: EmbeddingCache) -> tuple[EmbeddingService, _CountingBackend]:
+    model = _CountingBackend()
+    return EmbeddingService(model, cache=cache), model
+
+
+def test_embed_only_sends_cache_misses_to_model() -> None:
+    cache = EmbeddingCache(max_bytes=1024 * 1024, ttl_seconds=60)
+    service, model = _service_with_model(cache)
+
+    first = service.embed(["alpha", "beta", "alpha"])
+    second = service.embed(["beta", "gamma"])
+
+    assert model.batches == [["alpha", "beta"], ["gamma"]]
+    assert first[0] == first[2] == [5.0, 1.0, 0.0, 0.5]
+    assert second[0] == first[1]
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 4
+
+
+def test_cache_evicts_least_recently_used_within_byte_budget() -> None:
+    vector_bytes = 4 * 4
+    cache = EmbeddingCache(max_bytes=2 * vector_bytes, ttl_seconds=0)
+    cache.put_many({"a": [1, 1, 1, 1], "b": [2, 2, 2, 2]})
+    cache.get_many(["a"])
+    cache.put_many({"c": [3, 3, 3, 3]})
+
+    assert set(cache.get_many(["a", "b", "c"])) == {"a", "c"}
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["bytes"] == 2 * vector_bytes
+
+
+def test_cache_honours_ttl(monkeypatch) -> None:
+    clock = {"now": 1000.0}
+    monkeypatch.setattr("app.vector.cache.time.monotonic", lambda: clock["now"])
+    cache = EmbeddingCache(max_bytes=1024, ttl_seconds=10)
+    cache.put_many({"key": [0.5, 0.5]})
+
+    clock["now"] += 5
+    assert "key" in cache.get_many(["key"])
+    clock["now"] += 10
+    assert cache.get_many(["key"]) == {}
+
+
+def test_disk_tier_survives_new_cache_instance(tmp_path) -> None:
+    disk_path = tmp_path / "cache" / "embeddings.sqlite3"
+    key = cache_key("unit-model", "persisted")
+    EmbeddingCache(max_bytes=1024, ttl_seconds=60, disk_path=disk_path).put_many({key: [0.25, 0.75]})
+
+    restarted = EmbeddingCache(max_bytes=1024, ttl_seconds=60, disk_path=disk_path)
+    assert restarted.get_many([key]) == {key: [0.25, 0.75]}
+    assert restarted.stats()["disk_hits"] == 1
@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.vector import wire
+from app.vector.backends import HashingBackend, RemoteEmbeddingBackend
+from app.vector.embedding import EmbeddingService
+from app.vector.server import EmbeddingServer
+
+
+@pytest.fixture()
+def socket_path(tmp_path):
+    path = tmp_path / "embed.sock"
+    server = EmbeddingServer(
+        EmbeddingService(HashingBackend(32)),
+        path,
+        max_batch_size=16,
+        max_wait_ms=20,
+    )
+    thread = threading.Thread(target=lambda: asyncio.run(server.serve_forever()), daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 5
+    while not path.exists() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return path
+
+
+def test_wire_round_trips_texts_and_vectors() -> None:
+    op, texts = wire.decode_request(wire.encode_request(["héllo", "", "monde"]))
+    assert op == wire.OP_ENCODE
+    assert texts == ["héllo", "", "monde"]
+
+    vectors = [[0.5, -1.0, 2.0], [0.0, 0.25, 1.0]]
+    assert wire.decode_vectors(wire.encode_vectors(vectors, 3)) == vectors
+    with pytest.raises(wire.WireError, match="boom"):
+        wire.decode_vectors(wire.encode_error("boom"))
+
+
+def test_remote_backend_matches_in_process_vectors(socket_path) -> None:
+    remote = RemoteEmbeddingBackend(socket_path, timeout=5)
+    local = HashingBackend(32)
+
+    assert remote.model_id == local.model_id
+    assert remote.dimension == 32
+
+    texts = [f"note number {index}" for index in range(12)]
+    with ThreadPoolExecutor(max_workers=6) as pool:
+        results = list(pool.map(lambda text: remote.encode([text])[0], texts))
+    expected = local.encode(texts)
+    for received, reference in zip(results, expected):
+        assert received == pytest.approx(reference, abs=1e-6)
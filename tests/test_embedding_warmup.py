@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi.testclient import TestClient
+
+from app.core.config import get_settings
+from app.main import create_app
+from app.vector.backends import HashingBackend
+from app.vector.embedding import EmbeddingService, get_embedding_service
+
+
+def test_concurrent_callers_wait_for_a_single_load() -> None:
+    loads = {"count": 0}
+    release = threading.Event()
+
+    def _slow_loader() -> HashingBackend:
+        loads["count"] += 1
+        release.wait(timeout=5)
+        return HashingBackend(16)
+
+    service = EmbeddingService(loader=_slow_loader)
+    assert service.is_ready is False
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        futures = [pool.submit(service.embed, [f"text {index}"]) for index in range(4)]
+        time.sleep(0.05)
+        assert not any(future.done() for future in futures)
+        release.set()
+        vectors = [future.result(timeout=5)[0] for future in futures]
+
+    assert loads["count"] == 1
+    assert service.is_ready is True
+    assert all(len(vector) == 16 for vector in vectors)
+
+
+def test_ready_endpoint_flips_after_warmup(client) -> None:
+    assert client.get("/health").status_code == 200
+
+    client.app.state.embedding_warmup.join(timeout=10)
+    response = client.get("/ready")
+
+    assert response.status_code == 200
+    assert response.json() == {"status": "ready", "checks": {"database": True, "embedding": True}}
+
+
+def test_ready_endpoint_without_warmup_loads_on_demand(api_context, monkeypatch) -> None:
+    monkeypatch.setattr(get_settings(), "embedding_warmup_enabled", False)
+
+    with TestClient(create_app()) as client:
+        response = client.get("/ready")
+
+    assert get_embedding_service().is_ready is False
+    assert response.status_code == 200
+    assert response.json() == {"status": "ready", "checks": {"database": True, "embedding": True}}
@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import threading
+
+import numpy as np
+
+from app.core.config import get_settings
+from app.db import session as session_module
+from app.memory.repository import MemoryRepository, create_memory_vector_index
+from app.vector import hnsw
+from app.vector.backends import HashingBackend
+from app.vector.embedding import EmbeddingService, get_embedding_service
+from app.vector.hnsw import HNSWIndex
+from app.vector.index import InMemoryVectorIndex
+
+
+def _clustered(rng: np.random.Generator, count: int, dimension: int) -> np.ndarray:
+    centers = rng.normal(size=(20, dimension))
+    return (centers[rng.integers(0, 20, count)] + 0.3 * rng.normal(size=(count, dimension))).astype(np.float32)
+
+
+def test_hnsw_recall_against_exact_scan() -> None:
+    rng = np.random.default_rng(3)
+    vectors = _clustered(rng, 1500, 32)
+    hnsw = HNSWIndex(32, m=8, ef_construction=64, ef_search=48)
+    exact = InMemoryVectorIndex(32)
+    for position, vector in enumerate(vectors):
+        hnsw.upsert(position, vector)
+        exact.upsert(position, vector)
+
+    recall = 0.0
+    queries = _clustered(rng, 50, 32)
+    for query in queries:
+        expected = {key for key, _ in exact.search(query, 10)}
+        recall += len(expected & {key for key, _ in hnsw.search(query, 10)}) / 10
+    assert recall / len(queries) >= 0.9
+
+
+def test_hnsw_updates_filters_and_round_trips(tmp_path) -> None:
+    index = HNSWIndex(3, m=4, ef_construction=16, exact_threshold=1)
+    index.upsert(("docs", "a"), [1.0, 0.0, 0.0], labels=("docs",))
+    index.upsert(("docs", "b"), [0.0, 1.0, 0.0], labels=("docs",))
+    index.upsert(("notes", "c"), [0.9, 0.1, 0.0], labels=("notes",))
+    index.upsert(("docs", "a"), [0.0, 0.0, 1.0], labels=("docs",))
+
+    assert [key for key, _ in index.search([1.0, 0.0, 0.0], 1)] == [("notes", "c")]
+    assert [key for key, _ in index.search([1.0, 0.0, 0.0], 3, required_labels=("docs",))][0] != ("notes", "c")
+    assert len(index) == 3
+
+    path = tmp_path / "graph.hnsw.npz"
+    index.save(path, extra={"row_count": 3})
+    restored, extra = HNSWIndex.load(path)
+    assert extra == {"row_count": 3}
+    assert restored.search([0.0, 0.0, 1.0], 2) == index.search([0.0, 0.0, 1.0], 2)
+
+
+def test_repository_restores_persisted_graph(api_context) -> None:
+    settings = get_settings()
+    settings.vector_index_backend = "hnsw"
+    service = EmbeddingService(HashingBackend(384))
+    repository = MemoryRepository(embedding_service=service)
+    with session_module.get_session() as session:
+        for text in ("deploy the api", "rotate credentials", "write the changelog"):
+            repository.add_note(session, text=text, tags=["ops"], metadata={}, user="u", agent="a")
+    with session_module.get_session() as session:
+        repository.find_notes(session, query="deploy", tags=None, limit=1)
+    # The background build persists the graph once it is ready.
+    assert repository._vector_index.wait_for_graph(timeout=10)
+
+    table_index = create_memory_vector_index(settings)
+    assert table_index.persist_path is not None and table_index.persist_path.exists()
+    restored = MemoryRepository(embedding_service=service, vector_index=table_index)
+    with session_module.get_session() as session:
+        results = restored.find_notes(session, query="rotate credentials", tags=["ops"], limit=1)
+
+    assert table_index.wait_for_graph(timeout=10)
+    assert len(table_index.index) == 3
+    assert results[0].text == "rotate credentials"
+
+
+def test_rebuilt_graph_survives_first_query(api_context, monkeypatch) -> None:
+    settings = get_settings()
+    service = get_embedding_service()
+    repository = MemoryRepository(embedding_service=service)
+    with session_module.get_session() as session:
+        for text in ("deploy the api", "rotate credentials", "write the changelog"):
+            repository.add_note(session, text=text, tags=["ops"], metadata={}, user="u", agent="a")
+    hnsw.main(["--table", "memory_notes"])
+
+    cleared = []
+    clear = HNSWIndex.clear
+    monkeypatch.setattr(HNSWIndex, "clear", lambda self: (cleared.append(self), clear(self)))
+    table_index = create_memory_vector_index(settings)
+    restored = MemoryRepository(embedding_service=service, vector_index=table_index)
+    with session_module.get_session() as session:
+        results = restored.find_notes(session, query="rotate credentials", tags=["ops"], limit=1)
+
+    assert table_index.wait_for_graph(timeout=10)
+    assert cleared == []
+    assert len(table_index.index) == 3
+    assert results[0].text == "rotate credentials"
+
+
+def test_graph_builds_off_the_request_path_and_compacts_tombstones(api_context, monkeypatch) -> None:
+    settings = get_settings()
+    settings.vector_index_backend = "hnsw"
+    monkeypatch.setattr(settings, "vector_index_sync_interval_seconds", 0)
+    release = threading.Event()
+    upsert = HNSWIndex.upsert
+
+    def _slow_upsert(self, *args, **kwargs):
+        if threading.current_thread().name == "vector-index-build":
+            release.wait(10)
+        return upsert(self, *args, **kwargs)
+
+    monkeypatch.setattr(HNSWIndex, "upsert", _slow_upsert)
+    repository = MemoryRepository(embedding_service=EmbeddingService(HashingBackend(384)))
+    table_index = repository._vector_index
+    with session_module.get_session() as session:
+        notes = [
+            repository.add_note(session, text=text, tags=["ops"], metadata={}, user="u", agent="a")[0]
+            for text in ("deploy the api", "rotate credentials", "write the changelog")
+        ]
+    with session_module.get_session() as session:
+        # The first query is served by the exact index while the graph builds.
+        results = repository.find_notes(session, query="rotate credentials", tags=["ops"], limit=1)
+    assert results[0].text == "rotate credentials"
+    assert isinstance(table_index.index, InMemoryVectorIndex)
+
+    release.set()
+    assert table_index.wait_for_graph(timeout=10)
+    assert table_index.persist_path is not None and table_index.persist_path.exists()
+
+    graph = table_index.index
+    rng = np.random.default_rng(0)
+    for note in notes:
+        table_index.upsert(note.note_id, rng.normal(size=384), ["ops"])
+    assert graph.tombstones == 3
+    with session_module.get_session() as session:
+        table_index.sync(session, force=True)
+    assert table_index.wait_for_graph(timeout=10)
+    assert table_index.index is not graph and table_index.index.tombstones == 0
+
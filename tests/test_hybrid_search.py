@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+from app.db import session as session_module
+from app.memory.domain import MemoryNoteInput
+from app.memory.repository import MemoryRepository
+from app.services.rag_service import RAGDocument, RAGService
+from app.vector.ranking import reciprocal_rank_fusion
+
+
+def test_reciprocal_rank_fusion_rewards_agreement() -> None:
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["c", "a"]], k=60)
+
+    assert [key for key, _ in fused] == ["a", "c", "b"]
+    assert fused[0][1] == 1 / 61 + 1 / 62
+
+
+def test_memory_lexical_mode_matches_identifiers_without_embedding(api_context, counting_embeddings) -> None:
+    service = counting_embeddings
+    repository = MemoryRepository(embedding_service=service)
+    notes = [
+        MemoryNoteInput(text="Deploy failed with ERR-4031 on the staging cluster", tags=["ops"]),
+        MemoryNoteInput(text="Staging cluster deploy went fine", tags=["ops"]),
+        MemoryNoteInput(text="Edit config_loader.py to read the new flag", tags=["dev"]),
+    ]
+    with session_module.get_session() as session:
+        repository.add_notes(session, notes, user="u", agent="a")
+    service.calls = 0
+
+    with session_module.get_session() as session:
+        lexical = repository.find_notes(session, query="ERR-4031", tags=None, limit=5, mode="lexical")
+        filtered = repository.find_notes(session, query="config_loader.py", tags=["ops"], limit=5, mode="lexical")
+    assert service.calls == 0
+    assert [note.text for note in lexical] == [notes[0].text]
+    assert filtered == []
+
+    with session_module.get_session() as session:
+        hybrid = repository.find_notes(session, query="config_loader.py", tags=None, limit=3, mode="hybrid")
+    assert service.calls == 1
+    assert hybrid[0].text == notes[2].text
+    assert len(hybrid) == 3
+
+
+def test_rag_hybrid_query_keeps_collection_scope(api_context, counting_embeddings) -> None:
+    rag = RAGService(embedding_service=counting_embeddings)
+    with session_module.get_session() as session:
+        rag.index(session, "docs", [RAGDocument("a", "Error E1234 means quota exceeded", {"source": "a.md"})])
+        rag.index(session, "other", [RAGDocument("b", "Error E1234 in the other collection", {"source": "b.md"})])
+
+    with session_module.get_session() as session:
+        lexical = rag.query(session, "docs", "E1234", 5, mode="lexical")
+        hybrid = rag.query(session, "docs", "E1234", 5, mode="hybrid")
+
+    assert [hit["source"] for hit in lexical] == ["a.md"]
+    assert [hit["source"] for hit in hybrid] == ["a.md"]
@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+from sqlalchemy import func, select, text
+
+from app.core.config import get_settings
+from app.db import session as session_module
+from app.db.models.memory import MemoryNote as MemoryNoteModel, MemoryNoteBucket
+from app.db.setup import add_missing_columns
+from app.memory import dedup
+from app.memory.dedup import deduplicate, jaccard_estimate, lsh_buckets, minhash_signature
+from app.memory.domain import MemoryNoteInput
+from app.memory.repository import MemoryRepository
+from tests.conftest import count_rows
+
+
+def _add(repository, session, text, tags, *, agent="a", metadata=None):
+    return repository.add_note(session, text=text, tags=tags, metadata=metadata, user="u", agent=agent)
+
+
+def test_minhash_separates_rewordings_from_different_facts() -> None:
+    base = minhash_signature("User prefers dark mode in the editor")
+    reworded = minhash_signature("The user prefers dark mode in the editor.")
+    different = minhash_signature("Deploy checklist for the billing service")
+
+    assert jaccard_estimate(base, reworded[None])[0] == 1.0
+    assert jaccard_estimate(base, different[None])[0] < 0.3
+    assert set(lsh_buckets(base)) == set(lsh_buckets(reworded))
+    assert minhash_signature("...") is None
+
+
+def test_minhash_matches_exact_integer_arithmetic() -> None:
+    tokens = {"user", "prefers", "dark", "mode"}
+    hashed = [int.from_bytes(dedup.blake2b(token.encode(), digest_size=4).digest(), "little") for token in tokens]
+    expected = [
+        min(((int(a) * value + int(b)) % ((1 << 61) - 1)) & 0xFFFFFFFF for value in hashed)
+        for a, b in zip(dedup._A, dedup._B)
+    ]
+
+    assert minhash_signature("user prefers dark mode").tolist() == expected
+
+
+def test_add_note_merges_near_duplicate_of_the_same_agent(api_context) -> None:
+    get_settings().memory_dedup_mode = "merge"
+    repository = MemoryRepository()
+    with session_module.get_session() as session:
+        first, created = _add(repository, session, "The staging database password was rotated on Monday", ["ops"])
+        duplicate, duplicate_created = _add(
+            repository, session, "The staging database password was rotated Monday", ["security"]
+        )
+        _, other_created = _add(repository, session, "The production database password was rotated on Friday", [])
+        other_agent, other_agent_created = _add(
+            repository, session, "The staging database password was rotated Monday", [], agent="b"
+        )
+
+    assert created and other_created and not duplicate_created and other_agent_created
+    assert duplicate.note_id == first.note_id
+    assert other_agent.note_id != first.note_id
+    assert duplicate.tags == ["ops", "security"]
+    assert duplicate.updated_at >= first.updated_at
+    with session_module.get_session() as session:
+        assert count_rows(MemoryNoteModel, session) == 3
+        assert count_rows(MemoryNoteBucket, session) == 48
+
+
+def test_add_notes_rejects_stored_and_in_batch_duplicates(api_context, counting_embeddings) -> None:
+    get_settings().memory_dedup_mode = "reject"
+    service = counting_embeddings
+    repository = MemoryRepository(embedding_service=service)
+    with session_module.get_session() as session:
+        (stored, _), = repository.add_notes(
+            session, [MemoryNoteInput(text="User prefers dark mode in the editor", tags=["ui"])], user="u", agent="a"
+        )
+    service.calls = 0
+
+    with session_module.get_session() as session:
+        results = repository.add_notes(
+            session,
+            [
+                MemoryNoteInput(text="The user prefers dark mode in the editor.", tags=["prefs"]),
+                MemoryNoteInput(text="API rate limit is 100 requests per minute"),
+                MemoryNoteInput(text="The API rate limit is 100 requests per minute"),
+            ],
+            user="u",
+            agent="a",
+        )
+
+    assert service.calls == 1
+    assert [created for _, created in results] == [False, True, False]
+    assert results[0][0].note_id == stored.note_id
+    assert results[0][0].tags == ["ui"]
+    assert results[2][0].note_id == results[1][0].note_id
+
+
+def test_offline_deduplicate_backfills_and_merges(api_context) -> None:
+    repository = MemoryRepository()
+    with session_module.get_session() as session:
+        first, _ = _add(repository, session, "Quarterly planning moved to Thursday", ["team"])
+        second, _ = _add(repository, session, "Quarterly planning moved to Thursday!", ["calendar"], metadata={"v": 2})
+        other_agent, _ = _add(repository, session, "Quarterly planning moved to Thursday", [], agent="b")
+        _add(repository, session, "Lunch order is due by noon", [])
+        # Dedup is off by default: inserts neither sign notes nor write buckets.
+        assert session.execute(select(func.count()).where(MemoryNoteModel.minhash.is_not(None))).scalar_one() == 0
+        assert count_rows(MemoryNoteBucket, session) == 0
+
+    engine = session_module.get_engine()
+    preview = deduplicate(engine, dry_run=True)
+    report = deduplicate(engine)
+
+    assert (preview.signed, preview.merged) == (0, 0)
+    assert (report.signed, report.merged, report.canonical) == (4, 1, 1)
+    with session_module.get_session() as session:
+        notes = {note.note_id: note for note in session.execute(select(MemoryNoteModel)).scalars()}
+        assert len(notes) == 3
+        assert first.note_id in notes and other_agent.note_id in notes and second.note_id not in notes
+        assert notes[first.note_id].tags == ["team", "calendar"]
+        assert count_rows(MemoryNoteBucket, session) == 48
+
+
+def test_add_missing_columns_restores_new_nullable_columns(api_context) -> None:
+    engine = session_module.get_engine()
+    with engine.begin() as connection:
+        connection.execute(text("ALTER TABLE memory_notes DROP COLUMN minhash"))
+
+    assert add_missing_columns(engine) == ["memory_notes.minhash"]
+    assert add_missing_columns(engine) == []
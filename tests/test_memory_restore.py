@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+from datetime import datetime, timezone
+import gzip
+import json
+
+from sqlalchemy import delete, select
+
+from app.db import session as session_module
+from app.db.models.memory import MemoryNote as MemoryNoteModel, MemoryNoteBucket
+from app.memory.archive import ArchiveWriter
+from app.memory.domain import MemoryNoteInput
+from app.memory.repository import MemoryRepository
+from app.memory.restore import ArchiveRestore
+from app.memory.service import MemoryService
+from app.vector.backends import HashingBackend
+from app.vector.embedding import EmbeddingService
+from tests.conftest import count_rows
+
+
+def _wipe() -> None:
+    with session_module.get_session() as session:
+        session.execute(delete(MemoryNoteBucket))
+        session.execute(delete(MemoryNoteModel))
+
+
+def test_restore_rebuilds_notes_and_resumes_from_checkpoint(api_context, tmp_path) -> None:
+    archives = tmp_path / "archives"
+    service = MemoryService(archive_writer=ArchiveWriter(archives, block_bytes=256))
+    with session_module.get_session() as session:
+        service.add_notes(
+            session,
+            user="u",
+            agent="a",
+            notes=[MemoryNoteInput(text=f"restored note number {index}", tags=["t"]) for index in range(30)],
+        )
+    service.close()
+    with session_module.get_session() as session:
+        original = {note.note_id: note.created_at for note in session.execute(select(MemoryNoteModel)).scalars()}
+    buckets = count_rows(MemoryNoteBucket)
+    _wipe()
+
+    checkpoint = tmp_path / "restore.json"
+    restore = ArchiveRestore(
+        session_module.get_engine(),
+        EmbeddingService(HashingBackend(384)),
+        archives,
+        batch_size=7,
+        checkpoint_path=checkpoint,
+        span_bytes=512,
+    )
+    report = restore.run()
+
+    assert (report.read, report.restored, report.skipped) == (30, 30, 0)
+    assert report.tasks > 1 and report.notes_per_second > 0
+    assert count_rows(MemoryNoteBucket) == buckets
+    with session_module.get_session() as session:
+        notes = {note.note_id: note for note in session.execute(select(MemoryNoteModel)).scalars()}
+        assert {note_id: note.created_at for note_id, note in notes.items()} == original
+        assert {note.embedding_model for note in notes.values()} == {"hashing:384"}
+        found = MemoryRepository().find_notes(session, query="restored note number 7", tags=None, limit=1)
+    assert found[0].text == "restored note number 7"
+
+    assert len(json.loads(checkpoint.read_text())["done"]) == report.tasks
+    assert restore.run().tasks == 0
+    rerun = restore.run(reset=True)
+    assert (rerun.restored, rerun.skipped) == (0, 30)
+
+
+def test_restore_reads_legacy_archives_with_a_process_pool(api_context, tmp_path) -> None:
+    now = datetime(2024, 1, 2, tzinfo=timezone.utc).isoformat()
+    for index in range(3):
+        payload = {
+            "note_id": f"legacy-{index}",
+            "text": f"legacy archive {index}",
+            "tags": [],
+            "metadata": {"source": "zmem"},
+            "created_at": now,
+            "updated_at": now,
+        }
+        with gzip.open(tmp_path / f"legacy-{index}.zmem", "wt", encoding="utf-8") as handle:
+            json.dump(payload, handle)
+
+    report = ArchiveRestore(
+        session_module.get_engine(), EmbeddingService(HashingBackend(384)), tmp_path, workers=2
+    ).run()
+
+    assert report.restored == 3
+    with session_module.get_session() as session:
+        note = session.get(MemoryNoteModel, "legacy-1")
+        assert (note.user, note.payload) == ("restore", {"source": "zmem"})
@@ -1,12 +1,10 @@
 from __future__ import annotations
 
-import gzip
-import json
-
 from sqlalchemy import select
 
 from app.db import session as session_module
 from app.db.models.memory import MemoryNote as MemoryNoteModel
+from app.memory.packs import PackedArchive
 
 
 def _add_note(client, text: str, note_id: str | None = None, tags: list[str] | None = None) -> dict:
@@ -33,10 +31,9 @@ def test_memory_note_add_persists_payload_and_logs(client, api_context):
     assert note["text"] == "Capture meeting notes"
     assert note["tags"] == ["meeting"]
 
-    archive_path = api_context["base_dir"] / "memory" / "library" / "archives" / f"{note['note_id']}.zmem"
-    assert archive_path.exists()
-    with gzip.open(archive_path, "rt", encoding="utf-8") as handle:
-        payload = json.load(handle)
+    assert api_context["memory_service"].flush_archives(timeout=5)
+    payload = PackedArchive(api_context["base_dir"] / "memory" / "library" / "archives").get(note["note_id"])
+    assert payload is not None
     assert payload["text"] == "Capture meeting notes"
 
     with session_module.get_session() as session:
@@ -59,9 +56,8 @@ def test_memory_note_add_is_idempotent_with_same_note_id(client, api_context):
         assert len(notes) == 1
         assert notes[0].text == "Initial capture"
 
-    archive_path = api_context["base_dir"] / "memory" / "library" / "archives" / f"{first['note']['note_id']}.zmem"
-    with gzip.open(archive_path, "rt", encoding="utf-8") as handle:
-        payload = json.load(handle)
+    assert api_context["memory_service"].flush_archives(timeout=5)
+    payload = api_context["memory_service"].read_archive(first["note"]["note_id"])
     assert payload["text"] == "Initial capture"
 
 
@@ -92,3 +88,77 @@ def test_memory_note_find_returns_empty_when_no_matches(client):
     )
     assert response.status_code == 200
     assert response.json()["results"] == []
+
+
+def test_memory_note_add_batch_reports_created_flags(client, api_context):
+    existing = _add_note(client, "Already stored", tags=["chat"])
+    notes = [
+        {"text": "Already stored", "tags": ["chat"], "metadata": {"source": "tests"}},
+        {"text": "First new turn", "tags": ["Chat"]},
+        {"text": "Second new turn", "tags": ["chat"], "note_id": "turn-2"},
+        {"text": "First new turn", "tags": ["chat"]},
+    ]
+    response = client.post("/memory/note/add_batch", json={"user": "operator", "agent": "scribe", "notes": notes})
+    assert response.status_code == 200
+    results = response.json()["results"]
+
+    assert [item["created"] for item in results] == [False, True, True, False]
+    assert results[0]["note"]["note_id"] == existing["note"]["note_id"]
+    assert results[1]["note"]["note_id"] == results[3]["note"]["note_id"]
+    assert results[2]["note"]["note_id"] == "turn-2"
+
+    with session_module.get_session() as session:
+        assert len(session.scalars(select(MemoryNoteModel)).all()) == 3
+    assert api_context["memory_service"].flush_archives(timeout=5)
+    assert api_context["memory_service"].read_archive("turn-2") is not None
+
+    search = client.post("/memory/note/find", json={"user": "operator", "query": "Second new turn", "limit": 1})
+    assert search.json()["results"][0]["note_id"] == "turn-2"
+    assert any(event["tool"] == "memory.note.add_batch" for event in api_context["audit_events"])
+
+
+def test_memory_note_find_filters_tags_before_limit(client):
+    for notes in (
+        [{"text": f"tagged {index}", "tags": ["Keep"]} for index in range(3)],
+        [{"text": f"recent {index}", "tags": ["other"]} for index in range(5)],
+    ):
+        client.post("/memory/note/add_batch", json={"user": "operator", "agent": "scribe", "notes": notes})
+
+    response = client.post(
+        "/memory/note/find",
+        json={"user": "operator", "query": "", "tags": ["keep"], "limit": 3},
+    )
+    assert response.status_code == 200
+    texts = sorted(item["text"] for item in response.json()["results"])
+    assert texts == ["tagged 0", "tagged 1", "tagged 2"]
+
+    response = client.post(
+        "/memory/note/find",
+        json={"user": "operator", "query": "", "tags": ["keep", "other"], "limit": 3},
+    )
+    assert response.json()["results"] == []
+
+
+def test_memory_note_find_pages_with_cursor(client):
+    for agent in ("scribe", "planner"):
+        notes = [{"text": f"{agent} entry {index}"} for index in range(5)]
+        client.post("/memory/note/add_batch", json={"user": "operator", "agent": agent, "notes": notes})
+
+    seen: list[str] = []
+    cursor = None
+    while True:
+        body = {"user": "operator", "query": "", "agent": "scribe", "limit": 2}
+        if cursor:
+            body["cursor"] = cursor
+        data = client.post("/memory/note/find", json=body).json()
+        seen.extend(item["text"] for item in data["results"])
+        cursor = data["next_cursor"]
+        if cursor is None:
+            break
+
+    assert sorted(seen) == [f"scribe entry {index}" for index in range(5)]
+
+    invalid = client.post("/memory/note/find", json={"user": "operator", "query": "", "cursor": "not-a-cursor"})
+    assert invalid.status_code == 400
+    mixed = client.post("/memory/note/find", json={"user": "operator", "query": "entry", "agent": "scribe"})
+    assert mixed.status_code == 400
@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+from types import SimpleNamespace
+
+from app.core.config import Settings
+from app.db import session as session_module
+from app.db.vector_indexes import apply_search_settings, create_index_sql, ensure_vector_indexes
+
+
+class _RecordingSession:
+    def __init__(self, dialect: str, pgvector: str = "0.8.0") -> None:
+        self.statements: list[str] = []
+        self._bind = SimpleNamespace(dialect=SimpleNamespace(name=dialect), url=f"{dialect}://pgvector-{pgvector}")
+        self._pgvector = pgvector
+
+    def get_bind(self):
+        return self._bind
+
+    def execute(self, statement):
+        if "pg_extension" in str(statement):
+            return SimpleNamespace(scalar=lambda: self._pgvector)
+        self.statements.append(str(statement))
+
+
+def test_index_ddl_uses_configured_method_and_parameters() -> None:
+    hnsw = Settings(pgvector_index_method="hnsw", pgvector_hnsw_m=24, pgvector_hnsw_ef_construction=128)
+    ivfflat = Settings(pgvector_index_method="ivfflat", pgvector_ivfflat_lists=200)
+
+    assert create_index_sql("memory_notes", "embedding", hnsw) == (
+        "CREATE INDEX IF NOT EXISTS ix_memory_notes_embedding_hnsw ON memory_notes "
+        "USING hnsw (embedding vector_cosine_ops) WITH (m = 24, ef_construction = 128)"
+    )
+    assert "USING ivfflat (embedding vector_cosine_ops) WITH (lists = 200)" in create_index_sql(
+        "rag_documents", "embedding", ivfflat
+    )
+
+
+def test_search_settings_are_transaction_local_on_postgres_only() -> None:
+    postgres = _RecordingSession("postgresql")
+    apply_search_settings(postgres, Settings(pgvector_index_method="hnsw", pgvector_hnsw_ef_search=80))
+    apply_search_settings(postgres, Settings(pgvector_index_method="ivfflat", pgvector_ivfflat_probes=7))
+    sqlite = _RecordingSession("sqlite")
+    apply_search_settings(sqlite, Settings())
+
+    assert postgres.statements == [
+        "SET LOCAL hnsw.ef_search = 80",
+        "SET LOCAL hnsw.iterative_scan = strict_order",
+        "SET LOCAL ivfflat.probes = 7",
+        "SET LOCAL ivfflat.iterative_scan = relaxed_order",
+    ]
+    assert sqlite.statements == []
+
+
+def test_filtered_queries_keep_recall_for_the_requested_limit() -> None:
+    hnsw = Settings(pgvector_index_method="hnsw", pgvector_hnsw_ef_search=40, pgvector_filter_overfetch=4)
+    ivfflat = Settings(pgvector_index_method="ivfflat", pgvector_ivfflat_probes=10, pgvector_ivfflat_lists=100)
+    current = _RecordingSession("postgresql")
+    apply_search_settings(current, hnsw, limit=50)
+    apply_search_settings(current, hnsw, limit=5000)
+    legacy = _RecordingSession("postgresql", pgvector="0.7.4")
+    apply_search_settings(legacy, hnsw, limit=50)
+    apply_search_settings(legacy, ivfflat, limit=50)
+
+    assert current.statements == [
+        "SET LOCAL hnsw.ef_search = 200",
+        "SET LOCAL hnsw.iterative_scan = strict_order",
+        "SET LOCAL hnsw.ef_search = 1000",
+        "SET LOCAL hnsw.iterative_scan = strict_order",
+    ]
+    # Without iterative scans IVFFlat probes every list, i.e. an exact scan.
+    assert legacy.statements == ["SET LOCAL hnsw.ef_search = 200", "SET LOCAL ivfflat.probes = 100"]
+
+
+def test_ensure_is_a_no_op_on_sqlite(api_context) -> None:
+    assert ensure_vector_indexes(session_module.get_engine()) == {}
@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+from app.core.metrics import get_metrics_registry
+from app.db import session as session_module
+from app.memory.repository import MemoryRepository
+from app.memory.service import MemoryService
+from app.services.query_cache import QueryResultCache
+from app.services.rag_service import RAGDocument, RAGService
+
+
+def test_generation_bump_discards_entries_and_late_puts() -> None:
+    cache = QueryResultCache(max_entries=2, ttl_seconds=0)
+    generation = cache.generation("docs")
+    cache.put("docs", "q", ["old"], generation)
+    assert cache.get("docs", "q") == ["old"]
+
+    cache.invalidate("docs")
+    assert cache.get("docs", "q") is None
+    cache.put("docs", "q", ["computed before the write"], generation)
+    assert cache.get("docs", "q") is None
+
+    for key in ("a", "b", "c"):
+        cache.put("notes", key, key, cache.generation("notes"))
+    assert cache.get("notes", "a") is None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_memory_find_is_cached_until_a_note_is_added(api_context, counting_embeddings) -> None:
+    embedder = counting_embeddings
+    service = MemoryService(repository=MemoryRepository(embedding_service=embedder))
+    with session_module.get_session() as session:
+        service.add_note(session, user="u", agent="a", text="Rotate the API keys", tags=["ops"], metadata={})
+    embedder.calls = 0
+
+    for query in ("rotate keys", "  rotate   keys "):
+        with session_module.get_session() as session:
+            results = service.find_notes(session, query=query, tags=["OPS"], limit=5, mode="vector")
+        assert [note.text for note in results] == ["Rotate the API keys"]
+    assert embedder.calls == 1
+
+    with session_module.get_session() as session:
+        service.add_note(session, user="u", agent="a", text="Rotate the SSH keys", tags=["ops"], metadata={})
+    with session_module.get_session() as session:
+        results = service.find_notes(session, query="rotate keys", tags=["ops"], limit=5, mode="vector")
+    assert len(results) == 2
+
+    stats = get_metrics_registry().snapshot()["memory_query_cache"]
+    assert stats["hits"] == 1
+    assert stats["hit_rate"] > 0
+
+
+def test_rag_invalidation_is_per_collection(api_context, counting_embeddings) -> None:
+    embedder = counting_embeddings
+    rag = RAGService(embedding_service=embedder)
+    with session_module.get_session() as session:
+        rag.index(session, "docs", [RAGDocument("a", "Quota errors", {"source": "a.md"})])
+        rag.index(session, "other", [RAGDocument("b", "Quota errors", {"source": "b.md"})])
+    embedder.calls = 0
+
+    with session_module.get_session() as session:
+        rag.query(session, "docs", "quota", 3, mode="vector")
+        rag.query(session, "other", "quota", 3, mode="vector")
+        rag.index(session, "other", [RAGDocument("c", "More quota errors", {"source": "c.md"})])
+    embedder.calls = 0
+    with session_module.get_session() as session:
+        assert len(rag.query(session, "docs", "quota", 3, mode="vector")) == 1
+        assert len(rag.query(session, "other", "quota", 3, mode="vector")) == 2
+    assert embedder.calls == 1
+
+
+def test_reused_session_keeps_one_commit_hook(api_context) -> None:
+    cache = QueryResultCache(max_entries=4, ttl_seconds=0)
+    for _ in range(20):
+        with session_module.get_session() as session:
+            cache.invalidate_on_commit(session, "notes")
+    with session_module.get_session() as session:
+        session.connection()
+        cache.invalidate_on_commit(session, "notes")
+        session.rollback()
+
+    assert cache.stats()["invalidations"] == 41
+    assert len(list(session.dispatch.after_commit)) == 1
+    assert not session.info[cache]
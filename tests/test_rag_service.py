@@ -6,9 +6,13 @@ import pytest
 from fastapi.testclient import TestClient
 
 from app import dependencies as dependencies_module
+from app.core.config import get_settings
 from app.db import session as session_module
+from app.db.models.rag import RAGDocument as RAGDocumentModel
 from app.main import create_app
 from app.services.rag_service import RAGDocument, RAGService
+from app.vector.backends import HashingBackend
+from app.vector.embedding import EmbeddingService
 
 
 class _DummyAuditLogger:
@@ -77,6 +81,8 @@ def test_rag_query_endpoint_includes_source_metadata(rag_client: TestClient) ->
     }
     index_response = rag_client.post("/rag/index", json=index_payload)
     assert index_response.status_code == 200
+    assert (index_response.json()["created"], index_response.json()["updated"]) == (2, 0)
+    assert (index_response.json()["embedded"], index_response.json()["skipped"]) == (2, 0)
 
     query_payload = {
         "user": "tester",
@@ -96,3 +102,85 @@ def test_rag_query_endpoint_includes_source_metadata(rag_client: TestClient) ->
     wizard_hit = next((hit for hit in body["results"] if hit["source"] == "projects/demo/wizards.md"), None)
     assert wizard_hit is not None
     assert wizard_hit["excerpt"] == "Wizardry of the ancient code"
+
+
+def test_index_upserts_in_chunks_and_counts_created_and_updated(rag_service: RAGService, monkeypatch) -> None:
+    monkeypatch.setattr(get_settings(), "rag_index_chunk_size", 2)
+    with session_module.get_session() as session:
+        first = rag_service.index(
+            session, "unit", [RAGDocument(f"doc-{index}", f"Version one {index}", {"v": 1}) for index in range(3)]
+        )
+    with session_module.get_session() as session:
+        created_at = session.get(RAGDocumentModel, ("unit", "doc-1")).created_at
+
+    with session_module.get_session() as session:
+        second = rag_service.index(
+            session,
+            "unit",
+            [
+                RAGDocument("doc-1", "Version two", {"v": 2}),
+                RAGDocument("doc-3", "Brand new", {"v": 2}),
+                RAGDocument("doc-2", "Stale copy", {"v": 1}),
+                RAGDocument("doc-2", "Version two again", {"v": 2, "source": "b.md"}),
+            ],
+        )
+
+    assert (first.created, first.updated) == (3, 0)
+    assert (second.created, second.updated) == (1, 2)
+    assert second.document_ids == ["doc-1", "doc-3", "doc-2", "doc-2"]
+    with session_module.get_session() as session:
+        updated = session.get(RAGDocumentModel, ("unit", "doc-1"))
+        assert (updated.text, updated.payload) == ("Version two", {"v": 2})
+        assert updated.created_at == created_at and updated.updated_at > created_at
+        assert session.get(RAGDocumentModel, ("unit", "doc-2")).text == "Version two again"
+        matches = rag_service.query(session, "unit", "version two again", n_results=1)
+    assert matches[0]["source"] == "b.md"
+
+
+class _RecordingEmbeddings(EmbeddingService):
+    def __init__(self, model_id: str = "hashing:384") -> None:
+        backend = HashingBackend(384)
+        backend.model_id = model_id
+        super().__init__(backend)
+        self.texts: list[str] = []
+
+    def embed(self, texts):
+        items = list(texts)
+        self.texts.extend(items)
+        return super().embed(items)
+
+
+def test_index_only_embeds_new_or_changed_texts(api_context) -> None:
+    embeddings = _RecordingEmbeddings()
+    rag = RAGService(embedding_service=embeddings)
+    documents = [RAGDocument(f"doc-{index}", f"Section {index}", {"source": f"{index}.md"}) for index in range(3)]
+    with session_module.get_session() as session:
+        rag.index(session, "unit", documents)
+    with session_module.get_session() as session:
+        untouched = session.get(RAGDocumentModel, ("unit", "doc-0")).updated_at
+    embeddings.texts.clear()
+
+    with session_module.get_session() as session:
+        result = rag.index(
+            session,
+            "unit",
+            [
+                documents[0],
+                RAGDocument("doc-1", "Section 1", {"source": "moved.md"}),
+                RAGDocument("doc-2", "Section 2, rewritten", {"source": "2.md"}),
+                RAGDocument("doc-3", "Section 3", {"source": "3.md"}),
+            ],
+        )
+
+    assert embeddings.texts == ["Section 2, rewritten", "Section 3"]
+    assert (result.embedded, result.skipped) == (2, 2)
+    assert (result.created, result.updated) == (1, 2)
+    with session_module.get_session() as session:
+        assert session.get(RAGDocumentModel, ("unit", "doc-0")).updated_at == untouched
+        assert session.get(RAGDocumentModel, ("unit", "doc-1")).payload == {"source": "moved.md"}
+        matches = rag.query(session, "unit", "Section 1", n_results=1, mode="vector")
+    assert matches[0]["source"] == "moved.md"
+
+    with session_module.get_session() as session:
+        upgraded = RAGService(embedding_service=_RecordingEmbeddings("other:384")).index(session, "unit", documents)
+    assert (upgraded.embedded, upgraded.skipped) == (3, 0)
@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+from sqlalchemy import select, update
+from sqlalchemy.dialects import postgresql
+
+from app.db import session as session_module
+from app.db.models.memory import MemoryNote as MemoryNoteModel
+from app.memory.domain import MemoryNoteInput, MemoryRerank
+from app.memory.repository import MemoryRepository
+from app.vector.ranking import maximal_marginal_relevance, recency_decay
+
+
+def test_maximal_marginal_relevance_skips_near_duplicates() -> None:
+    embeddings = np.array([[1.0, 0.0], [0.99, 0.01], [0.0, 1.0]])
+    relevance = np.array([1.0, 0.98, 0.6])
+
+    assert maximal_marginal_relevance(relevance, embeddings, 2, lambda_=1.0) == [0, 1]
+    assert maximal_marginal_relevance(relevance, embeddings, 2, lambda_=0.5) == [0, 2]
+    assert maximal_marginal_relevance(relevance, embeddings, 5, lambda_=0.5) == [0, 2, 1]
+
+
+def test_recency_decay_halves_per_half_life() -> None:
+    decay = recency_decay(np.array([0.0, 3600.0, 7200.0, -5.0]), 3600.0)
+
+    assert np.allclose(decay, [1.0, 0.5, 0.25, 1.0])
+
+
+def test_find_notes_recency_and_mmr_rerank(api_context) -> None:
+    repository = MemoryRepository()
+    notes = [
+        MemoryNoteInput(text="Deploy checklist for the billing service", note_id="old"),
+        MemoryNoteInput(text="Deploy checklist for the billing service.", note_id="copy"),
+        MemoryNoteInput(text="Billing service deploy needs a feature flag", note_id="new"),
+    ]
+    with session_module.get_session() as session:
+        repository.add_notes(session, notes, user="u", agent="a")
+        stale = datetime.now(timezone.utc) - timedelta(days=60)
+        session.execute(
+            update(MemoryNoteModel).where(MemoryNoteModel.note_id.in_(["old", "copy"])).values(updated_at=stale)
+        )
+
+    query = "deploy checklist billing service"
+    with session_module.get_session() as session:
+        plain = repository.find_notes(session, query=query, tags=None, limit=2, mode="vector")
+        recent = repository.find_notes(
+            session, query=query, tags=None, limit=2, mode="vector", rerank=MemoryRerank(recency_weight=0.9)
+        )
+        diverse = repository.find_notes(
+            session, query=query, tags=None, limit=2, mode="vector", rerank=MemoryRerank(mmr_lambda=0.3)
+        )
+
+    assert {note.note_id for note in plain} == {"old", "copy"}
+    assert recent[0].note_id == "new"
+    assert "new" in {note.note_id for note in diverse}
+    assert not {"old", "copy"} <= {note.note_id for note in diverse}
+
+
+def test_postgres_recency_decay_is_computed_in_sql() -> None:
+    columns = MemoryRepository._rerank_columns(MemoryRerank(recency_weight=0.5, half_life_hours=24), True)
+    sql = str(select(*columns).compile(dialect=postgresql.dialect()))
+
+    assert "power" in sql and "EXTRACT(epoch FROM now() - memory_notes.updated_at)" in sql
+
+
+def test_find_endpoint_accepts_rerank_parameters(client) -> None:
+    for text in ("Sprint review notes", "Sprint review notes!"):
+        client.post("/memory/note/add", json={"user": "u", "agent": "a", "note": {"text": text}})
+
+    response = client.post(
+        "/memory/note/find",
+        json={"user": "u", "query": "sprint review", "limit": 1, "recency_weight": 0.2, "mmr_lambda": 0.5},
+    )
+    invalid = client.post("/memory/note/find", json={"user": "u", "query": "sprint", "mmr_lambda": 2})
+
+    assert response.status_code == 200
+    assert len(response.json()["results"]) == 1
+    assert invalid.status_code == 422
@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import threading
+
+import pytest
+
+from app.core.metrics import Counter
+from app.core.singleflight import SingleFlight
+
+
+def _blocking_function(release: threading.Event, calls: list[int]):
+    def _run() -> str:
+        calls.append(1)
+        release.wait(timeout=5)
+        return "result"
+
+    return _run
+
+
+def test_threads_share_one_computation() -> None:
+    coalesced = Counter("coalesced")
+    flight: SingleFlight[str] = SingleFlight(coalesced)
+    release = threading.Event()
+    calls: list[int] = []
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        futures = [pool.submit(flight.do, "q", _blocking_function(release, calls)) for _ in range(4)]
+        while coalesced.value < 3:
+            threading.Event().wait(0.001)
+        release.set()
+        results = [future.result(timeout=5) for future in futures]
+
+    assert results == ["result"] * 4
+    assert calls == [1]
+    assert flight.do("q", lambda: "fresh") == "fresh"
+
+
+def test_async_and_thread_callers_join_the_same_flight() -> None:
+    coalesced = Counter("coalesced")
+    flight: SingleFlight[str] = SingleFlight(coalesced)
+    release = threading.Event()
+    calls: list[int] = []
+
+    async def _scenario() -> list[str]:
+        tasks = [asyncio.create_task(flight.ado("q", _blocking_function(release, calls))) for _ in range(3)]
+        loop = asyncio.get_running_loop()
+        thread_caller = loop.run_in_executor(None, flight.do, "q", _blocking_function(release, calls))
+        while coalesced.value < 3:
+            await asyncio.sleep(0.001)
+        release.set()
+        return [*await asyncio.gather(*tasks), await thread_caller]
+
+    assert asyncio.run(_scenario()) == ["result"] * 4
+    assert calls == [1]
+
+
+def test_followers_receive_the_leader_exception() -> None:
+    coalesced = Counter("coalesced")
+    flight: SingleFlight[str] = SingleFlight(coalesced)
+    started = threading.Event()
+    release = threading.Event()
+
+    def _fail() -> str:
+        started.set()
+        release.wait(timeout=5)
+        raise RuntimeError("backend down")
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        leader = pool.submit(flight.do, "q", _fail)
+        started.wait(timeout=5)
+        follower = pool.submit(flight.do, "q", lambda: "unused")
+        while coalesced.value < 1:
+            threading.Event().wait(0.001)
+        release.set()
+        for future in (leader, follower):
+            with pytest.raises(RuntimeError, match="backend down"):
+                future.result(timeout=5)
@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from app.core.config import get_settings
+from app.db import session as session_module
+from app.db.models.memory import MemoryNote as MemoryNoteModel
+from app.memory.repository import MemoryRepository
+from app.vector.backends import HashingBackend
+from app.vector.embedding import EmbeddingService
+from app.vector.index import InMemoryVectorIndex
+
+
+def test_search_matches_brute_force_with_label_masks() -> None:
+    rng = np.random.default_rng(7)
+    vectors = rng.normal(size=(500, 16)).astype(np.float32)
+    index = InMemoryVectorIndex(16)
+    for position, vector in enumerate(vectors):
+        index.upsert(f"id-{position}", vector, labels=("even",) if position % 2 == 0 else ("odd",))
+    query = rng.normal(size=16)
+
+    normalised = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    scores = normalised @ (query / np.linalg.norm(query))
+    expected_even = [f"id-{position}" for position in np.argsort(-scores) if position % 2 == 0][:5]
+
+    hits = index.search(query, 5, required_labels=("even",))
+
+    assert [key for key, _ in hits] == expected_even
+    assert abs(hits[0][1] - scores[int(expected_even[0].split("-")[1])]) < 1e-5
+
+
+def test_upsert_replaces_vector_and_labels_and_remove_hides_row() -> None:
+    index = InMemoryVectorIndex(2)
+    index.upsert("a", [1.0, 0.0], labels=("x",))
+    index.upsert("b", [0.0, 1.0], labels=("x",))
+    index.upsert("a", [0.0, 1.0], labels=("y",))
+
+    assert [key for key, _ in index.search([0.0, 1.0], 2, required_labels=("x",))] == ["b"]
+    assert [key for key, _ in index.search([0.0, 1.0], 1, required_labels=("y",))] == ["a"]
+
+    index.remove("b")
+    assert [key for key, _ in index.search([0.0, 1.0], 5)] == ["a"]
+    assert len(index) == 1
+
+
+def test_repository_index_sees_rows_written_by_other_sessions(api_context) -> None:
+    get_settings().vector_index_sync_interval_seconds = 0
+    backend = HashingBackend(384)
+    repository = MemoryRepository(embedding_service=EmbeddingService(backend))
+    with session_module.get_session() as session:
+        repository.add_note(session, text="alpha release notes", tags=["ops"], metadata={}, user="u", agent="a")
+        assert repository.find_notes(session, query="alpha release", tags=None, limit=5)
+
+    now = datetime.now(timezone.utc)
+    with session_module.get_session() as session:
+        session.add(
+            MemoryNoteModel(
+                note_id="external",
+                user="u",
+                agent="other-worker",
+                text="beta rollout checklist",
+                tags=["ops"],
+                payload={},
+                embedding=backend.encode(["beta rollout checklist"])[0],
+                embedding_model=backend.model_id,
+                created_at=now,
+                updated_at=now,
+            )
+        )
+
+    with session_module.get_session() as session:
+        results = repository.find_notes(session, query="beta rollout", tags=["ops"], limit=1)
+
+    assert [note.note_id for note in results] == ["external"]
+
+
+def test_repository_index_only_receives_committed_writes(api_context, monkeypatch) -> None:
+    monkeypatch.setattr(get_settings(), "vector_index_sync_interval_seconds", 3600)
+    repository = MemoryRepository(embedding_service=EmbeddingService(HashingBackend(384)))
+    table_index = repository._vector_index
+    with session_module.get_session() as session:
+        repository.add_note(session, text="alpha release notes", tags=["ops"], metadata={}, user="u", agent="a")
+        repository.find_notes(session, query="alpha", tags=None, limit=1)
+    assert len(table_index.index) == 1
+
+    session = session_module._get_session_factory()()
+    repository.add_note(session, text="draft that is rolled back", tags=["ops"], metadata={}, user="u", agent="a")
+    assert len(table_index.index) == 1
+    session.rollback()
+    session.close()
+    assert len(table_index.index) == 1
+
+    with session_module.get_session() as session:
+        repository.add_note(session, text="beta rollout checklist", tags=["ops"], metadata={}, user="u", agent="a")
+        assert len(table_index.index) == 1
+    assert len(table_index.index) == 2
+    for index in range(20):
+        with session_module.get_session() as session:
+            repository.add_note(session, text=f"note {index}", tags=[], metadata={}, user="u", agent="a")
+    assert len(table_index.index) == 22
+    assert len(list(session.dispatch.after_commit)) == len(list(session.dispatch.after_transaction_end)) == 1
+
+
+def test_incremental_sync_picks_up_rows_committed_behind_the_watermark(api_context, monkeypatch) -> None:
+    monkeypatch.setattr(get_settings(), "vector_index_sync_interval_seconds", 0)
+    backend = HashingBackend(384)
+    repository = MemoryRepository(embedding_service=EmbeddingService(backend))
+    with session_module.get_session() as session:
+        repository.add_note(session, text="alpha release notes", tags=["ops"], metadata={}, user="u", agent="a")
+        repository.find_notes(session, query="alpha", tags=None, limit=1)
+
+    # Another worker stamped this row before the note above but committed it after the sync.
+    late = datetime.now(timezone.utc) - timedelta(seconds=30)
+    with session_module.get_session() as session:
+        session.add(
+            MemoryNoteModel(
+                note_id="late",
+                user="u",
+                agent="slow-worker",
+                text="gamma migration plan",
+                tags=["ops"],
+                payload={},
+                embedding=backend.encode(["gamma migration plan"])[0],
+                embedding_model=backend.model_id,
+                created_at=late,
+                updated_at=late,
+            )
+        )
+    with session_module.get_session() as session:
+        results = repository.find_notes(session, query="gamma migration", tags=["ops"], limit=1)
+
+    assert [note.note_id for note in results] == ["late"]
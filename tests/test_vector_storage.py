@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+import json
+
+import numpy as np
+import pytest
+from sqlalchemy import select, text
+
+from app.db import session as session_module
+from app.db.migrate_vectors import migrate_vectors
+from app.db.models.memory import MemoryNote as MemoryNoteModel
+from app.db.types import decode_vector, encode_vector
+
+
+@pytest.mark.parametrize(("encoding", "size", "tolerance"), [("float32", 4, 0.0), ("float16", 2, 1e-3), ("int8", 1, 1e-2)])
+def test_binary_encodings_round_trip(encoding: str, size: int, tolerance: float) -> None:
+    vector = np.random.default_rng(0).uniform(-1, 1, 384).astype(np.float32)
+    blob = encode_vector(vector, encoding)
+
+    assert len(blob) == 1 + 384 * size + (4 if encoding == "int8" else 0)
+    np.testing.assert_allclose(decode_vector(blob), vector, atol=tolerance)
+
+
+def test_migration_converts_legacy_json_rows(api_context) -> None:
+    engine = session_module.get_engine()
+    vector = [0.25] * 384
+    with engine.begin() as connection:
+        connection.execute(
+            text(
+                "INSERT INTO memory_notes (note_id, user, agent, text, tags, payload, embedding, created_at, updated_at) "
+                "VALUES ('legacy', 'u', 'a', 'old row', '[]', '{}', :vector, '2024-01-01 00:00:00', '2024-01-01 00:00:00')"
+            ),
+            {"vector": json.dumps(vector)},
+        )
+
+    with session_module.get_session() as session:
+        before = session.execute(select(MemoryNoteModel.embedding)).scalar_one()
+    assert before.tolist() == vector
+
+    assert migrate_vectors(engine, "float32") == {"memory_notes": 1, "rag_documents": 0}
+    assert migrate_vectors(engine, "float32") == {"memory_notes": 0, "rag_documents": 0}
+    assert migrate_vectors(engine, "int8", reencode=True)["memory_notes"] == 1
+    with engine.connect() as connection:
+        kind, size = connection.execute(text("SELECT typeof(embedding), length(embedding) FROM memory_notes")).one()
+    assert (kind, size) == ("blob", 1 + 4 + 384)
+    with session_module.get_session() as session:
+        after = session.execute(select(MemoryNoteModel.embedding)).scalar_one()
+    np.testing.assert_allclose(after, vector, atol=1e-2)